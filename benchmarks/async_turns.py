@@ -0,0 +1,62 @@
+"""Concurrent-turn throughput of the sync and async graph paths.
+
+    python -m benchmarks.async_turns --turns 200 --latency 0.2 --workers 16
+"""
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from benchmarks.fakes import DelayedChatModel
+from src.backend.chatbot import build_graph
+
+
+def turn_input(i):
+    return {'messages': [HumanMessage(content=f"question {i}")]}
+
+
+def turn_config(i):
+    return {'configurable': {'thread_id': f"bench-{i}"}}
+
+
+def run_sync(graph, turns, workers):
+    # the Streamlit model: one blocking .invoke per session thread
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda i: graph.invoke(turn_input(i), turn_config(i)), range(turns)))
+    return time.perf_counter() - started
+
+
+async def run_async(graph, turns):
+    started = time.perf_counter()
+    await asyncio.gather(*(graph.ainvoke(turn_input(i), turn_config(i)) for i in range(turns)))
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turns', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.2, help="stub model delay in seconds")
+    parser.add_argument('--workers', type=int, default=16, help="threads for the sync path")
+    args = parser.parse_args()
+
+    model = DelayedChatModel(latency=args.latency)
+    results = {}
+    for path in ('sync', 'async'):
+        graph = build_graph(model, [], InMemorySaver())
+        if path == 'sync':
+            elapsed = run_sync(graph, args.turns, args.workers)
+        else:
+            elapsed = asyncio.run(run_async(graph, args.turns))
+        results[path] = {
+            'seconds': round(elapsed, 3),
+            'turns_per_second': round(args.turns / elapsed, 1),
+        }
+    results['config'] = vars(args)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Checkpoint bytes per thread after N turns: full history per step vs retention, message refs and compression.
+
+    python -m benchmarks.checkpoint_retention --turns 100 --keep 25
+
+Runs the production graph over one thread with a scripted model, where
+every ``--tool-every``-th turn searches and gets ``--result-chars`` sized
+results back, against SQLiteSaver configured as:
+
+- before: every checkpoint kept, whole message history serialized per step
+- retention: only the latest ``--keep`` checkpoints
+- message_refs: every checkpoint kept, messages stored once and large
+  tool results compressed
+- after: both
+
+and reports the bytes held in memory and on disk for the thread, plus
+the mean wall time per turn.
+"""
+import argparse
+import json
+import time
+from langchain_core.messages import HumanMessage
+from benchmarks.checkpoints import thread_checkpoint_bytes, thread_disk_bytes
+from benchmarks.fakes import FakeSearchTool, ScriptedChatModel
+from src.backend.chatbot import build_graph
+from src.backend.checkpoint import SQLiteSaver
+
+MODES = {
+    'before': {'keep_checkpoints': None, 'dedupe_messages': False, 'compress_over': 0},
+    'retention': {'dedupe_messages': False, 'compress_over': 0},
+    'message_refs': {'keep_checkpoints': None},
+    'after': {},
+}
+
+
+def run(mode, args):
+    options = {'keep_checkpoints': args.keep, 'compress_over': args.compress_over, **MODES[mode]}
+    saver = SQLiteSaver(':memory:', flush_interval=3600, **options)
+    model = ScriptedChatModel(first_token_latency=0, tokens_per_second=10 ** 6, tool_rounds=1)
+    graph = build_graph(model, [FakeSearchTool(latency=0, result_chars=args.result_chars)], saver)
+    config = {'configurable': {'thread_id': 'bench', 'max_prompt_tokens': 10 ** 9}}
+
+    started = time.perf_counter()
+    for i in range(args.turns):
+        web_search = bool(args.tool_every) and i % args.tool_every == 0
+        graph.invoke({'messages': [HumanMessage(content=f"Question number {i}")], 'settings': {'web_search': web_search}}, config)
+    elapsed = time.perf_counter() - started
+
+    state = graph.get_state(config)
+    result = {
+        'memory_bytes': thread_checkpoint_bytes(saver, 'bench'),
+        'disk_bytes': thread_disk_bytes(saver, 'bench'),
+        'checkpoints': len(list(graph.get_state_history(config))),
+        'messages': len(state.values['messages']),
+        'turn_ms': round(elapsed / args.turns * 1000, 2),
+    }
+    saver.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turns', type=int, default=100)
+    parser.add_argument('--keep', type=int, default=25, help="checkpoints kept per thread with retention on")
+    parser.add_argument('--tool-every', type=int, default=4, help="every n-th turn searches (0: never)")
+    parser.add_argument('--result-chars', type=int, default=1500, help="approximate size of each search result")
+    parser.add_argument('--compress-over', type=int, default=2048, help="compress tool results from this many bytes")
+    args = parser.parse_args()
+
+    results = {mode: run(mode, args) for mode in MODES}
+    before = results['before']
+    results['reduction'] = {
+        mode: {key: f"{1 - results[mode][key] / before[key]:.1%}" for key in ('memory_bytes', 'disk_bytes')}
+        for mode in MODES if mode != 'before'
+    }
+    results['config'] = vars(args)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+def thread_checkpoint_bytes(saver, thread_id):
+    """Serialized bytes an InMemorySaver (or subclass) holds for one thread."""
+    total = 0
+    for checkpoints in saver.storage.get(thread_id, {}).values():
+        for checkpoint, metadata, _ in checkpoints.values():
+            total += len(checkpoint[1]) + len(metadata[1])
+    for key, writes in saver.writes.items():
+        if key[0] == thread_id:
+            total += sum(len(value[1]) for _, _, value, _ in writes.values())
+    for key, value in saver.blobs.items():
+        if key[0] == thread_id:
+            total += len(value[1])
+    # SQLiteSaver keeps each message once, outside the blobs
+    for value in getattr(saver, 'messages', {}).get(thread_id, {}).values():
+        total += len(value[1])
+    return total
+
+
+def thread_disk_bytes(saver, thread_id):
+    """Value bytes a SQLiteSaver has written to disk for one thread."""
+    saver.flush()
+    total = 0
+    for table, columns in (
+        ('checkpoints', 'length(checkpoint) + length(metadata)'),
+        ('writes', 'length(value)'),
+        ('blobs', 'length(value)'),
+        ('messages', 'length(value)'),
+    ):
+        row = saver.conn.execute(f'SELECT COALESCE(SUM({columns}), 0) FROM {table} WHERE thread_id = ?', (thread_id,))
+        total += row.fetchone()[0]
+    return total
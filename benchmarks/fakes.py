@@ -0,0 +1,172 @@
+import asyncio
+import json
+import time
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import BaseModel, Field
+
+
+class DelayedChatModel(BaseChatModel):
+    """Offline stand-in for ChatGroq that answers after a fixed delay."""
+
+    latency: float = 0.2
+    reply: str = "This is a canned answer from the benchmark model."
+    # approximate prompt tokens of every call, for size comparisons
+    prompt_tokens: list = Field(default_factory=list)
+
+    @property
+    def _llm_type(self):
+        return 'delayed-fake'
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _result(self):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.prompt_tokens.append(count_tokens_approximately(messages))
+        time.sleep(self.latency)
+        return self._result()
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.prompt_tokens.append(count_tokens_approximately(messages))
+        await asyncio.sleep(self.latency)
+        return self._result()
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Streaming stand-in for ChatGroq with a time-to-first-token and a token rate.
+
+    Each turn first emits ``tool_rounds`` search calls (one per call, as the
+    real model does when it decides to look something up), then the reply,
+    streamed word by word at ``tokens_per_second``. Calls are only emitted
+    when tools are bound, and bound tool schemas count toward
+    ``prompt_tokens`` the way they count toward a real request.
+    """
+
+    first_token_latency: float = 0.2
+    tokens_per_second: float = 200.0
+    reply: str = "This is a canned answer from the benchmark model, streamed one word at a time."
+    tool_rounds: int = 0
+    calls_per_round: int = 1
+    tool_name: str = 'tavily_search_results_json'
+    tool_schemas: list = Field(default_factory=list)
+    prompt_tokens: list = Field(default_factory=list)
+
+    @property
+    def _llm_type(self):
+        return 'scripted-fake'
+
+    def bind_tools(self, tools, **kwargs):
+        # shares prompt_tokens with the unbound model, like bound variants share a client
+        return self.model_copy(update={'tool_schemas': [convert_to_openai_tool(tool) for tool in tools]})
+
+    def _next_message(self, messages):
+        # roughly four characters per token, as count_tokens_approximately assumes
+        schema_tokens = len(json.dumps(self.tool_schemas)) // 4 if self.tool_schemas else 0
+        self.prompt_tokens.append(count_tokens_approximately(messages) + schema_tokens)
+        if not self.tool_schemas:
+            return AIMessage(content=self.reply)
+        # tool rounds already taken in this turn: results after the last user message
+        rounds = 0
+        for msg in reversed(messages):
+            if msg.type == 'human':
+                break
+            rounds += msg.type == 'tool'
+        if rounds < self.tool_rounds * self.calls_per_round:
+            calls = [
+                {'name': self.tool_name, 'args': {'query': f"lookup {rounds + i}"}, 'id': f"call-{len(self.prompt_tokens)}-{i}"}
+                for i in range(self.calls_per_round)
+            ]
+            return AIMessage(content="", tool_calls=calls)
+        return AIMessage(content=self.reply)
+
+    def _words(self):
+        words = self.reply.split(' ')
+        return [word if i == len(words) - 1 else word + ' ' for i, word in enumerate(words)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._next_message(messages)
+        time.sleep(self.first_token_latency + (len(self._words()) / self.tokens_per_second if message.content else 0))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._next_message(messages)
+        await asyncio.sleep(self.first_token_latency + (len(self._words()) / self.tokens_per_second if message.content else 0))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _chunks(self, message):
+        if message.tool_calls:
+            return [AIMessageChunk(content="", tool_call_chunks=[
+                {'name': c['name'], 'args': json.dumps(c['args']), 'id': c['id'], 'index': i} for i, c in enumerate(message.tool_calls)
+            ])]
+        return [AIMessageChunk(content=word) for word in self._words()]
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        chunks = self._chunks(self._next_message(messages))
+        time.sleep(self.first_token_latency)
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(1 / self.tokens_per_second)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        chunks = self._chunks(self._next_message(messages))
+        await asyncio.sleep(self.first_token_latency)
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
+
+
+class FakeSearchArgs(BaseModel):
+    query: str = Field(description="search query to look up")
+
+
+class FakeSearchTool(BaseTool):
+    """Offline stand-in for TavilySearchResults returning canned results after ``latency``.
+
+    With ``error`` set it raises after the delay instead, for failing-tool runs.
+    ``result_chars`` pads each result to about that size, as real pages are.
+    """
+
+    name: str = 'tavily_search_results_json'
+    # same schema as the real tool, so bound-tool token counts match
+    description: str = (
+        "A search engine optimized for comprehensive, accurate, and trusted results. "
+        "Useful for when you need to answer questions about current events. Input should be a search query."
+    )
+    args_schema: type[BaseModel] = FakeSearchArgs
+    latency: float = 0.3
+    error: str | None = None
+    result_chars: int = 0
+    calls: int = 0
+
+    def _results(self, query):
+        if self.error:
+            raise RuntimeError(self.error)
+        results = []
+        for i in range(3):
+            content = f"Result {i} for {query}."
+            words = ' '.join(f"word{n}" for n in range(self.result_chars // 7))
+            results.append({'url': f"https://example.com/{i}", 'content': f"{content} {words}".strip()})
+        return results
+
+    def _run(self, query, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        return self._results(query)
+
+    async def _arun(self, query, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return self._results(query)
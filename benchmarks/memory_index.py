@@ -0,0 +1,86 @@
+"""Long-term memory index: build time, query latency and RSS at scale.
+
+    python -m benchmarks.memory_index --turns 100000 --queries 500
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from src.backend.checkpoint import current_rss_bytes
+from src.backend.memory import LongTermMemory
+
+WORDS = (
+    "cat dog python graph search model token cache thread memory latency budget summary "
+    "streamlit groq tavily index vector query answer question weather travel recipe music "
+    "budget invoice meeting deadline project release bug feature deploy server database"
+).split()
+
+
+def fake_turn(rng):
+    question = " ".join(rng.choices(WORDS, k=rng.randint(6, 16)))
+    answer = " ".join(rng.choices(WORDS, k=rng.randint(12, 40)))
+    return f"User: {question}\nAssistant: {answer}"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turns', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--namespaces', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    path = tempfile.mkdtemp(prefix='memory-bench-')
+    rss_start = current_rss_bytes()
+
+    memory = LongTermMemory(path, save_every=10 ** 9)
+    started = time.perf_counter()
+    for offset in range(0, args.turns, args.batch):
+        memory.add_many(
+            (f"user-{i % args.namespaces}", f"thread-{i // 20}", f"msg-{i}", fake_turn(rng))
+            for i in range(offset, min(offset + args.batch, args.turns))
+        )
+    build_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    memory.close()
+    save_seconds = time.perf_counter() - started
+    rss_built = current_rss_bytes()
+
+    # reopen: the index is memory-mapped instead of read into the heap
+    started = time.perf_counter()
+    memory = LongTermMemory(path)
+    load_seconds = time.perf_counter() - started
+
+    latencies = []
+    for i in range(args.queries):
+        query = " ".join(rng.choices(WORDS, k=8))
+        started = time.perf_counter()
+        memory.search(query, namespace=f"user-{i % args.namespaces}")
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    results = {
+        'turns': args.turns,
+        'build_seconds': round(build_seconds, 2),
+        'turns_per_second': round(args.turns / build_seconds),
+        'save_seconds': round(save_seconds, 3),
+        'mmap_load_seconds': round(load_seconds, 3),
+        'query_ms_p50': round(statistics.median(latencies), 2),
+        'query_ms_p95': round(percentile(latencies, 95), 2),
+        'rss_mb_start': round(rss_start / 2 ** 20, 1) if rss_start else None,
+        'rss_mb_after_build': round(rss_built / 2 ** 20, 1) if rss_built else None,
+        'rss_mb_after_queries': round(current_rss_bytes() / 2 ** 20, 1) if rss_start else None,
+        'index_path': path,
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
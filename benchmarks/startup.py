@@ -0,0 +1,73 @@
+"""Cold start: importing src.backend.chatbot, then compiling the shared graph.
+
+    python -m benchmarks.startup --runs 5
+
+Every run is a fresh interpreter, so nothing is warm in sys.modules. No
+requests are made; placeholder keys are set only so the clients can be
+constructed. Checkpoints go to a throwaway in-memory saver.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import src.backend.chatbot as chatbot_module
+imported = time.perf_counter()
+chatbot_module.get_chatbot()
+compiled = time.perf_counter()
+print(json.dumps({
+    'import_s': imported - started,
+    'first_compile_s': compiled - imported,
+    'total_s': compiled - started,
+    'langchain_community_on_import': 'langchain_community' in sys.modules,
+}))
+"""
+
+# which heavy modules a plain import pulls in, checked separately so the probe above stays clean
+IMPORT_PROBE = """
+import json, sys
+import src.backend.chatbot
+print(json.dumps({name: name in sys.modules for name in ('langchain_community', 'langchain_groq', 'faiss')}))
+"""
+
+
+def probe_env():
+    env = dict(os.environ)
+    env.setdefault('GROQ_API_KEY', 'startup-benchmark')
+    env.setdefault('TAVILY_API_KEY', 'startup-benchmark')
+    env['CHATBOT_CHECKPOINTER'] = 'memory'
+    env['CHATBOT_LONG_TERM_MEMORY'] = '0'
+    env['PYTHONWARNINGS'] = 'ignore'
+    return env
+
+
+def run_probe(code):
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, env=probe_env())
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [run_probe(PROBE) for _ in range(args.runs)]
+    results = {
+        key: {
+            'median_ms': round(statistics.median(r[key] for r in runs) * 1000, 1),
+            'min_ms': round(min(r[key] for r in runs) * 1000, 1),
+        }
+        for key in ('import_s', 'first_compile_s', 'total_s')
+    }
+    results['loaded_by_import'] = run_probe(IMPORT_PROBE)
+    results['config'] = vars(args)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
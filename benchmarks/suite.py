@@ -0,0 +1,171 @@
+"""Offline benchmark suite for the chatbot graph, written to JSON for comparing commits.
+
+    python -m benchmarks.suite --turns 30 --concurrency 16 --out bench.json
+
+Builds the production graph (``build_graph``) around a scripted streaming
+model and a fake search tool, so no Groq or Tavily calls are made, and
+reports:
+
+- ttft / latency: time to the first streamed answer token and to the end
+  of the turn (p50/p90/p99), for plain turns and turns with tool calls
+- tool_loop: extra wall time of a tool turn beyond the model and tool
+  time it scripts, i.e. what the graph itself adds per tool round
+- checkpoints: stored bytes per turn as one thread grows
+- concurrency: turns per second with N threads talking at once
+"""
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from benchmarks.checkpoints import thread_checkpoint_bytes
+from benchmarks.fakes import FakeSearchTool, ScriptedChatModel
+from src.backend.chatbot import build_graph
+
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {}
+
+    def pick(q):
+        return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+
+    return {
+        'p50_ms': pick(0.5),
+        'p90_ms': pick(0.9),
+        'p99_ms': pick(0.99),
+        'mean_ms': round(sum(values) / len(values) * 1000, 2),
+        'n': len(values),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_graph(args, tool_rounds=0, saver=None):
+    model = ScriptedChatModel(
+        first_token_latency=args.first_token_latency,
+        tokens_per_second=args.tokens_per_second,
+        tool_rounds=tool_rounds,
+    )
+    search = FakeSearchTool(latency=args.tool_latency)
+    return build_graph(model, [search], saver or InMemorySaver()), model
+
+
+def stream_turn(graph, text, config, web_search=False):
+    """(seconds to first answer token, seconds to end of turn) for one streamed turn."""
+    started = time.perf_counter()
+    first = None
+    inputs = {'messages': [HumanMessage(content=text)], 'settings': {'web_search': web_search}}
+    for chunk, metadata in graph.stream(inputs, config, stream_mode='messages'):
+        if first is None and metadata.get('langgraph_node') == 'chat_node' and isinstance(chunk, AIMessage) and chunk.content:
+            first = time.perf_counter() - started
+    return first, time.perf_counter() - started
+
+
+def bench_turns(args, tool_rounds):
+    graph, model = make_graph(args, tool_rounds)
+    ttft, latency = [], []
+    for i in range(args.warmup + args.turns):
+        first, total = stream_turn(graph, f"question {i}", {'configurable': {'thread_id': f"turns-{i}"}}, tool_rounds > 0)
+        if i >= args.warmup:
+            ttft.append(first)
+            latency.append(total)
+    words = len(model.reply.split(' '))
+    # what the fakes alone account for: every model call's first-token wait,
+    # the answer's token stream and each tool call
+    scripted = (tool_rounds + 1) * args.first_token_latency + (words - 1) / args.tokens_per_second + tool_rounds * args.tool_latency
+    return {'ttft': percentiles(ttft), 'latency': percentiles(latency), 'scripted_ms': round(scripted * 1000, 2)}
+
+
+def bench_checkpoints(args):
+    saver = InMemorySaver()
+    graph, _ = make_graph(args, saver=saver)
+    config = {'configurable': {'thread_id': 'growth'}}
+    sizes = []
+    for i in range(args.turns):
+        graph.invoke({'messages': [HumanMessage(content=f"question {i}")]}, config)
+        sizes.append(thread_checkpoint_bytes(saver, 'growth'))
+    deltas = [b - a for a, b in zip([0] + sizes, sizes)]
+    return {
+        'bytes_after_turn': sizes,
+        'bytes_per_turn_mean': round(sum(deltas) / len(deltas)),
+        'bytes_per_turn_last': deltas[-1],
+    }
+
+
+async def bench_concurrency(args):
+    graph, _ = make_graph(args)
+
+    async def conversation(n):
+        config = {'configurable': {'thread_id': f"concurrent-{n}"}}
+        for i in range(args.turns_per_thread):
+            await graph.ainvoke({'messages': [HumanMessage(content=f"question {i}")]}, config)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(conversation(n) for n in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    turns = args.concurrency * args.turns_per_thread
+    return {
+        'threads': args.concurrency,
+        'turns': turns,
+        'seconds': round(elapsed, 3),
+        'turns_per_second': round(turns / elapsed, 1),
+    }
+
+
+def run(args):
+    plain = bench_turns(args, 0)
+    tools = bench_turns(args, args.tool_rounds)
+    overhead = (tools['latency']['p50_ms'] - tools['scripted_ms']) - (plain['latency']['p50_ms'] - plain['scripted_ms'])
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'config': vars(args),
+        },
+        'plain_turn': plain,
+        'tool_turn': tools,
+        'tool_loop': {
+            'rounds': args.tool_rounds,
+            'overhead_p50_ms': round(overhead, 2),
+            'overhead_per_round_ms': round(overhead / args.tool_rounds, 2) if args.tool_rounds else None,
+        },
+        'checkpoints': bench_checkpoints(args),
+        'concurrency': asyncio.run(bench_concurrency(args)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turns', type=int, default=30, help="measured turns per scenario")
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--first-token-latency', type=float, default=0.05, help="fake model delay before its first token")
+    parser.add_argument('--tokens-per-second', type=float, default=500.0)
+    parser.add_argument('--tool-latency', type=float, default=0.05, help="fake search delay")
+    parser.add_argument('--tool-rounds', type=int, default=1, help="search calls per tool turn")
+    parser.add_argument('--concurrency', type=int, default=16, help="threads talking at once")
+    parser.add_argument('--turns-per-thread', type=int, default=5)
+    parser.add_argument('--out', help="write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Prompt tokens and checkpoint bytes per turn: system message per turn vs per-thread settings.
+
+    python -m benchmarks.system_prompt --turns 50
+"""
+import argparse
+import json
+from typing import Annotated, TypedDict
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+from benchmarks.checkpoints import thread_checkpoint_bytes
+from benchmarks.fakes import DelayedChatModel
+from src.backend.chatbot import build_graph
+from src.backend.settings import render_system_prompt
+
+SETTINGS = {'system_prompt': 'You are a helpful assistant.', 'persona': 'Technical Expert', 'web_search': True}
+
+
+class LegacyState(TypedDict):
+    messages: Annotated[list[BaseMessage], add_messages]
+
+
+def build_legacy_graph(model, saver):
+    # the original graph: whole history, one SystemMessage stored per turn
+    def chat_node(state):
+        return {'messages': [model.invoke(state['messages'])]}
+
+    graph = StateGraph(LegacyState)
+    graph.add_node('chat_node', chat_node)
+    graph.add_edge(START, 'chat_node')
+    graph.add_edge('chat_node', END)
+    return graph.compile(checkpointer=saver)
+
+
+def run(mode, turns):
+    model = DelayedChatModel(latency=0)
+    saver = InMemorySaver()
+    config = {'configurable': {'thread_id': 'bench', 'max_prompt_tokens': 10 ** 9}}
+    if mode == 'system_message_per_turn':
+        graph = build_legacy_graph(model, saver)
+    else:
+        graph = build_graph(model, [], saver)
+
+    sizes = []
+    for i in range(turns):
+        human = HumanMessage(content=f"Question number {i}: how does this work?")
+        if mode == 'system_message_per_turn':
+            graph.invoke({'messages': [SystemMessage(content=render_system_prompt(SETTINGS)), human]}, config)
+        else:
+            turn = {'messages': [human]}
+            if i == 0:
+                turn['settings'] = SETTINGS
+            graph.invoke(turn, config)
+        sizes.append(thread_checkpoint_bytes(saver, 'bench'))
+
+    return {
+        'prompt_tokens_last_turn': model.prompt_tokens[-1],
+        'prompt_tokens_total': sum(model.prompt_tokens),
+        'checkpoint_bytes': sizes[-1],
+        'checkpoint_bytes_per_turn': round(sizes[-1] / turns),
+        'last_turn_checkpoint_bytes': sizes[-1] - sizes[-2] if turns > 1 else sizes[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turns', type=int, default=50)
+    args = parser.parse_args()
+    results = {mode: run(mode, args.turns) for mode in ('system_message_per_turn', 'thread_settings')}
+    before, after = results['system_message_per_turn'], results['thread_settings']
+    results['reduction'] = {
+        key: f"{1 - after[key] / before[key]:.1%}"
+        for key in ('prompt_tokens_last_turn', 'prompt_tokens_total', 'checkpoint_bytes')
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Prompt tokens and latency per turn with web search off vs on.
+
+    python -m benchmarks.tool_binding --turns 30
+
+With search off the graph binds no tools: no schema is sent and the tools
+node is unreachable. With search on the search schema rides along on every
+model call, and a turn where the model decides to search pays a full tool
+round trip on top.
+"""
+import argparse
+import json
+import statistics
+import time
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from benchmarks.fakes import FakeSearchTool, ScriptedChatModel
+from src.backend.chatbot import build_graph
+
+MODES = {
+    # (web_search setting, search calls the model makes when it may)
+    'search_off': (False, 0),
+    'search_on_no_call': (True, 0),
+    'search_on_with_call': (True, 1),
+}
+
+
+def run(mode, args):
+    web_search, tool_rounds = MODES[mode]
+    model = ScriptedChatModel(first_token_latency=args.latency, tokens_per_second=args.tokens_per_second, tool_rounds=tool_rounds)
+    search = FakeSearchTool(latency=args.tool_latency)
+    graph = build_graph(model, [search], InMemorySaver())
+    latencies = []
+    for i in range(args.turns):
+        inputs = {'messages': [HumanMessage(content=f"question {i}")], 'settings': {'web_search': web_search}}
+        started = time.perf_counter()
+        graph.invoke(inputs, {'configurable': {'thread_id': f"{mode}-{i}"}})
+        latencies.append(time.perf_counter() - started)
+    return {
+        'prompt_tokens_per_turn': round(sum(model.prompt_tokens) / args.turns, 1),
+        'model_calls_per_turn': round(len(model.prompt_tokens) / args.turns, 2),
+        'search_calls': search.calls,
+        'latency_p50_ms': round(statistics.median(latencies) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turns', type=int, default=30)
+    parser.add_argument('--latency', type=float, default=0.05, help="fake model delay before its first token")
+    parser.add_argument('--tokens-per-second', type=float, default=500.0)
+    parser.add_argument('--tool-latency', type=float, default=0.3, help="fake search delay")
+    args = parser.parse_args()
+
+    results = {mode: run(mode, args) for mode in MODES}
+    off, on = results['search_off'], results['search_on_no_call']
+    results['schema_tokens_per_turn'] = round(on['prompt_tokens_per_turn'] - off['prompt_tokens_per_turn'], 1)
+    results['search_round_trip_ms'] = round(results['search_on_with_call']['latency_p50_ms'] - off['latency_p50_ms'], 1)
+    results['config'] = vars(args)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
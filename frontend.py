@@ -1,7 +1,14 @@
 import streamlit as st
-from src.backend.chatbot import chatbot
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_groq import ChatGroq
+from src.backend.catalog import load_history_page
+from src.backend.chatbot import catalog, chatbot, tracer
+from src.backend.llm_pool import key_digest, llm_pool
+from src.backend.router import model_router
+from src.backend.scheduler import BACKGROUND, request_scheduler, scheduled
+from langchain_core.messages import AIMessage, HumanMessage
+from pydantic import SecretStr
+from src.frontend.background import BackgroundTasks
+from src.frontend.streaming import StreamRenderer
+import os
 import uuid
 import random
 
@@ -11,10 +18,26 @@ st.set_page_config(page_title="Agentic Chatbot", layout="centered")
 
 
 # === MODEL CONFIG ===
-def get_llm(api_key=None):
-    if api_key:
-        return ChatGroq(model="openai/gpt-oss-120b", api_key=api_key)
-    return ChatGroq(model="openai/gpt-oss-120b")
+# clients are pooled per (model, key) and share HTTP connections across sessions;
+# titles, summaries and greetings go to the router's small tier and queue
+# behind interactive chat for the key's rate limit
+def get_llm(api_key=None, task='title'):
+    model = model_router.for_task(task)
+    return scheduled(llm_pool.get(model, api_key), request_scheduler, api_key, BACKGROUND, model)
+
+
+# set CHATBOT_RENDER_STATS=1 to show render calls / bytes sent under each reply
+RENDER_STATS = os.getenv('CHATBOT_RENDER_STATS') == '1'
+
+
+# === BACKGROUND LLM TASKS ===
+# titles, sidebar summaries and greetings run off the render path, shared by all sessions
+@st.cache_resource
+def get_background_tasks():
+    return BackgroundTasks()
+
+
+background = get_background_tasks()
 
 
 # === THREAD + STATE MGMT ===
@@ -27,6 +50,7 @@ def reset_chat():
     st.session_state['thread_id'] = thread_id
     add_thread(thread_id)
     st.session_state['message_history'] = []
+    st.session_state['history_before'] = None
     st.session_state['thread_titles'][thread_id] = "New Chat"
 
 
@@ -35,12 +59,14 @@ def add_thread(thread_id):
         st.session_state['chat_threads'].append(thread_id)
 
 
-def load_conversation(thread_id):
+# only the latest page of displayable messages is loaded; older pages on demand
+def load_conversation(thread_id, before=None):
     try:
-        state = chatbot.get_state(config={'configurable': {'thread_id': thread_id}})
-        return state.values.get('messages', [])
+        page = load_history_page(catalog, chatbot, thread_id, before=before, owner=key_digest(st.session_state['api_key']))
     except Exception:
-        return []
+        return [], None
+    messages = [{'role': msg['role'], 'content': msg['content']} for msg in page['messages']]
+    return messages, page['next_before']
 
 
 # === CHAT SUMMARIZATION ===
@@ -57,7 +83,7 @@ def llm_summarize_thread(messages, api_key):
     if not messages or not api_key:
         return "New Chat"
     try:
-        llm = get_llm(api_key)
+        llm = get_llm(api_key, 'summary')
         chat_snippet = "\n".join(f"{msg['role']}: {msg['content']}" for msg in messages[-4:])
         summary_prompt = f'Summarize this chat in 5 words or less: {chat_snippet}'
         response = llm.invoke([HumanMessage(content=summary_prompt)])
@@ -66,12 +92,83 @@ def llm_summarize_thread(messages, api_key):
         return summarize_chat(messages)
 
 
+# === THREAD TITLES + GREETING ===
+def heuristic_title(user_input):
+    words = user_input.split()[:3]
+    return " ".join(words) + "..." if len(words) == 3 else " ".join(words)
+
+
+def llm_thread_title(user_input, api_key):
+    try:
+        llm = get_llm(api_key, 'title')
+        summary_prompt = f"Create a short title (max 5 words) for this chat: {user_input}"
+        response = llm.invoke([HumanMessage(content=summary_prompt)])
+        title = response.content.strip().replace('"', '').replace("'", "")
+        return title[:50]
+    except Exception:
+        return heuristic_title(user_input)
+
+
+def llm_greeting(api_key):
+    llm = get_llm(api_key, 'greeting')
+    greeting_prompt = """Give a short, funny/sarcastic greeting message for a chat UI that highlights AI powers. 
+    Make it witty and emphasize artificial intelligence capabilities. Keep it under 20 words."""
+    greeting_response = llm.invoke([HumanMessage(content=greeting_prompt)])
+    return greeting_response.content.strip()
+
+
+# shown until the LLM greeting lands, or instead of it when the call fails
+FALLBACK_GREETINGS = [
+    "Hello! Your new AI overlord is ready to assist... I mean, help you! 🤖👑",
+    "Greetings! I've analyzed 0.003 seconds of data and determined you need my AI expertise 📊",
+    "Welcome back! My neural networks missed you... well, as much as code can miss anyone 🧠💭",
+    "Hi! Ready for some artificial intelligence that's more intelligent than... well, you'll see 😉⚡",
+    "Hello human! My algorithms are warmed up and ready to outthink your coffee-dependent brain ☕🤖",
+    "Welcome! I'm now fully loaded with AI superpowers. Try not to be too intimidated 💪🤖",
+    "Hi! I've processed 47 million parameters while you were entering your API key. Impressive, right? 🚀",
+    "Hello! Ready to experience AI so advanced, it makes autocorrect look like a toddler's toy? 🎯",
+    "Greetings! I'm your AI assistant with more processing power than a small country's government 🌍⚡",
+    "Welcome! My artificial intelligence is now online and slightly judging your typing speed 📈😏"
+]
+
+
+def greeting_key(api_key):
+    # memo key for the greeting job: the key's digest, never the key itself
+    return ('greeting', key_digest(api_key))
+
+
+def show_greeting(greeting_text):
+    st.markdown(
+        f"""
+        <div style='text-align:center; font-size:24px; margin:30px 0; padding:25px; 
+        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+        color: white; border-radius:15px; box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>
+        {greeting_text}
+        </div>
+        """, 
+        unsafe_allow_html=True
+    )
+
+
+@st.fragment(run_every=1)
+def pending_greeting(greeting):
+    # a canned line while the LLM greeting is generated; a full rerun shows it once it lands
+    if greeting.done():
+        st.rerun()
+    show_greeting(st.session_state['fallback_greeting'])
+
+
 # === INIT SESSION ===
 for key, default in {
     'message_history': [],
     'thread_id': generate_thread_id(),
     'chat_threads': [],
     'thread_titles': {},
+    # API key digest the thread list was loaded for
+    'threads_owner': None,
+    'pending_titles': [],
+    'sent_settings': {},
+    'history_before': None,
     'api_key': '',
     'persona': 'Default Assistant',
     'custom_persona': '',
@@ -90,7 +187,9 @@ add_thread(st.session_state['thread_id'])
 # === CHECK API KEY STATUS ===
 if not st.session_state.get('api_key'):
     # === WELCOME MESSAGE (ALWAYS SHOW) ===
-    if not st.session_state['greeted']:
+    # one line per visit, kept across the reruns typing the key causes; 'greeted' is
+    # left for the personalized greeting, which this page only warms up
+    if 'welcome_text' not in st.session_state:
         greeting_messages = [
             "Welcome to Agentic Chatbot! I'm basically a digital genius trapped in your browser 🤖",
             "Hello human! Ready to witness some serious AI magic? ✨",
@@ -109,19 +208,18 @@ if not st.session_state.get('api_key'):
             "Hi! I'm your AI assistant - I don't judge, I don't sleep, but I do roll my digital eyes sometimes 🙄"
         ]
         
-        greeting_text = random.choice(greeting_messages)
+        st.session_state['welcome_text'] = random.choice(greeting_messages)
         
-        st.markdown(
-            f"""
-            <div style='text-align:center; font-size:28px; margin:50px 0; padding:30px; 
-            background: linear-gradient(135deg, #74b9ff 0%, #0984e3 100%); 
-            color: white; border-radius:20px; box-shadow: 0 8px 16px rgba(0,0,0,0.2);'>
-            {greeting_text}
-            </div>
-            """, 
-            unsafe_allow_html=True
-        )
-        st.session_state['greeted'] = True
+    st.markdown(
+        f"""
+        <div style='text-align:center; font-size:28px; margin:50px 0; padding:30px; 
+        background: linear-gradient(135deg, #74b9ff 0%, #0984e3 100%); 
+        color: white; border-radius:20px; box-shadow: 0 8px 16px rgba(0,0,0,0.2);'>
+        {st.session_state['welcome_text']}
+        </div>
+        """, 
+        unsafe_allow_html=True
+    )
     
     # === API KEY INPUT SECTION ===
     st.markdown(
@@ -145,6 +243,9 @@ if not st.session_state.get('api_key'):
             help="Get a free API key at https://console.groq.com",
             key="api_key_input"
         )
+        # warm up the personalized greeting while the user is still on this page
+        if st.session_state['api_key']:
+            background.submit(greeting_key(st.session_state['api_key']), llm_greeting, st.session_state['api_key'])
         
         if st.button("🚀 Start Chatting", use_container_width=True):
             if st.session_state['api_key']:
@@ -172,15 +273,27 @@ if not st.session_state.get('api_key'):
 
 else:
     # === FULL CHATBOT INTERFACE (WHEN API KEY EXISTS) ===
+
+    # threads and titles survive reloads through the persistent catalog,
+    # listed per API key: a session only ever sees the threads of its own key
+    owner = key_digest(st.session_state['api_key'])
+    if st.session_state['threads_owner'] != owner:
+        saved_threads = catalog.list_threads(owner=owner)[::-1]
+        st.session_state['chat_threads'] = [t['thread_id'] for t in saved_threads]
+        st.session_state['thread_titles'] = {t['thread_id']: t['title'] for t in saved_threads}
+        st.session_state['threads_owner'] = owner
+        reset_chat()
     
     # === SIDEBAR SETTINGS ===
-    if st.session_state['message_history'] and st.session_state.get('api_key'):
-        try:
-            sidebar_title = llm_summarize_thread(st.session_state['message_history'], st.session_state['api_key'])
-        except:
-            sidebar_title = summarize_chat(st.session_state['message_history'])
-    else:
-        sidebar_title = summarize_chat(st.session_state['message_history'])
+    # cheap heuristic until the LLM summary for this exact history has landed
+    history = st.session_state['message_history']
+    sidebar_title = summarize_chat(history)
+    if history:
+        sidebar_title = background.get(
+            ('summary', st.session_state['thread_id'], len(history)),
+            llm_summarize_thread, list(history), st.session_state['api_key'],
+            default=sidebar_title
+        )
 
     st.sidebar.title(f"💬 {sidebar_title}")
 
@@ -228,6 +341,13 @@ else:
 
     # === CHAT THREADS IN SIDEBAR ===
     st.sidebar.header('🗂 Chat Threads')
+    for pending_id in list(st.session_state['pending_titles']):
+        title = background.result(('title', pending_id))
+        if title:
+            st.session_state['thread_titles'][pending_id] = title
+            catalog.set_title(pending_id, title)
+            st.session_state['pending_titles'].remove(pending_id)
+
     if st.session_state['chat_threads']:
         for thread_id in st.session_state['chat_threads']:
             title = st.session_state['thread_titles'].get(thread_id, "Untitled Chat")
@@ -239,55 +359,49 @@ else:
             if st.sidebar.button(button_label, key=thread_id):
                 if thread_id != st.session_state['thread_id']:
                     st.session_state['thread_id'] = thread_id
-                    messages = load_conversation(thread_id)
-                    temp_message = []
-                    for msg in messages:
-                        role = 'human' if isinstance(msg, HumanMessage) else 'ai'
-                        temp_message.append({'role': role, 'content': msg.content})
-                    st.session_state['message_history'] = temp_message
+                    messages, before = load_conversation(thread_id)
+                    st.session_state['message_history'] = messages
+                    st.session_state['history_before'] = before
                     st.rerun()
     else:
         st.sidebar.info("No chat threads yet. Start a new conversation and watch my digital magic unfold!")
 
+    # === DEBUG PANEL (CHATBOT_TRACING=1) ===
+    if tracer is not None:
+        with st.sidebar.expander('🐞 Debug: latency'):
+            metrics = tracer.snapshot()
+            st.dataframe(
+                [
+                    {'metric': name, 'count': h['count'], 'p50': h['p50'], 'p90': h['p90'], 'mean': h['mean']}
+                    for name, h in metrics['histograms'].items()
+                ],
+                hide_index=True,
+            )
+            thread_totals = metrics['threads'].get(st.session_state['thread_id'])
+            if thread_totals:
+                st.caption("This thread")
+                st.json(thread_totals)
+
     # === PERSONALIZED GREETING FOR AUTHENTICATED USERS ===
     if not st.session_state['greeted']:
-        try:
-            llm = ChatGroq(model="openai/gpt-oss-120b", api_key=st.session_state['api_key'])
-            greeting_prompt = """Give a short, funny/sarcastic greeting message for a chat UI that highlights AI powers. 
-            Make it witty and emphasize artificial intelligence capabilities. Keep it under 20 words."""
-            greeting_response = llm.invoke([HumanMessage(content=greeting_prompt)])
-            greeting_text = greeting_response.content.strip()
-        except Exception:
-            # Fallback funny greetings focused on AI powers
-            fallback_greetings = [
-                "Hello! Your new AI overlord is ready to assist... I mean, help you! 🤖👑",
-                "Greetings! I've analyzed 0.003 seconds of data and determined you need my AI expertise 📊",
-                "Welcome back! My neural networks missed you... well, as much as code can miss anyone 🧠💭",
-                "Hi! Ready for some artificial intelligence that's more intelligent than... well, you'll see 😉⚡",
-                "Hello human! My algorithms are warmed up and ready to outthink your coffee-dependent brain ☕🤖",
-                "Welcome! I'm now fully loaded with AI superpowers. Try not to be too intimidated 💪🤖",
-                "Hi! I've processed 47 million parameters while you were entering your API key. Impressive, right? 🚀",
-                "Hello! Ready to experience AI so advanced, it makes autocorrect look like a toddler's toy? 🎯",
-                "Greetings! I'm your AI assistant with more processing power than a small country's government 🌍⚡",
-                "Welcome! My artificial intelligence is now online and slightly judging your typing speed 📈😏"
-            ]
-            greeting_text = random.choice(fallback_greetings)
-        
-        st.markdown(
-            f"""
-            <div style='text-align:center; font-size:24px; margin:30px 0; padding:25px; 
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-            color: white; border-radius:15px; box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>
-            {greeting_text}
-            </div>
-            """, 
-            unsafe_allow_html=True
-        )
-        st.session_state['greeted'] = True
+        job_key = greeting_key(st.session_state['api_key'])
+        greeting = background.submit(job_key, llm_greeting, st.session_state['api_key'])
+        if greeting.done():
+            show_greeting(background.result(job_key) or random.choice(FALLBACK_GREETINGS))
+            st.session_state['greeted'] = True
+        else:
+            st.session_state.setdefault('fallback_greeting', random.choice(FALLBACK_GREETINGS))
+            pending_greeting(greeting)
 
     # === DISPLAY MESSAGES ===
     if st.session_state['message_history']:
         st.markdown("---")
+        if st.session_state['history_before'] is not None:
+            if st.button("⬆️ Load older messages"):
+                older, before = load_conversation(st.session_state['thread_id'], st.session_state['history_before'])
+                st.session_state['message_history'] = older + st.session_state['message_history']
+                st.session_state['history_before'] = before
+                st.rerun()
         for msg in st.session_state['message_history']:
             with st.chat_message(msg['role']):
                 st.markdown(msg['content'])
@@ -312,55 +426,53 @@ else:
         st.session_state['message_history'].append({'role': 'human', 'content': user_input})
 
         # Generate thread title if it's a new chat
-        if st.session_state['thread_titles'].get(thread_id) == "New Chat":
-            try:
-                llm = get_llm(st.session_state['api_key'])
-                summary_prompt = f"Create a short title (max 5 words) for this chat: {user_input}"
-                response = llm.invoke([HumanMessage(content=summary_prompt)])
-                title = response.content.strip().replace('"', '').replace("'", "")
-                st.session_state['thread_titles'][thread_id] = title[:50]
-            except Exception:
-                words = user_input.split()[:3]
-                st.session_state['thread_titles'][thread_id] = " ".join(words) + "..." if len(words) == 3 else " ".join(words)
+        # (placeholder title now, the LLM one is picked up on a later rerun)
+        if st.session_state['thread_titles'].get(thread_id, "New Chat") == "New Chat":
+            st.session_state['thread_titles'][thread_id] = heuristic_title(user_input)
+            catalog.create_thread(thread_id, st.session_state['thread_titles'][thread_id], owner)
+            background.submit(('title', thread_id), llm_thread_title, user_input, st.session_state['api_key'])
+            st.session_state['pending_titles'].append(thread_id)
 
         # Configure the chatbot
-        CONFIG = {'configurable': {'thread_id': thread_id}}
-
-        # Build the system message with web search status
-        web_status = "✅ Web search enabled - You can access current information" if st.session_state['include_search'] else "❌ Web search disabled - Use only your training data"
-        full_prompt = f"""
-System Instructions: {st.session_state['system_prompt']}
-
-Persona: Act as a {st.session_state['persona']}.
-
-Web Search Status: {web_status}
-
-Remember to be helpful, accurate, and maintain the specified persona throughout the conversation.
-        """.strip()
-
-        messages = [
-            SystemMessage(content=full_prompt),
-            HumanMessage(content=user_input)
-        ]
+        # SecretStr keeps the key out of the checkpoint metadata
+        CONFIG = {'configurable': {'thread_id': thread_id, 'api_key': SecretStr(st.session_state['api_key'])}}
+
+        # Persona, prompt and search flag are stored once per thread in the graph
+        # state and only re-sent when they change
+        settings = {
+            'system_prompt': st.session_state['system_prompt'],
+            'persona': st.session_state['persona'],
+            'web_search': st.session_state['include_search'],
+        }
+        turn_input = {'messages': [HumanMessage(content=user_input)]}
+        if st.session_state['sent_settings'].get(thread_id) != settings:
+            turn_input['settings'] = settings
 
         # Stream AI response
         try:
-            ai_response = ""
-            
             with st.chat_message('ai'):
-                response_container = st.empty()
+                renderer = StreamRenderer(st.empty(), measure=RENDER_STATS or tracer is not None)
                 
                 for message_chunk, meta_data in chatbot.stream(
-                    {'messages': messages},
+                    turn_input,
                     config=CONFIG,
                     stream_mode='messages'
                 ):
-                    if hasattr(message_chunk, 'content') and message_chunk.content:
-                        ai_response += message_chunk.content
-                        response_container.markdown(ai_response + "▌")
+                    # only the answer tokens, not tool results
+                    if meta_data.get('langgraph_node') == 'chat_node' and isinstance(message_chunk, AIMessage):
+                        renderer.write(message_chunk.content)
                 
-                response_container.markdown(ai_response)
+                ai_response = renderer.close()
+                st.session_state['sent_settings'][thread_id] = settings
+                if tracer is not None:
+                    tracer.observe('render_ms', renderer.stats['render_seconds'] * 1000)
+                if RENDER_STATS:
+                    st.caption(
+                        f"{renderer.stats['chunks']} chunks · {renderer.stats['render_calls']} renders · "
+                        f"{renderer.stats['bytes_sent']:,} bytes sent"
+                    )
             
+            # the graph records the turn in the catalog itself
             if ai_response.strip():
                 st.session_state['message_history'].append({'role': 'ai', 'content': ai_response})
             else:
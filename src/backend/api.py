@@ -0,0 +1,181 @@
+import json
+import uuid
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from langchain_core.messages import AIMessage, HumanMessage
+from src.backend.catalog import DEFAULT_PAGE_SIZE, load_history_page
+
+
+# === SCHEMAS ===
+class ThreadCreate(BaseModel):
+    title: str = "New Chat"
+    # owner of the thread; only requests with the same user_id see it
+    user_id: str | None = None
+
+
+class Thread(BaseModel):
+    thread_id: str
+    title: str
+    created_at: str
+    updated_at: str
+    message_count: int
+    preview: str
+
+
+class MessageIn(BaseModel):
+    content: str
+    system_prompt: str | None = None
+    web_search: bool | None = None
+    # owns the thread and scopes long-term memory; without it the turn neither recalls nor is remembered
+    user_id: str | None = None
+
+
+class Message(BaseModel):
+    role: str
+    content: str
+    seq: int | None = None
+
+
+class HistoryPage(BaseModel):
+    messages: list[Message]
+    has_more: bool
+    next_before: int | None
+
+
+class Reply(BaseModel):
+    thread_id: str
+    message: Message
+
+
+# === HELPERS ===
+def thread_config(thread_id, user_id=None):
+    configurable = {'thread_id': thread_id}
+    if user_id:
+        configurable['user_id'] = user_id
+    return {'configurable': configurable}
+
+
+def turn_input(body):
+    inputs = {'messages': [HumanMessage(content=body.content)]}
+    # stored once as thread settings rather than as a message in the history
+    settings = {}
+    if body.system_prompt:
+        settings['system_prompt'] = body.system_prompt
+    if body.web_search is not None:
+        settings['web_search'] = body.web_search
+    if settings:
+        inputs['settings'] = settings
+    return inputs
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+# === APP ===
+def create_app(graph=None, catalog=None, tracer=None):
+    """Build the HTTP API around a compiled chatbot graph.
+
+    ``graph``, ``catalog`` and ``tracer`` default to the ones in
+    ``src.backend.chatbot``; pass others (e.g. a graph built with a stub model
+    and an in-memory catalog) to serve or test them instead. The graph records
+    each finished turn in the display history, so build it with the same
+    ``catalog``. Threads belong to the ``user_id`` that created them; another
+    caller gets a 404.
+    """
+    app = FastAPI(title="Agentic Chatbot API")
+    app.state.graph = graph
+    app.state.catalog = catalog
+    app.state.tracer = tracer
+
+    def get_graph():
+        if app.state.graph is None:
+            from src.backend.chatbot import chatbot
+            app.state.graph = chatbot
+        return app.state.graph
+
+    # catalog calls are blocking SQLite: handlers run them in the threadpool, never on the event loop
+    def get_catalog():
+        if app.state.catalog is None:
+            from src.backend.chatbot import catalog
+            app.state.catalog = catalog
+        return app.state.catalog
+
+    def get_tracer():
+        # a caller-supplied graph carries its own tracer (or none)
+        if app.state.tracer is None and graph is None:
+            from src.backend.chatbot import tracer
+            app.state.tracer = tracer
+        return app.state.tracer
+
+    @app.get('/metrics')
+    async def metrics():
+        from src.backend.scheduler import request_scheduler
+        tracer = get_tracer()
+        # queue depth and retries are tracked even with tracing off
+        if tracer is None:
+            return {'enabled': False, 'scheduler': request_scheduler.stats()}
+        return {'enabled': True, **tracer.snapshot(), 'scheduler': request_scheduler.stats()}
+
+    async def check_owner(thread_id, user_id, missing_ok=True):
+        thread = await run_in_threadpool(get_catalog().get_thread, thread_id)
+        if (thread is None and not missing_ok) or (thread is not None and thread['owner'] != user_id):
+            raise HTTPException(status_code=404, detail="Thread not found")
+
+    @app.post('/threads', response_model=Thread, status_code=201)
+    async def create_thread(body: ThreadCreate | None = None):
+        body = body or ThreadCreate()
+        return await run_in_threadpool(get_catalog().create_thread, str(uuid.uuid4()), body.title, body.user_id)
+
+    @app.get('/threads', response_model=list[Thread])
+    async def list_threads(limit: int = Query(50, ge=1, le=500), offset: int = Query(0, ge=0), user_id: str | None = None):
+        return await run_in_threadpool(get_catalog().list_threads, limit=limit, offset=offset, owner=user_id)
+
+    @app.get('/threads/{thread_id}/messages', response_model=HistoryPage)
+    async def get_history(thread_id: str, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=500), before: int | None = None,
+                          user_id: str | None = None):
+        page = await run_in_threadpool(load_history_page, get_catalog(), get_graph(), thread_id, limit, before, user_id)
+        if not page['messages']:
+            await check_owner(thread_id, user_id, missing_ok=False)
+        return page
+
+    @app.post('/threads/{thread_id}/messages', response_model=Reply)
+    async def post_message(thread_id: str, body: MessageIn):
+        await check_owner(thread_id, body.user_id)
+        result = await get_graph().ainvoke(turn_input(body), config=thread_config(thread_id, body.user_id))
+        reply = str(result['messages'][-1].content)
+        return Reply(thread_id=thread_id, message=Message(role='assistant', content=reply))
+
+    @app.post('/threads/{thread_id}/stream')
+    async def stream_message(thread_id: str, body: MessageIn):
+        await check_owner(thread_id, body.user_id)
+
+        async def events():
+            try:
+                async for message_chunk, metadata in get_graph().astream(
+                    turn_input(body),
+                    config=thread_config(thread_id, body.user_id),
+                    stream_mode='messages',
+                ):
+                    # only the answer itself, not tool results or tool-call deltas
+                    if metadata.get('langgraph_node') != 'chat_node':
+                        continue
+                    if isinstance(message_chunk, AIMessage) and message_chunk.content:
+                        yield sse('token', {'content': message_chunk.content})
+                yield sse('done', {'thread_id': thread_id})
+            except Exception as e:
+                yield sse('error', {'detail': str(e)})
+
+        return StreamingResponse(
+            events(),
+            media_type='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        )
+
+    return app
+
+
+# uvicorn src.backend.api:app
+app = create_app()
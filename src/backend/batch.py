@@ -0,0 +1,322 @@
+"""Replay a JSONL file of prompts or conversations through the chatbot graph.
+
+    python -m src.backend.batch prompts.jsonl --out results.jsonl --concurrency 16
+    python -m src.backend.batch prompts.jsonl --out results.jsonl --resume
+    python -m src.backend.batch prompts.jsonl --out results.jsonl --stub   # offline
+
+Each input line is an object with an ``id`` (the line number otherwise) and
+either a ``prompt`` or a list of user ``turns`` replayed in order on one
+thread. Optional ``settings`` (``system_prompt``, ``persona``,
+``web_search``) apply to that item; with --persistent an item may name the
+``thread_id`` to continue. Any other fields (e.g. an expected answer) are
+copied to its output line next to ``replies`` and ``latency_ms``, or
+``error`` when it failed. --resume skips ids already answered in --out and
+retries failed ones, so take the last line per id. Throughput and latency
+percentiles are printed as JSON at the end.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from src.backend.telemetry import Histogram
+
+
+# === BATCH CONFIG ===
+MAX_CONCURRENCY = int(os.getenv('CHATBOT_BATCH_CONCURRENCY', '16'))
+# progress is reported every this many concurrencies' worth of finished items
+PROGRESS_FACTOR = 4
+# item fields the runner consumes; everything else is copied to the output
+ITEM_FIELDS = ('id', 'prompt', 'turns', 'settings', 'thread_id')
+
+
+def read_items(path, skip=()):
+    """Items of a JSONL file one at a time, minus the ids in ``skip``.
+
+    A line that is not a JSON object comes back as an item with an
+    ``error``, so it is reported in the output instead of stopping the run.
+    """
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                item = {'error': f"invalid JSON: {e}"}
+            if not isinstance(item, dict):
+                item = {'error': "expected a JSON object"}
+            item['id'] = str(item.get('id', f"line-{number}"))
+            if item['id'] not in skip:
+                yield item
+
+
+def answered_ids(path):
+    """Ids with a successful line in an earlier output file."""
+    answered = set()
+    if not os.path.exists(path):
+        return answered
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # the line a crash cut short
+                continue
+            if not record.get('error'):
+                answered.add(record['id'])
+    return answered
+
+
+def item_turns(item):
+    if 'error' in item:
+        raise ValueError(item['error'])
+    if 'prompt' in item:
+        return [str(item['prompt'])]
+    if isinstance(item.get('turns'), list) and item['turns']:
+        return [str(turn) for turn in item['turns']]
+    raise ValueError("an item needs a 'prompt' or a non-empty list of 'turns'")
+
+
+class TurnTimer(BaseCallbackHandler):
+    """Wall time of each graph run, summed per batch item (config metadata 'batch_item')."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.started = {}
+        self.seconds = {}
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        if parent_run_id is None and metadata and 'batch_item' in metadata:
+            self.started[run_id] = (metadata['batch_item'], time.perf_counter())
+
+    def _finish(self, run_id):
+        item_id, started = self.started.pop(run_id, (None, None))
+        if item_id is not None:
+            self.seconds[item_id] = self.seconds.get(item_id, 0.0) + time.perf_counter() - started
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+
+class BatchRunner:
+    """Runs batch items through a compiled chatbot graph, ``concurrency`` at a time.
+
+    A sliding pool: ``concurrency`` workers each take the next item from the
+    lazily read input, replay its turns in order on its thread and write
+    its output line as soon as it finishes, then take another. A slow item
+    holds up only its own worker, and memory follows the concurrency
+    rather than the input size. Threads are ephemeral, deleted once their
+    item is done, unless ``persistent``; then they stay in the graph's
+    checkpointer and, given a ``catalog``, show up in the thread list.
+    Latencies go to fixed-bucket histograms.
+    """
+
+    def __init__(self, graph, concurrency=MAX_CONCURRENCY, persistent=False, run_id=None, settings=None,
+                 catalog=None, progress_every=None):
+        self.graph = graph
+        self.concurrency = concurrency
+        self.persistent = persistent
+        self.run_id = run_id or uuid.uuid4().hex[:8]
+        self.settings = settings or {}
+        self.catalog = catalog
+        self.progress_every = progress_every or concurrency * PROGRESS_FACTOR
+        self.timer = TurnTimer()
+        self.item_ms = Histogram()
+        self.turn_ms = Histogram()
+        self.counters = {'items': 0, 'ok': 0, 'failed': 0, 'skipped': 0, 'turns': 0}
+        self.seconds = 0.0
+
+    # === THREADS ===
+    def thread_id(self, item):
+        if self.persistent and item.get('thread_id'):
+            return str(item['thread_id'])
+        return f"batch-{self.run_id}-{item['id']}"
+
+    def _delete_thread(self, thread_id):
+        self.graph.checkpointer.delete_thread(thread_id)
+        if self.catalog is not None:
+            self.catalog.delete_thread(thread_id)
+
+    def _open(self, job):
+        if not self.persistent:
+            return
+        if not job['item'].get('thread_id'):
+            # a generated thread belongs to this run: a resumed item starts over
+            self._delete_thread(job['thread_id'])
+        if self.catalog is not None:
+            self.catalog.create_thread(job['thread_id'], title=f"Batch {self.run_id}: {job['item']['id']}")
+
+    def _close(self, job):
+        if not self.persistent:
+            self._delete_thread(job['thread_id'])
+
+    # === ITEMS ===
+    def _config(self, job):
+        return {
+            'configurable': {'thread_id': job['thread_id']},
+            'metadata': {'batch_item': job['item']['id']},
+            'callbacks': [self.timer],
+        }
+
+    def _input(self, job, turn):
+        inputs = {'messages': [HumanMessage(content=job['turns'][turn])]}
+        if turn == 0:
+            settings = {**self.settings, **(job['item'].get('settings') or {})}
+            if settings:
+                inputs['settings'] = settings
+        return inputs
+
+    async def _run_item(self, item):
+        """Every turn of ``item`` in order on its thread; returns its output record."""
+        job = {'item': item, 'thread_id': self.thread_id(item), 'replies': [], 'error': None}
+        try:
+            job['turns'] = item_turns(item)
+        except ValueError as e:
+            job['turns'], job['error'] = [], str(e)
+        else:
+            self._open(job)
+
+        for turn in range(len(job['turns'])):
+            self.counters['turns'] += 1
+            try:
+                result = await self.graph.ainvoke(self._input(job, turn), self._config(job))
+            except Exception as e:
+                job['error'] = f"{type(e).__name__}: {e}"
+                break
+            job['replies'].append(str(result['messages'][-1].content))
+
+        seconds = self.timer.seconds.pop(item['id'], 0.0)
+        record = {**{k: v for k, v in item.items() if k not in ITEM_FIELDS}, 'id': item['id']}
+        if self.persistent:
+            record['thread_id'] = job['thread_id']
+        record['replies'] = job['replies']
+        record['latency_ms'] = round(seconds * 1000, 2)
+        if job['error'] is not None:
+            record['error'] = job['error']
+            self.counters['failed'] += 1
+        else:
+            self.counters['ok'] += 1
+            self.item_ms.observe(seconds * 1000)
+            self.turn_ms.observe(seconds * 1000 / len(job['turns']))
+        if job['turns']:
+            self._close(job)
+        self.counters['items'] += 1
+        return record
+
+    async def run(self, source, out, resume=False, progress=None):
+        """Run every item of ``source`` into the JSONL file ``out``; returns ``stats()``."""
+        skip = answered_ids(out) if resume else set()
+        self.counters['skipped'] = len(skip)
+        items = read_items(source, skip)
+        started = time.perf_counter()
+
+        with open(out, 'a' if resume else 'w') as f:
+            if resume and f.tell() and not self._ends_with_newline(out):
+                f.write('\n')
+
+            async def worker():
+                # one event loop: pulling the next item and writing a line never interleave
+                for item in items:
+                    f.write(json.dumps(await self._run_item(item)) + '\n')
+                    f.flush()
+                    self.seconds = time.perf_counter() - started
+                    if progress is not None and self.counters['items'] % self.progress_every == 0:
+                        progress(self.stats())
+
+            await asyncio.gather(*(worker() for _ in range(max(self.concurrency, 1))))
+        self.seconds = time.perf_counter() - started
+        if progress is not None and self.counters['items'] % self.progress_every:
+            progress(self.stats())
+        return self.stats()
+
+    @staticmethod
+    def _ends_with_newline(path):
+        with open(path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def stats(self):
+        def latency(histogram):
+            snapshot = histogram.snapshot()
+            snapshot.pop('buckets')
+            return snapshot
+
+        return {
+            **self.counters,
+            'seconds': round(self.seconds, 3),
+            'items_per_second': round(self.counters['items'] / self.seconds, 2) if self.seconds else 0.0,
+            'turns_per_second': round(self.counters['turns'] / self.seconds, 2) if self.seconds else 0.0,
+            'item_latency_ms': latency(self.item_ms),
+            'turn_latency_ms': latency(self.turn_ms),
+        }
+
+
+# === CLI ===
+def build_batch_graph(args, base_url=None):
+    """Production graph for a batch run; with ``base_url`` every call goes to that stub endpoint."""
+    from src.backend.chatbot import build_chatbot, default_tools
+    from src.backend.checkpoint import make_checkpointer
+    from src.backend.llm_pool import DEFAULT_MODEL, LLMPool
+
+    checkpointer = make_checkpointer() if args.persistent else InMemorySaver()
+    if base_url is not None:
+        # no provider limits, tiers or search offline: one client for the stub
+        pool = LLMPool(base_url=base_url)
+        model = args.model or DEFAULT_MODEL
+        return build_chatbot(model, llm=pool.get(model, 'stub-key'), tools=[], checkpointer=checkpointer,
+                             pool=pool, router=None, scheduler=None)
+    # no long-term memory or response cache: a replay must neither read nor leave traces
+    return build_chatbot(args.model, tools=default_tools() if args.web_search else [], checkpointer=checkpointer)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('input', help="JSONL file of prompts or conversations")
+    parser.add_argument('--out', required=True, help="JSONL file the results are streamed to")
+    parser.add_argument('--concurrency', type=int, default=MAX_CONCURRENCY, help="graph runs in flight")
+    parser.add_argument('--resume', action='store_true', help="skip items already answered in --out")
+    parser.add_argument('--persistent', action='store_true', help="keep threads in the checkpoint database")
+    parser.add_argument('--run-id', help="names generated threads batch-<run id>-<item id> (default: --out file name)")
+    parser.add_argument('--model', help="answer every turn with this model (default: routed across tiers)")
+    parser.add_argument('--web-search', action='store_true', help="let the model search")
+    parser.add_argument('--stub', action='store_true', help="answer from a local stub model instead of Groq")
+    parser.add_argument('--stub-latency', type=float, default=0.05, help="stub response delay in seconds")
+    args = parser.parse_args()
+
+    run_id = args.run_id or os.path.splitext(os.path.basename(args.out))[0]
+
+    def progress(stats):
+        print(f"{stats['items']} items ({stats['failed']} failed), {stats['items_per_second']}/s", file=sys.stderr)
+
+    def run(base_url=None):
+        catalog = None
+        if args.persistent:
+            from src.backend.catalog import ThreadCatalog
+            catalog = ThreadCatalog()
+        runner = BatchRunner(
+            build_batch_graph(args, base_url), concurrency=args.concurrency, persistent=args.persistent,
+            run_id=run_id, settings={'web_search': args.web_search}, catalog=catalog,
+        )
+        return asyncio.run(runner.run(args.input, args.out, resume=args.resume, progress=progress))
+
+    if args.stub:
+        from src.backend.stub_provider import StubProvider
+        with StubProvider(latency=args.stub_latency) as stub:
+            stats = run(stub.base_url)
+    else:
+        stats = run()
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == '__main__':
+    main()
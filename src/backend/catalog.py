@@ -0,0 +1,176 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from langchain_core.messages import AIMessage, HumanMessage
+from src.backend.checkpoint import DEFAULT_DB_PATH
+
+
+# === CATALOG CONFIG ===
+PREVIEW_CHARS = 80
+DEFAULT_PAGE_SIZE = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    preview TEXT NOT NULL DEFAULT '',
+    owner TEXT
+);
+CREATE TABLE IF NOT EXISTS thread_messages (
+    thread_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (thread_id, seq)
+);
+"""
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def displayable(messages):
+    """(role, content) pairs a chat UI shows: user turns and assistant text, no tool traffic."""
+    result = []
+    for msg in messages:
+        if isinstance(msg, HumanMessage):
+            result.append(('user', str(msg.content)))
+        elif isinstance(msg, AIMessage) and msg.content:
+            result.append(('assistant', str(msg.content)))
+    return result
+
+
+class ThreadCatalog:
+    """Indexed list of threads plus their displayable messages, stored in SQLite.
+
+    It lives in the checkpoint database by default. Checkpoints hold each
+    thread's full state as one blob, so reading a page of history from them
+    costs the whole thread. The catalog keeps one row per displayed message,
+    which makes ``history_page`` cost the same for 10 or 1,000 messages.
+
+    Each thread has an ``owner`` (``llm_pool.caller_id``: a user id or a
+    digest of the API key, None for anonymous callers). Listing and history
+    only show threads of the owner asked for.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        if path != ':memory:' and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+        # catalogs created before threads had owners: their threads become anonymous
+        columns = {row['name'] for row in self.conn.execute('PRAGMA table_info(threads)')}
+        if 'owner' not in columns:
+            self.conn.execute('ALTER TABLE threads ADD COLUMN owner TEXT')
+        self.conn.execute('DROP INDEX IF EXISTS threads_updated_at')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS threads_owner_updated_at ON threads (owner, updated_at DESC)')
+        self.lock = threading.Lock()
+
+    # === THREADS ===
+    def create_thread(self, thread_id, title="New Chat", owner=None):
+        now = now_iso()
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT OR IGNORE INTO threads (thread_id, title, created_at, updated_at, owner) VALUES (?, ?, ?, ?, ?)',
+                (thread_id, title, now, now, owner),
+            )
+        return self.get_thread(thread_id)
+
+    def get_thread(self, thread_id):
+        with self.lock:
+            row = self.conn.execute('SELECT * FROM threads WHERE thread_id = ?', (thread_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list_threads(self, limit=50, offset=0, owner=None):
+        """Most recently updated threads of ``owner`` (None: the anonymous ones)."""
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT * FROM threads WHERE owner IS ? ORDER BY updated_at DESC LIMIT ? OFFSET ?', (owner, limit, offset)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def set_title(self, thread_id, title):
+        with self.lock, self.conn:
+            self.conn.execute('UPDATE threads SET title = ? WHERE thread_id = ?', (title, thread_id))
+
+    def delete_thread(self, thread_id):
+        with self.lock, self.conn:
+            self.conn.execute('DELETE FROM thread_messages WHERE thread_id = ?', (thread_id,))
+            self.conn.execute('DELETE FROM threads WHERE thread_id = ?', (thread_id,))
+
+    # === MESSAGES ===
+    def _message_count(self, thread_id):
+        return self.conn.execute('SELECT message_count FROM threads WHERE thread_id = ?', (thread_id,)).fetchone()[0]
+
+    def _insert(self, thread_id, count, messages):
+        self.conn.executemany(
+            'INSERT INTO thread_messages (thread_id, seq, role, content) VALUES (?, ?, ?, ?)',
+            [(thread_id, count + i, role, content) for i, (role, content) in enumerate(messages)],
+        )
+        self.conn.execute(
+            'UPDATE threads SET message_count = ?, preview = ?, updated_at = ? WHERE thread_id = ?',
+            (count + len(messages), messages[-1][1][:PREVIEW_CHARS], now_iso(), thread_id),
+        )
+
+    def append_messages(self, thread_id, messages, owner=None):
+        """Record ``(role, content)`` pairs at the end of the thread."""
+        if not messages:
+            return
+        self.create_thread(thread_id, owner=owner)
+        with self.lock, self.conn:
+            self._insert(thread_id, self._message_count(thread_id), messages)
+
+    def sync_messages(self, thread_id, messages, owner=None):
+        """Catch the thread up with ``messages``, all of its ``(role, content)`` pairs so far.
+
+        Only the pairs past the catalog's message count are written, so a turn
+        nobody recorded (a dropped stream, a failed turn) is caught up by the
+        next one and a recorded one is never written twice.
+        """
+        if not messages:
+            return
+        self.create_thread(thread_id, owner=owner)
+        with self.lock, self.conn:
+            count = self._message_count(thread_id)
+            if len(messages) > count:
+                self._insert(thread_id, count, messages[count:])
+
+    def history_page(self, thread_id, limit=DEFAULT_PAGE_SIZE, before=None, owner=None):
+        """The ``limit`` messages preceding sequence number ``before`` (the latest ones by default).
+
+        Returns ``{'messages': [...oldest first], 'has_more': bool, 'next_before': seq | None}``;
+        pass ``next_before`` back as ``before`` to fetch the previous page. A thread
+        of another owner has no messages.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT seq, role, content FROM thread_messages WHERE thread_id = ? AND seq < ? '
+                'AND EXISTS (SELECT 1 FROM threads WHERE thread_id = ? AND owner IS ?) '
+                'ORDER BY seq DESC LIMIT ?',
+                (thread_id, before if before is not None else 2 ** 62, thread_id, owner, limit),
+            ).fetchall()
+        messages = [dict(row) for row in reversed(rows)]
+        first = messages[0]['seq'] if messages else 0
+        return {'messages': messages, 'has_more': first > 0, 'next_before': first if first > 0 else None}
+
+    def has_messages(self, thread_id):
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT 1 FROM thread_messages WHERE thread_id = ? LIMIT 1', (thread_id,)
+            ).fetchone()
+        return row is not None
+
+
+def load_history_page(catalog, graph, thread_id, limit=DEFAULT_PAGE_SIZE, before=None, owner=None):
+    """Page of ``owner``'s thread, importing threads that predate the catalog from their checkpoint once."""
+    if before is None and not catalog.has_messages(thread_id):
+        state = graph.get_state({'configurable': {'thread_id': thread_id}})
+        catalog.append_messages(thread_id, displayable(state.values.get('messages', [])), owner)
+    return catalog.history_page(thread_id, limit=limit, before=before, owner=owner)
@@ -1,51 +1,392 @@
+import asyncio
+import logging
 import os
+import threading
+import time
 from dotenv import load_dotenv
 load_dotenv()
 from langgraph.graph import START, END, StateGraph
-from langchain_groq import ChatGroq
 from typing import TypedDict, Annotated
-from langchain_core.messages import BaseMessage
-from langgraph.checkpoint.memory import InMemorySaver
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.graph.message import add_messages
-from langchain_community.tools.tavily_search import TavilySearchResults
-from langgraph.prebuilt import ToolNode
-from langgraph.prebuilt import tools_condition
+from src.backend.catalog import ThreadCatalog, displayable
+from src.backend.checkpoint import make_checkpointer
+from src.backend.llm_pool import DEFAULT_MODEL, api_key_from_config, caller_id, llm_pool
+from src.backend.memory import LongTermMemory, memory_namespace, memory_note, turn_snippet
+from src.backend.router import model_router
+from src.backend.scheduler import INTERACTIVE, request_scheduler, scheduled
+from src.backend.search_cache import cached_search
+from src.backend.semantic_cache import SemanticCache, cache_scope, is_context_dependent
+from src.backend.settings import (
+    merge_settings,
+    migrate_system_messages,
+    render_system_prompt,
+    system_message,
+    web_search_enabled,
+)
+from src.backend.telemetry import make_tracer
+from src.backend.tool_engine import ToolExecutor
+from src.backend.context import (
+    asummarize_messages,
+    build_prompt,
+    get_max_prompt_tokens,
+    history_messages,
+    messages_after,
+    select_evictions,
+    summarize_messages,
+)
 
-search_tool = TavilySearchResults(max_results = 3)
-tools = [search_tool]
 
-llm=ChatGroq(model="openai/gpt-oss-120b")
+logger = logging.getLogger(__name__)
 
-llm_with_tools = llm.bind_tools(tools)
 
 class ChatState(TypedDict):
     messages : Annotated[list[BaseMessage], add_messages]
+    # rolling summary of the turns that fell out of the prompt window
+    summary : str
+    # id of the last message already folded into the summary
+    summary_until : str
+    # persona / system prompt / search flags, rendered into the system message per call;
+    # each update is merged into the stored settings
+    settings : Annotated[dict, merge_settings]
+    # long-term memory snippets recalled for the current turn
+    recalled : str
+    # wall-clock start of the current turn
+    turn_started_at : float
+    # model the router picked on the turn's first call, reused by its tool rounds
+    turn_model : str
 
 
-def chat_node(state: ChatState):
-    messages = state['messages']
-    response = llm_with_tools.invoke(messages)
-    return {'messages' : [response]}
+def build_graph(llm, tools, checkpointer=None, pool=None, model=DEFAULT_MODEL, memory=None, response_cache=None, tracer=None,
+                tool_executor=None, router=None, scheduler=None, catalog=None):
+    if llm is None and pool is None:
+        raise ValueError("build_graph needs an llm or a pool to get clients from")
+    # summaries are internal, keep their tokens out of stream_mode='messages'
+    summarizer = llm.with_config(tags=['nostream']) if llm is not None else None
+    # tool subsets bound to the default client, one per distinct selection
+    bound = {}
+    bound_lock = threading.Lock()
 
+    # round cap, deadlines and concurrency limit for the tools node
+    executor = tool_executor or ToolExecutor(tools)
 
-checkpointer = InMemorySaver()
+    def enabled_tools(state, config):
+        """Tools this request may use: none with web search off, else the configurable 'tools' allowlist."""
+        if not web_search_enabled(state.get('settings')):
+            return []
+        allowlist = (config or {}).get('configurable', {}).get('tools')
+        return [tool for tool in tools if allowlist is None or tool.name in allowlist]
 
+    def bind(client, selected):
+        # no tools: the plain client, so no schema is sent and no call can come back
+        return client.bind_tools(selected) if selected else client
 
-graph = StateGraph(state_schema=ChatState)
+    def pooled(config):
+        # a caller-supplied key (configurable 'api_key') gets its own pooled client;
+        # routing needs the pool too, since each tier is a different client; without
+        # an llm of its own the graph gets even the default client from the pool, on first use
+        return pool is not None and (llm is None or router is not None or api_key_from_config(config))
 
-graph.add_node('chat_node',chat_node)
-graph.add_node('tools',ToolNode(tools))
+    def shaped(runnable, config, chosen):
+        # rate limits, priorities and retries per API key and model
+        if scheduler is None:
+            return runnable
+        return scheduled(runnable, scheduler, api_key_from_config(config), INTERACTIVE, chosen)
 
+    def chat_model(state, config):
+        """(runnable for this call, its model, state update); the update records the turn's routed model."""
+        # a spent tool budget leaves the model nothing to call, so it has to answer
+        selected = [] if executor.exhausted(state) else enabled_tools(state, config)
+        variant = 'tools:' + ','.join(tool.name for tool in selected)
+        if not pooled(config):
+            with bound_lock:
+                if variant not in bound:
+                    bound[variant] = bind(llm, selected)
+                return shaped(bound[variant], config, model), model, {}
+        chosen, update = model, {}
+        if router is not None:
+            # decided once per turn, before any tool round; later rounds reuse it
+            if isinstance(state['messages'][-1], HumanMessage) or not state.get('turn_model'):
+                chosen = router.route(state['messages'], config, tools_enabled=bool(enabled_tools(state, config)))
+                update = {'turn_model': chosen}
+            else:
+                chosen = state['turn_model']
+        runnable = pool.variant(chosen, api_key_from_config(config), variant, lambda client: bind(client, selected))
+        return shaped(runnable, config, chosen), chosen, update
 
-graph.add_edge(START,'chat_node')
-graph.add_conditional_edges('chat_node',tools_condition)
-graph.add_edge('tools','chat_node')
-graph.add_edge('chat_node',END)
+    def summary_model(config):
+        if not pooled(config):
+            return shaped(summarizer, config, model)
+        chosen = router.for_task('summarize') if router is not None else model
+        return shaped(pool.variant(chosen, api_key_from_config(config), 'summarizer', lambda client: client.with_config(tags=['nostream'])), config, chosen)
 
+    def plan_context(state, config):
+        # strip system messages stored by older clients, then see what overflows
+        update = migrate_system_messages(state['messages'], state.get('settings'))
+        evicted = select_evictions(
+            state['messages'],
+            state.get('summary_until'),
+            get_max_prompt_tokens(config),
+            system_message(update.get('settings', state.get('settings'))),
+        )
+        if evicted:
+            update['summary_until'] = evicted[-1].id
+        if isinstance(state['messages'][-1], HumanMessage):
+            update['turn_started_at'] = time.time()
+        return update, evicted
 
-chatbot = graph.compile(checkpointer=checkpointer)
+    def summary_failed(update, error, config):
+        # the turn still gets answered: summary and summary_until stay as they were,
+        # build_prompt trims the window instead and the next turn tries again
+        update.pop('summary_until', None)
+        logger.warning("summary failed thread=%s: %s", config.get('configurable', {}).get('thread_id'), error)
+        return update
 
+    def context_node(state: ChatState, config: RunnableConfig):
+        update, evicted = plan_context(state, config)
+        if evicted:
+            try:
+                update['summary'] = summarize_messages(summary_model(config), state.get('summary', ''), evicted)
+            except Exception as e:
+                return summary_failed(update, e, config)
+        return update
 
+    async def acontext_node(state: ChatState, config: RunnableConfig):
+        update, evicted = plan_context(state, config)
+        if evicted:
+            try:
+                update['summary'] = await asummarize_messages(summary_model(config), state.get('summary', ''), evicted)
+            except Exception as e:
+                return summary_failed(update, e, config)
+        return update
 
+    def prompt_for(state, config):
+        system = system_message(state.get('settings'))
+        if state.get('recalled'):
+            system = SystemMessage(content=f"{system.content}\n\n{state['recalled']}")
+        return build_prompt(
+            state['messages'],
+            state.get('summary', ''),
+            state.get('summary_until'),
+            get_max_prompt_tokens(config),
+            system,
+        )
 
+    def recall_node(state: ChatState, config: RunnableConfig):
+        question = state['messages'][-1]
+        if not isinstance(question, HumanMessage):
+            return {}  # still inside this turn's tool loop
+        namespace = memory_namespace(config)
+        if namespace is None:
+            return {'recalled' : ''}
+        # turns still in the prompt window are already visible to the model
+        live = messages_after(history_messages(state['messages']), state.get('summary_until'))
+        hits = memory.search(str(question.content), namespace, exclude_message_ids=[msg.id for msg in live])
+        return {'recalled' : memory_note(hits)}
 
+    def remember_node(state: ChatState, config: RunnableConfig):
+        answer = state['messages'][-1]
+        question = next((msg for msg in reversed(state['messages']) if isinstance(msg, HumanMessage)), None)
+        namespace = memory_namespace(config)
+        if namespace is not None and question is not None and answer.content:
+            memory.add(
+                namespace,
+                config['configurable'].get('thread_id', ''),
+                answer.id,
+                turn_snippet(question.content, answer.content),
+            )
+        return {}
+
+    def cacheable_question(state):
+        # standalone questions only: no follow-ups, no personal recalled context
+        question = next((msg for msg in reversed(state['messages']) if isinstance(msg, HumanMessage)), None)
+        if question is None or state.get('recalled') or is_context_dependent(str(question.content)):
+            return None
+        return str(question.content)
+
+    def turn_scope(state, chosen):
+        # the model the turn was routed to: a small-tier answer never serves a large-tier turn
+        return cache_scope(render_system_prompt(state.get('settings')), chosen)
+
+    def cache_lookup(state, chosen):
+        if response_cache is None or not isinstance(state['messages'][-1], HumanMessage):
+            return None
+        question = cacheable_question(state)
+        if question is None:
+            response_cache.skip()
+            return None
+        answer = response_cache.lookup(question, turn_scope(state, chosen))
+        if answer is None:
+            return None
+        # returned as the node's message, so stream_mode='messages' still delivers it
+        return {'messages' : [AIMessage(content=answer, response_metadata={'semantic_cache_hit' : True})]}
+
+    def cache_store(state, chosen, response):
+        if response_cache is None or response.tool_calls or not response.content:
+            return
+        question = cacheable_question(state)
+        if question is not None:
+            latency = time.time() - state.get('turn_started_at', time.time())
+            response_cache.store(question, turn_scope(state, chosen), response.content, latency)
+
+    def chat_node(state: ChatState, config: RunnableConfig):
+        # routed first, so the lookup is scoped to the model that would answer
+        runnable, chosen, update = chat_model(state, config)
+        cached = cache_lookup(state, chosen)
+        if cached is not None:
+            return {**cached, **update}
+        response = runnable.invoke(prompt_for(state, config))
+        cache_store(state, chosen, response)
+        return {'messages' : [response], **update}
+
+    async def achat_node(state: ChatState, config: RunnableConfig):
+        runnable, chosen, update = chat_model(state, config)
+        cached = cache_lookup(state, chosen)
+        if cached is not None:
+            return {**cached, **update}
+        response = await runnable.ainvoke(prompt_for(state, config))
+        cache_store(state, chosen, response)
+        return {'messages' : [response], **update}
+
+    def record_node(state: ChatState, config: RunnableConfig):
+        # written by the graph, so every turn that reaches the checkpoint reaches the
+        # display history too, however the caller's stream ended
+        catalog.sync_messages(config['configurable']['thread_id'], displayable(state['messages']), caller_id(config))
+        return {}
+
+    async def arecord_node(state: ChatState, config: RunnableConfig):
+        return await asyncio.to_thread(record_node, state, config)
+
+    def allowed_names(state, config):
+        return {tool.name for tool in enabled_tools(state, config)}
+
+    def tool_node(state: ChatState, config: RunnableConfig):
+        return {'messages' : executor.run(state, config, allowed_names(state, config))}
+
+    async def atool_node(state: ChatState, config: RunnableConfig):
+        return {'messages' : await executor.arun(state, config, allowed_names(state, config))}
+
+    def route_tools(state: ChatState, config: RunnableConfig):
+        # every call gets a reply, so the history stays valid: calls this request
+        # may not make are answered with an error by the executor, not run
+        last = state['messages'][-1]
+        return 'tools' if getattr(last, 'tool_calls', None) else END
+
+    graph = StateGraph(state_schema=ChatState)
+
+    # sync .invoke/.stream use the plain functions, .ainvoke/.astream the async ones,
+    # so async callers never park a worker thread on network I/O
+    graph.add_node('context',RunnableLambda(context_node, afunc=acontext_node))
+    graph.add_node('chat_node',RunnableLambda(chat_node, afunc=achat_node))
+    graph.add_node('tools',RunnableLambda(tool_node, afunc=atool_node))
+
+
+    graph.add_edge(START,'context')
+    graph.add_edge('tools','context')
+    finish = END
+    if catalog is not None:
+        # the finished turn goes to the thread catalog last
+        graph.add_node('record',RunnableLambda(record_node, afunc=arecord_node))
+        graph.add_edge('record',END)
+        finish = 'record'
+    if memory is None:
+        graph.add_edge('context','chat_node')
+        graph.add_conditional_edges('chat_node',route_tools,{'tools' : 'tools', END : finish})
+    else:
+        # recall past turns before answering, store the finished turn afterwards
+        graph.add_node('recall',recall_node)
+        graph.add_node('remember',remember_node)
+        graph.add_edge('context','recall')
+        graph.add_edge('recall','chat_node')
+        graph.add_conditional_edges('chat_node',route_tools,{'tools' : 'tools', END : 'remember'})
+        graph.add_edge('remember',finish)
+
+    compiled = graph.compile(checkpointer=checkpointer)
+    # the tracer sees every run of the graph; without one nothing is attached
+    return compiled.with_config(callbacks=[tracer]) if tracer is not None else compiled
+
+
+def default_tools():
+    # langchain_community takes about a second to import, so it is only
+    # loaded once a graph with the real search tool is actually built
+    from langchain_community.tools.tavily_search import TavilySearchResults
+    return [cached_search(TavilySearchResults(max_results = 3))]
+
+
+def build_chatbot(model=None, llm=None, tools=None, checkpointer=None, pool=llm_pool,
+                  memory=None, response_cache=None, tracer=None, router=model_router, scheduler=request_scheduler,
+                  catalog=None):
+    """Compiled chatbot graph with the production defaults for whatever is not given.
+
+    Clients come from ``pool``, per model and API key, built on first use, so
+    building the graph needs no server-side key. An explicit ``llm`` answers
+    every call instead, so the default pool and router are dropped.
+    ``tools`` defaults to the cached Tavily search and ``checkpointer`` to
+    ``make_checkpointer()``. ``router`` picks the model tier per turn. An
+    explicit ``model`` pins every chat turn to it, so the default router is
+    dropped; ``model=None`` means the default model, with routing.
+    ``scheduler`` paces and retries model calls per API key; None calls directly.
+    With a ``catalog`` every finished turn is recorded in its display history.
+    Each call compiles a new graph; use ``get_chatbot()`` (or import
+    ``chatbot``) for the instance shared by the whole process.
+    """
+    if (model is not None or llm is not None) and router is model_router:
+        router = None
+    if llm is not None and pool is llm_pool:
+        pool = None
+    model = model or DEFAULT_MODEL
+    if tools is None:
+        tools = default_tools()
+    if checkpointer is None:
+        checkpointer = make_checkpointer()
+    return build_graph(
+        llm, tools, checkpointer, pool=pool, model=model,
+        memory=memory, response_cache=response_cache, tracer=tracer, router=router,
+        scheduler=scheduler, catalog=catalog,
+    )
+
+
+# === SHARED INSTANCES ===
+# Built on first access, so importing this module stays cheap; after that
+# every Streamlit session and API request in the process shares them.
+# `from src.backend.chatbot import chatbot` goes through __getattr__ below.
+SHARED_FACTORIES = {
+    'checkpointer': make_checkpointer,
+    # thread list and paginated display history, stored next to the checkpoints
+    'catalog': ThreadCatalog,
+    # opt-in cross-thread recall, scoped per user id or API key (CHATBOT_LONG_TERM_MEMORY=1)
+    'memory': lambda: LongTermMemory() if os.getenv('CHATBOT_LONG_TERM_MEMORY') == '1' else None,
+    # opt-in answer reuse for near-identical standalone questions (CHATBOT_SEMANTIC_CACHE=1)
+    'response_cache': lambda: SemanticCache() if os.getenv('CHATBOT_SEMANTIC_CACHE') == '1' else None,
+    # per-node spans and latency histograms (CHATBOT_TRACING=1, spans to CHATBOT_TRACE_FILE)
+    'tracer': make_tracer,
+    'tools': default_tools,
+    'chatbot': lambda: build_chatbot(
+        tools=shared('tools'),
+        checkpointer=shared('checkpointer'),
+        memory=shared('memory'),
+        response_cache=shared('response_cache'),
+        tracer=shared('tracer'),
+        catalog=shared('catalog'),
+    ),
+}
+_shared = {}
+_shared_lock = threading.RLock()
+
+
+def shared(name):
+    with _shared_lock:
+        if name not in _shared:
+            _shared[name] = SHARED_FACTORIES[name]()
+        return _shared[name]
+
+
+def get_chatbot():
+    return shared('chatbot')
+
+
+def __getattr__(name):
+    if name in SHARED_FACTORIES:
+        return shared(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,601 @@
+import asyncio
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import weakref
+import zlib
+from collections import OrderedDict
+from langchain_core.messages import BaseMessage, ToolMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+
+# === STORAGE CONFIG ===
+DATA_DIR = os.getenv('CHATBOT_DATA_DIR', 'data')
+DEFAULT_DB_PATH = os.getenv('CHATBOT_CHECKPOINT_DB', os.path.join(DATA_DIR, 'checkpoints.sqlite'))
+# checkpoints kept per thread; older ones can no longer be time-travelled to. 0 keeps all
+KEEP_CHECKPOINTS = int(os.getenv('CHATBOT_CHECKPOINT_KEEP', '25'))
+# tool results serializing to at least this many bytes are zlib-compressed. 0 turns it off
+COMPRESS_OVER_BYTES = int(os.getenv('CHATBOT_CHECKPOINT_COMPRESS_OVER', '2048'))
+MESSAGES_CHANNEL = 'messages'
+# blob type of a messages channel value stored as message keys
+MESSAGE_REFS = 'message_refs'
+COMPRESSED_PREFIX = 'zlib+'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    parent_id TEXT,
+    checkpoint_type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    value_type TEXT NOT NULL,
+    value BLOB NOT NULL,
+    task_path TEXT NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    value_type TEXT NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    thread_id TEXT NOT NULL,
+    message_key TEXT NOT NULL,
+    value_type TEXT NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (thread_id, message_key)
+);
+"""
+
+# rows of each table are identified by these columns when pruned
+ROW_KEYS = {
+    'checkpoints': ('thread_id', 'checkpoint_ns', 'checkpoint_id'),
+    'writes': ('thread_id', 'checkpoint_ns', 'checkpoint_id'),
+    'blobs': ('thread_id', 'checkpoint_ns', 'channel', 'version'),
+    'messages': ('thread_id', 'message_key'),
+}
+
+
+def current_rss_bytes():
+    """Resident set size of this process, or None where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def has_tool_result(obj):
+    if isinstance(obj, (list, tuple)):
+        return any(isinstance(item, ToolMessage) for item in obj)
+    return isinstance(obj, ToolMessage)
+
+
+class CheckpointSerializer:
+    """The saver's serde plus compressed tool results and message references.
+
+    Values holding a ToolMessage that serialize to ``compress_over`` bytes or
+    more are zlib-compressed under a ``zlib+`` type. A ``message_refs`` blob
+    is a thread id and a list of message keys, resolved against ``messages``
+    (thread id -> key -> serialized message); the messages it loads are
+    remembered in ``objects`` so storing them again needs no serializing.
+    """
+
+    def __init__(self, serde, messages, objects, compress_over=COMPRESS_OVER_BYTES):
+        self.serde = serde
+        self.messages = messages
+        self.objects = objects
+        self.compress_over = compress_over
+
+    def dumps_typed(self, obj):
+        v_type, value = self.serde.dumps_typed(obj)
+        if self.compress_over and len(value) >= self.compress_over and has_tool_result(obj):
+            return COMPRESSED_PREFIX + v_type, zlib.compress(value)
+        return v_type, value
+
+    def loads_typed(self, data):
+        v_type, value = data
+        if v_type == MESSAGE_REFS:
+            thread_id, keys = json.loads(value)
+            stored = self.messages[thread_id]
+            seen = self.objects.setdefault(thread_id, {})
+            loaded = []
+            for key in keys:
+                msg = self.loads_typed(stored[key])
+                if msg.id:
+                    seen[msg.id] = (weakref.ref(msg), key)
+                loaded.append(msg)
+            return loaded
+        if v_type.startswith(COMPRESSED_PREFIX):
+            return self.serde.loads_typed((v_type[len(COMPRESSED_PREFIX):], zlib.decompress(value)))
+        return self.serde.loads_typed(data)
+
+
+class SQLiteSaver(InMemorySaver):
+    """Checkpointer that keeps a bounded LRU of hot threads in memory over SQLite.
+
+    Reads and writes go through the in-memory saver for the threads that are hot.
+    New checkpoints are queued and written to SQLite in batches (every
+    ``batch_size`` rows, every ``flush_interval`` seconds, before an eviction and
+    at exit). A cold thread is faulted back in from disk the first time it is
+    touched, e.g. by ``chatbot.get_state``. The async methods run the sync
+    ones in a worker thread, so none of this blocks the event loop.
+
+    Only the latest ``keep_checkpoints`` checkpoints of a thread are kept
+    (None or 0 keeps all, for full time travel); older ones go with their
+    writes and the blobs nothing kept still references. With
+    ``dedupe_messages`` the messages channel is stored as message keys and
+    each message once per thread, instead of the whole history again at
+    every step. Large tool results are compressed (``compress_over``).
+    """
+
+    def __init__(
+        self,
+        path=DEFAULT_DB_PATH,
+        *,
+        max_threads=256,
+        max_bytes=256 * 1024 * 1024,
+        max_rss_bytes=None,
+        batch_size=64,
+        flush_interval=1.0,
+        keep_checkpoints=None,
+        dedupe_messages=True,
+        compress_over=COMPRESS_OVER_BYTES,
+        serde=None,
+    ):
+        super().__init__(serde=serde)
+        # thread id -> message key -> serialized message
+        self.messages = {}
+        # thread id -> message id -> (weakref to the message last stored, its key), to skip re-serializing
+        self.message_objects = {}
+        # thread id -> (checkpoint ns, checkpoint id) -> channel versions, for retention
+        self.checkpoint_versions = {}
+        self.serde = CheckpointSerializer(self.serde, self.messages, self.message_objects, compress_over)
+        self.path = path
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self.max_rss_bytes = max_rss_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.keep_checkpoints = keep_checkpoints
+        self.dedupe_messages = dedupe_messages
+
+        if path != ':memory:' and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+        self.lock = threading.RLock()
+        # thread id -> approximate serialized bytes held in memory
+        self.hot = OrderedDict()
+        self.hot_bytes = 0
+        # thread id -> keys into self.writes / self.blobs, so eviction is O(thread)
+        self.thread_writes = {}
+        self.thread_blobs = {}
+        self.pending = {table: [] for table in ROW_KEYS}
+        # row keys per table to delete on the next flush, before its inserts
+        self.pending_deletes = {table: set() for table in ROW_KEYS}
+        self.pending_rows = 0
+        self.counters = {
+            'hits': 0, 'misses': 0, 'evictions': 0, 'flushes': 0, 'rows_flushed': 0,
+            'checkpoints_pruned': 0, 'messages_stored': 0, 'messages_reused': 0,
+        }
+
+        self.closed = threading.Event()
+        self.flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self.flusher.start()
+        atexit.register(self.close)
+
+    # === HOT SET ===
+    def _touch(self, thread_id):
+        if thread_id in self.hot:
+            self.hot.move_to_end(thread_id)
+            self.counters['hits'] += 1
+            return
+        self.counters['misses'] += 1
+        self.hot[thread_id] = 0
+        self._fault_in(thread_id)
+        self._enforce_limits(keep=thread_id)
+
+    def _fault_in(self, thread_id):
+        size = 0
+        for ns, checkpoint_id, parent_id, c_type, c_bytes, m_type, m_bytes in self.conn.execute(
+            'SELECT checkpoint_ns, checkpoint_id, parent_id, checkpoint_type, checkpoint, '
+            'metadata_type, metadata FROM checkpoints WHERE thread_id = ?',
+            (thread_id,),
+        ):
+            self.storage[thread_id][ns][checkpoint_id] = ((c_type, c_bytes), (m_type, m_bytes), parent_id)
+            size += len(c_bytes) + len(m_bytes)
+
+        write_keys = self.thread_writes.setdefault(thread_id, set())
+        for ns, checkpoint_id, task_id, idx, channel, v_type, value, task_path in self.conn.execute(
+            'SELECT checkpoint_ns, checkpoint_id, task_id, idx, channel, value_type, value, task_path '
+            'FROM writes WHERE thread_id = ?',
+            (thread_id,),
+        ):
+            outer_key = (thread_id, ns, checkpoint_id)
+            self.writes[outer_key][(task_id, idx)] = (task_id, channel, (v_type, value), task_path)
+            write_keys.add(outer_key)
+            size += len(value)
+
+        blob_keys = self.thread_blobs.setdefault(thread_id, set())
+        for ns, channel, version, v_type, value in self.conn.execute(
+            'SELECT checkpoint_ns, channel, version, value_type, value FROM blobs WHERE thread_id = ?',
+            (thread_id,),
+        ):
+            key = (thread_id, ns, channel, version)
+            self.blobs[key] = (v_type, value)
+            blob_keys.add(key)
+            size += len(value)
+
+        stored = self.messages.setdefault(thread_id, {})
+        for message_key, v_type, value in self.conn.execute(
+            'SELECT message_key, value_type, value FROM messages WHERE thread_id = ?',
+            (thread_id,),
+        ):
+            stored[message_key] = (v_type, value)
+            size += len(value)
+
+        self._account(thread_id, size)
+
+    def _account(self, thread_id, size):
+        self.hot[thread_id] = self.hot.get(thread_id, 0) + size
+        self.hot_bytes += size
+
+    def _over_limits(self):
+        if len(self.hot) > self.max_threads or self.hot_bytes > self.max_bytes:
+            return True
+        if self.max_rss_bytes:
+            rss = current_rss_bytes()
+            return rss is not None and rss > self.max_rss_bytes
+        return False
+
+    def _enforce_limits(self, keep=None):
+        while self._over_limits():
+            victim = next((t for t in self.hot if t != keep), None)
+            if victim is None:
+                break
+            self._evict(victim)
+
+    def _evict(self, thread_id):
+        # pending rows must reach disk before the only in-memory copy goes away
+        self.flush()
+        self._drop(thread_id)
+        self.counters['evictions'] += 1
+
+    def _drop(self, thread_id):
+        self.hot_bytes -= self.hot.pop(thread_id, 0)
+        self.storage.pop(thread_id, None)
+        for key in self.thread_writes.pop(thread_id, ()):
+            self.writes.pop(key, None)
+        for key in self.thread_blobs.pop(thread_id, ()):
+            self.blobs.pop(key, None)
+        self.messages.pop(thread_id, None)
+        self.message_objects.pop(thread_id, None)
+        self.checkpoint_versions.pop(thread_id, None)
+
+    # === WRITE BATCHING ===
+    def _queue(self, table, row, size):
+        self.pending[table].append(row)
+        self.pending_rows += 1
+        self._account(row[0], size)
+
+    def _flush_loop(self):
+        while not self.closed.wait(self.flush_interval):
+            with self.lock:
+                if self.pending_rows:
+                    self.flush()
+
+    def flush(self):
+        with self.lock:
+            if not self.pending_rows:
+                return
+            with self.conn:
+                for table, keys in self.pending_deletes.items():
+                    if keys:
+                        where = ' AND '.join(f'{column} = ?' for column in ROW_KEYS[table])
+                        self.conn.executemany(f'DELETE FROM {table} WHERE {where}', keys)
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    self.pending['checkpoints'],
+                )
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    self.pending['writes'],
+                )
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)',
+                    self.pending['blobs'],
+                )
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?)',
+                    self.pending['messages'],
+                )
+            self.counters['flushes'] += 1
+            self.counters['rows_flushed'] += self.pending_rows
+            self.pending = {table: [] for table in ROW_KEYS}
+            self.pending_deletes = {table: set() for table in ROW_KEYS}
+            self.pending_rows = 0
+
+    def close(self):
+        if self.closed.is_set():
+            return
+        self.closed.set()
+        with self.lock:
+            self.flush()
+            self.conn.close()
+
+    # === SAVER API ===
+    def get_tuple(self, config):
+        with self.lock:
+            self._touch(config['configurable']['thread_id'])
+            return super().get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        if config is None:
+            for thread_id in self.thread_ids():
+                thread_config = {'configurable': {'thread_id': thread_id}}
+                for item in self.list(thread_config, filter=filter, before=before, limit=limit):
+                    if limit is not None:
+                        if limit <= 0:
+                            return
+                        limit -= 1
+                    yield item
+            return
+        with self.lock:
+            self._touch(config['configurable']['thread_id'])
+            items = [*super().list(config, filter=filter, before=before, limit=limit)]
+        yield from items
+
+    def get_delta_channel_history(self, *, config, channels):
+        with self.lock:
+            self._touch(config['configurable']['thread_id'])
+            return super().get_delta_channel_history(config=config, channels=channels)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config['configurable']['thread_id']
+        checkpoint_ns = config['configurable']['checkpoint_ns']
+        messages = checkpoint['channel_values'].get(MESSAGES_CHANNEL)
+        as_refs = (
+            self.dedupe_messages and MESSAGES_CHANNEL in new_versions and isinstance(messages, list)
+            and all(isinstance(msg, BaseMessage) for msg in messages)
+        )
+        if as_refs:
+            # the base saver would serialize the whole history again; the refs blob replaces it below
+            values = {k: v for k, v in checkpoint['channel_values'].items() if k != MESSAGES_CHANNEL}
+            checkpoint = {**checkpoint, 'channel_values': values}
+        with self.lock:
+            self._touch(thread_id)
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+            if as_refs:
+                key = (thread_id, checkpoint_ns, MESSAGES_CHANNEL, new_versions[MESSAGES_CHANNEL])
+                self.blobs[key] = (MESSAGE_REFS, json.dumps([thread_id, self._store_messages(thread_id, messages)]).encode())
+
+            (c_type, c_bytes), (m_type, m_bytes), parent_id = self.storage[thread_id][checkpoint_ns][checkpoint['id']]
+            self._queue(
+                'checkpoints',
+                (thread_id, checkpoint_ns, checkpoint['id'], parent_id, c_type, c_bytes, m_type, m_bytes),
+                len(c_bytes) + len(m_bytes),
+            )
+            blob_keys = self.thread_blobs.setdefault(thread_id, set())
+            for channel, version in new_versions.items():
+                key = (thread_id, checkpoint_ns, channel, version)
+                v_type, value = self.blobs[key]
+                blob_keys.add(key)
+                self._queue('blobs', (thread_id, checkpoint_ns, channel, str(version), v_type, value), len(value))
+
+            if self.keep_checkpoints:
+                self.checkpoint_versions.setdefault(thread_id, {})[(checkpoint_ns, checkpoint['id'])] = dict(
+                    checkpoint['channel_versions']
+                )
+                if len(self.storage[thread_id][checkpoint_ns]) > self.keep_checkpoints:
+                    self._prune(thread_id, checkpoint_ns)
+            if self.pending_rows >= self.batch_size:
+                self.flush()
+            self._enforce_limits(keep=thread_id)
+            return next_config
+
+    # === MESSAGE STORE ===
+    def _store_messages(self, thread_id, messages):
+        """Keys of ``messages`` in this thread's store, adding the ones not stored yet."""
+        stored = self.messages.setdefault(thread_id, {})
+        seen = self.message_objects.setdefault(thread_id, {})
+        keys = []
+        for msg in messages:
+            known = seen.get(msg.id)
+            if known is not None and known[0]() is msg and known[1] in stored:
+                # the very object stored at an earlier step: channels replace messages, never mutate them
+                self.counters['messages_reused'] += 1
+                keys.append(known[1])
+                continue
+            v_type, value = self.serde.dumps_typed(msg)
+            key = msg.id or hashlib.sha1(value).hexdigest()
+            if key in stored and stored[key] != (v_type, value):
+                # same id, different content (e.g. an edited message): keep both versions
+                key = f"{key}@{hashlib.sha1(value).hexdigest()[:16]}"
+            if key in stored:
+                self.counters['messages_reused'] += 1
+            else:
+                stored[key] = (v_type, value)
+                self.counters['messages_stored'] += 1
+                self._queue('messages', (thread_id, key, v_type, value), len(value))
+            if msg.id:
+                seen[msg.id] = (weakref.ref(msg), key)
+            keys.append(key)
+        return keys
+
+    # === RETENTION ===
+    def _prune(self, thread_id, checkpoint_ns):
+        """Drop all but the latest ``keep_checkpoints`` checkpoints, then what only they referenced."""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        ordered = sorted(checkpoints)
+        dropped = ordered[:-self.keep_checkpoints]
+        freed = 0
+        for checkpoint_id in dropped:
+            (_, c_bytes), (_, m_bytes), _ = checkpoints.pop(checkpoint_id)
+            freed += len(c_bytes) + len(m_bytes)
+            self._delete_row('checkpoints', (thread_id, checkpoint_ns, checkpoint_id))
+            outer_key = (thread_id, checkpoint_ns, checkpoint_id)
+            for _, _, (_, value), _ in self.writes.pop(outer_key, {}).values():
+                freed += len(value)
+            self.thread_writes.get(thread_id, set()).discard(outer_key)
+            self._delete_row('writes', outer_key)
+
+        known_versions = self.checkpoint_versions.setdefault(thread_id, {})
+        for checkpoint_id in dropped:
+            known_versions.pop((checkpoint_ns, checkpoint_id), None)
+        live = set()
+        for checkpoint_id in ordered[-self.keep_checkpoints:]:
+            versions = known_versions.get((checkpoint_ns, checkpoint_id))
+            if versions is None:
+                versions = known_versions[(checkpoint_ns, checkpoint_id)] = (
+                    self.serde.loads_typed(checkpoints[checkpoint_id][0])['channel_versions']
+                )
+            live.update((thread_id, checkpoint_ns, channel, version) for channel, version in versions.items())
+        blob_keys = self.thread_blobs.get(thread_id, set())
+        # messages only the dropped blobs referenced; usually every one is still in the newest history
+        unreferenced = set()
+        for key in [key for key in blob_keys if key[1] == checkpoint_ns and key not in live]:
+            blob_keys.discard(key)
+            v_type, value = self.blobs.pop(key, ('', b''))
+            if v_type == MESSAGE_REFS:
+                unreferenced.update(json.loads(value)[1])
+            freed += len(value)
+            self._delete_row('blobs', (*key[:3], str(key[3])))
+        refs = sorted((key for key in blob_keys if self.blobs[key][0] == MESSAGE_REFS), key=lambda key: key[3], reverse=True)
+        for key in refs:
+            if not unreferenced:
+                break
+            unreferenced.difference_update(json.loads(self.blobs[key][1])[1])
+        stored = self.messages.get(thread_id, {})
+        for key in unreferenced:
+            freed += len(stored.pop(key, ('', b''))[1])
+            self._delete_row('messages', (thread_id, key))
+
+        self.counters['checkpoints_pruned'] += len(dropped)
+        self._account(thread_id, -freed)
+
+    def _delete_row(self, table, key):
+        # a row still waiting to be written never reaches disk; one already there is deleted on flush
+        rows = self.pending[table]
+        kept = [row for row in rows if tuple(row[:len(key)]) != key]
+        self.pending_rows -= len(rows) - len(kept)
+        self.pending[table] = kept
+        self.pending_deletes[table].add(key)
+        self.pending_rows += 1
+
+    def put_writes(self, config, writes, task_id, task_path=''):
+        thread_id = config['configurable']['thread_id']
+        checkpoint_ns = config['configurable'].get('checkpoint_ns', '')
+        checkpoint_id = config['configurable']['checkpoint_id']
+        outer_key = (thread_id, checkpoint_ns, checkpoint_id)
+        with self.lock:
+            self._touch(thread_id)
+            super().put_writes(config, writes, task_id, task_path)
+
+            self.thread_writes.setdefault(thread_id, set()).add(outer_key)
+            for (w_task_id, idx), (_, channel, (v_type, value), w_task_path) in self.writes.get(outer_key, {}).items():
+                if w_task_id != task_id:
+                    continue
+                self._queue(
+                    'writes',
+                    (thread_id, checkpoint_ns, checkpoint_id, w_task_id, idx, channel, v_type, value, w_task_path),
+                    len(value),
+                )
+
+            if self.pending_rows >= self.batch_size:
+                self.flush()
+
+    def delete_thread(self, thread_id):
+        with self.lock:
+            self.flush()
+            self._drop(thread_id)
+            with self.conn:
+                for table in ROW_KEYS:
+                    self.conn.execute(f'DELETE FROM {table} WHERE thread_id = ?', (thread_id,))
+
+    def thread_ids(self):
+        with self.lock:
+            self.flush()
+            rows = self.conn.execute('SELECT DISTINCT thread_id FROM checkpoints').fetchall()
+        return [row[0] for row in rows]
+
+    # === ASYNC SAVER API ===
+    # fault-ins, inline flushes and waits on the flusher's lock block; keep them off the event loop
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        items = await asyncio.to_thread(lambda: [*self.list(config, filter=filter, before=before, limit=limit)])
+        for item in items:
+            yield item
+
+    async def aget_delta_channel_history(self, *, config, channels):
+        return await asyncio.to_thread(self.get_delta_channel_history, config=config, channels=channels)
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=''):
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    # === METRICS ===
+    def stats(self):
+        with self.lock:
+            lookups = self.counters['hits'] + self.counters['misses']
+            return {
+                **self.counters,
+                'hit_rate': self.counters['hits'] / lookups if lookups else 0.0,
+                'hot_threads': len(self.hot),
+                'hot_bytes': self.hot_bytes,
+                'pending_rows': self.pending_rows,
+                'rss_bytes': current_rss_bytes(),
+            }
+
+
+def make_checkpointer(backend=None, **kwargs):
+    """Build the checkpointer selected by ``backend`` or $CHATBOT_CHECKPOINTER.
+
+    ``sqlite`` (default) persists threads to disk with a bounded hot set;
+    ``memory`` keeps the old unbounded, process-local InMemorySaver.
+    The sqlite saver keeps the latest $CHATBOT_CHECKPOINT_KEEP checkpoints per
+    thread unless ``keep_checkpoints`` is given.
+    """
+    backend = backend or os.getenv('CHATBOT_CHECKPOINTER', 'sqlite')
+    if backend == 'memory':
+        return InMemorySaver()
+    if backend == 'sqlite':
+        for option, env, cast in (
+            ('max_threads', 'CHATBOT_CHECKPOINT_MAX_THREADS', int),
+            ('max_bytes', 'CHATBOT_CHECKPOINT_MAX_BYTES', int),
+            ('max_rss_bytes', 'CHATBOT_MAX_RSS_BYTES', int),
+        ):
+            if option not in kwargs and os.getenv(env):
+                kwargs[option] = cast(os.getenv(env))
+        kwargs.setdefault('keep_checkpoints', KEEP_CHECKPOINTS)
+        return SQLiteSaver(**kwargs)
+    raise ValueError(f"Unknown checkpointer backend: {backend!r}")
@@ -0,0 +1,162 @@
+import os
+from langchain_core.messages import (
+    AIMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.messages.utils import count_tokens_approximately
+
+
+# === BUDGET CONFIG ===
+# Prompt budget (approximate tokens) for one model call, overridable per request
+# with config={'configurable': {'max_prompt_tokens': ...}}.
+DEFAULT_MAX_PROMPT_TOKENS = int(os.getenv('CHATBOT_MAX_PROMPT_TOKENS', '6000'))
+
+# Room kept for the rolling summary inside the budget.
+SUMMARY_RESERVE_TOKENS = 600
+
+# When the window overflows we evict down to this fraction of the budget, so the
+# summary is only recomputed every few turns instead of on every turn.
+LOW_WATER_RATIO = 0.6
+
+TOOL_RESULT_CHARS = 500
+
+
+def get_max_prompt_tokens(config):
+    configurable = (config or {}).get('configurable', {})
+    return int(configurable.get('max_prompt_tokens') or DEFAULT_MAX_PROMPT_TOKENS)
+
+
+def count_tokens(messages):
+    return count_tokens_approximately(messages)
+
+
+# === GROUPING ===
+def group_messages(messages):
+    """Split history into units that must be kept or evicted together.
+
+    An AI message that issued tool calls is grouped with the tool results that
+    answer it, so trimming never leaves a dangling call or an orphaned result.
+    """
+    groups = []
+    for msg in messages:
+        if isinstance(msg, ToolMessage) and groups and _expects_tool_results(groups[-1]):
+            groups[-1].append(msg)
+        else:
+            groups.append([msg])
+    # a tool result whose call was already removed cannot be sent on its own
+    return [g for g in groups if not isinstance(g[0], ToolMessage)]
+
+
+def _expects_tool_results(group):
+    head = group[0]
+    return isinstance(head, AIMessage) and bool(head.tool_calls)
+
+
+def history_messages(messages):
+    """Conversation messages without system messages (those come from settings)."""
+    return [msg for msg in messages if not isinstance(msg, SystemMessage)]
+
+
+def messages_after(messages, message_id):
+    """Messages following the one with ``message_id`` (all of them if not found)."""
+    if message_id:
+        for idx, msg in enumerate(messages):
+            if msg.id == message_id:
+                return messages[idx + 1:]
+    return list(messages)
+
+
+def fit_groups(groups, budget):
+    """Keep the most recent groups that fit in ``budget`` tokens.
+
+    The latest group is always kept, even when it alone exceeds the budget.
+    Returns ``(evicted, kept)`` as flat message lists.
+    """
+    kept = []
+    used = 0
+    split = len(groups)
+    for idx in range(len(groups) - 1, -1, -1):
+        cost = count_tokens(groups[idx])
+        if kept and used + cost > budget:
+            break
+        kept = groups[idx] + kept
+        used += cost
+        split = idx
+    evicted = [msg for group in groups[:split] for msg in group]
+    return evicted, kept
+
+
+# === EVICTION ===
+def window_budget(system, max_tokens):
+    reserved = SUMMARY_RESERVE_TOKENS + (count_tokens([system]) if system else 0)
+    return max(max_tokens - reserved, 0)
+
+
+def select_evictions(messages, summary_until, max_tokens, system=None):
+    """Messages that must be folded into the summary before the next call.
+
+    Returns an empty list while the live window (everything after
+    ``summary_until``) still fits in the budget. Once it overflows, evicts whole
+    groups until the window is back under the low-water mark.
+    """
+    live = messages_after(history_messages(messages), summary_until)
+    budget = window_budget(system, max_tokens)
+    if count_tokens(live) <= budget:
+        return []
+    evicted, _ = fit_groups(group_messages(live), int(budget * LOW_WATER_RATIO))
+    return evicted
+
+
+def build_prompt(messages, summary, summary_until, max_tokens, system=None):
+    """Messages to send to the model: system prompt, summary, then the live window."""
+    live = messages_after(history_messages(messages), summary_until)
+    # safety net in case the summary could not be refreshed
+    _, window = fit_groups(group_messages(live), window_budget(system, max_tokens))
+
+    prompt = []
+    if system is not None:
+        prompt.append(system)
+    if summary:
+        prompt.append(SystemMessage(content=f"Summary of the earlier conversation:\n{summary}"))
+    return prompt + window
+
+
+# === SUMMARIZATION ===
+def _render(msg):
+    if isinstance(msg, HumanMessage):
+        return f"user: {msg.content}"
+    if isinstance(msg, ToolMessage):
+        return f"tool result: {str(msg.content)[:TOOL_RESULT_CHARS]}"
+    if isinstance(msg, AIMessage) and msg.tool_calls and not msg.content:
+        names = ", ".join(call['name'] for call in msg.tool_calls)
+        return f"assistant: (called {names})"
+    return f"assistant: {msg.content}"
+
+
+def _summary_prompt(previous_summary, messages):
+    transcript = "\n".join(_render(msg) for msg in messages)
+    prompt = (
+        "You maintain a running summary of a conversation between a user and an assistant. "
+        "Update the summary with the new messages below. Keep facts, names, decisions, "
+        "open questions and user preferences; drop small talk. "
+        f"Answer with the updated summary only, under {SUMMARY_RESERVE_TOKENS // 2} words.\n\n"
+        f"Current summary:\n{previous_summary or '(empty)'}\n\n"
+        f"New messages:\n{transcript}"
+    )
+    return [HumanMessage(content=prompt)]
+
+
+def _clip_summary(response):
+    return str(response.content).strip()[:SUMMARY_RESERVE_TOKENS * 4]
+
+
+def summarize_messages(llm, previous_summary, messages):
+    """Fold ``messages`` into ``previous_summary`` with a single model call."""
+    return _clip_summary(llm.invoke(_summary_prompt(previous_summary, messages)))
+
+
+async def asummarize_messages(llm, previous_summary, messages):
+    """Async version of ``summarize_messages``."""
+    return _clip_summary(await llm.ainvoke(_summary_prompt(previous_summary, messages)))
@@ -0,0 +1,156 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+import httpx
+from pydantic import SecretStr
+
+
+# === POOL CONFIG ===
+DEFAULT_MODEL = "openai/gpt-oss-120b"
+MAX_CLIENTS = int(os.getenv('CHATBOT_LLM_POOL_SIZE', '64'))
+IDLE_TTL_SECONDS = float(os.getenv('CHATBOT_LLM_IDLE_TTL', '900'))
+
+
+def secret_value(api_key):
+    """Plain string from a str or SecretStr key (None stays None)."""
+    if isinstance(api_key, SecretStr):
+        return api_key.get_secret_value()
+    return api_key or None
+
+
+def api_key_from_config(config):
+    # callers pass the key as a SecretStr: plain strings in `configurable`
+    # are copied into checkpoint metadata and would end up on disk
+    return secret_value((config or {}).get('configurable', {}).get('api_key'))
+
+
+def key_digest(api_key):
+    """Short hash standing in for a key wherever it identifies someone (None stays None)."""
+    api_key = secret_value(api_key)
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16] if api_key else None
+
+
+def caller_id(config):
+    """Who a run is for: configurable 'user_id', else a digest of the API key; None when anonymous."""
+    configurable = (config or {}).get('configurable', {})
+    if configurable.get('user_id'):
+        return str(configurable['user_id'])
+    return key_digest(api_key_from_config(config))
+
+
+class PooledClient:
+    def __init__(self, llm):
+        self.llm = llm
+        self.last_used = time.monotonic()
+        # derived runnables (bound tools, tagged copies), built once per client
+        self.variants = {}
+
+
+class LLMPool:
+    """Registry of chat model clients keyed by (model, api_key).
+
+    Every client shares one sync and one async httpx connection pool, so a
+    new key or model reuses warm connections to the provider. Clients are
+    evicted LRU past ``max_clients`` and after ``idle_ttl`` seconds unused.
+    """
+
+    def __init__(self, max_clients=MAX_CLIENTS, idle_ttl=IDLE_TTL_SECONDS, base_url=None, factory=None):
+        self.max_clients = max_clients
+        self.idle_ttl = idle_ttl
+        self.base_url = base_url
+        self.factory = factory or self._groq
+        self.clients = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = {
+            'clients_created': 0,
+            'clients_reused': 0,
+            'evicted_idle': 0,
+            'evicted_lru': 0,
+            'requests': 0,
+            'connections_opened': 0,
+        }
+        limits = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60)
+        self.http_client = httpx.Client(limits=limits, event_hooks={'request': [self._on_request]})
+        self.http_async_client = httpx.AsyncClient(limits=limits, event_hooks={'request': [self._aon_request]})
+
+    # === CONNECTION METRICS ===
+    # httpcore reports a 'connection.connect_tcp' trace event only when it has
+    # to open a new connection, so requests minus those were served warm.
+    def _on_request(self, request):
+        self.counters['requests'] += 1
+        request.extensions['trace'] = self._trace
+
+    async def _aon_request(self, request):
+        self.counters['requests'] += 1
+        request.extensions['trace'] = self._atrace
+
+    def _trace(self, event_name, info):
+        if event_name == 'connection.connect_tcp.complete':
+            self.counters['connections_opened'] += 1
+
+    async def _atrace(self, event_name, info):
+        self._trace(event_name, info)
+
+    # === CLIENTS ===
+    def _groq(self, model, api_key):
+        from langchain_groq import ChatGroq
+        kwargs = {'model': model, 'http_client': self.http_client, 'http_async_client': self.http_async_client}
+        # retries belong to the request scheduler, which also paces the other calls on the key
+        kwargs['max_retries'] = 0
+        if api_key:
+            kwargs['api_key'] = api_key
+        if self.base_url:
+            kwargs['base_url'] = self.base_url
+        return ChatGroq(**kwargs)
+
+    def _entry(self, model, api_key):
+        api_key = secret_value(api_key)
+        # never keep raw keys around as dict keys
+        key = (model, hashlib.sha256((api_key or '').encode()).hexdigest())
+        with self.lock:
+            self._evict_idle()
+            entry = self.clients.get(key)
+            if entry is not None:
+                self.clients.move_to_end(key)
+                self.counters['clients_reused'] += 1
+            else:
+                entry = PooledClient(self.factory(model, api_key))
+                self.clients[key] = entry
+                self.counters['clients_created'] += 1
+                while len(self.clients) > self.max_clients:
+                    self.clients.popitem(last=False)
+                    self.counters['evicted_lru'] += 1
+            entry.last_used = time.monotonic()
+            return entry
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_ttl
+        for key in [k for k, e in self.clients.items() if e.last_used < cutoff]:
+            del self.clients[key]
+            self.counters['evicted_idle'] += 1
+
+    def get(self, model=DEFAULT_MODEL, api_key=None):
+        return self._entry(model, api_key).llm
+
+    def variant(self, model, api_key, name, make):
+        """``make(llm)`` for this client, built once and cached with it."""
+        entry = self._entry(model, api_key)
+        with self.lock:
+            if name not in entry.variants:
+                entry.variants[name] = make(entry.llm)
+            return entry.variants[name]
+
+    def stats(self):
+        with self.lock:
+            requests = self.counters['requests']
+            return {
+                **self.counters,
+                'clients': len(self.clients),
+                'connection_reuse_rate': 1 - self.counters['connections_opened'] / requests if requests else 0.0,
+            }
+
+
+# shared by every graph run and Streamlit session in this process
+llm_pool = LLMPool()
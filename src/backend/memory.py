@@ -0,0 +1,215 @@
+import atexit
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from datetime import datetime, timezone
+import numpy as np
+from src.backend.checkpoint import DATA_DIR
+from src.backend.llm_pool import caller_id
+
+
+# === MEMORY CONFIG ===
+MEMORY_DIR = os.getenv('CHATBOT_MEMORY_DIR', os.path.join(DATA_DIR, 'memory'))
+DEFAULT_TOP_K = int(os.getenv('CHATBOT_MEMORY_TOP_K', '4'))
+MIN_SCORE = float(os.getenv('CHATBOT_MEMORY_MIN_SCORE', '0.25'))
+SNIPPET_CHARS = 400
+# the index file is rewritten after this many additions (and on close)
+SAVE_EVERY = 256
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+# === EMBEDDERS ===
+class HashingEmbedder:
+    """Deterministic, dependency-free embedder (feature hashing of words and bigrams).
+
+    Good enough for lexical recall and fully reproducible, which makes it the
+    default for offline runs and tests. Swap in ``LangChainEmbedder`` for
+    semantic recall.
+    """
+
+    def __init__(self, dim=256):
+        self.dim = dim
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype='float32')
+        words = TOKEN_RE.findall(text.lower())
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            h = zlib.crc32(feature.encode())
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_documents(self, texts):
+        return np.stack([self._embed(text) for text in texts]) if texts else np.zeros((0, self.dim), dtype='float32')
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class LangChainEmbedder:
+    """Adapter for any LangChain ``Embeddings`` implementation."""
+
+    def __init__(self, embeddings, dim):
+        self.embeddings = embeddings
+        self.dim = dim
+
+    def _normalize(self, vectors):
+        vectors = np.asarray(vectors, dtype='float32')
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def embed_documents(self, texts):
+        return self._normalize(self.embeddings.embed_documents(list(texts)))
+
+    def embed_query(self, text):
+        return self._normalize(self.embeddings.embed_query(text))
+
+
+def memory_namespace(config):
+    """Whose memories a run may read: configurable 'user_id', else a hash of the API key.
+
+    None when the run carries neither: anonymous runs share no namespace,
+    so they neither recall nor store anything.
+    """
+    return caller_id(config)
+
+
+# === STORE ===
+class LongTermMemory:
+    """Turns from past conversations in a FAISS inner-product index on disk.
+
+    Vectors live in ``index.faiss`` (memory-mapped when loaded, so a large
+    index is paged in on demand rather than read up front); snippet text and
+    ownership live next to it in ``memories.sqlite``.
+    """
+
+    def __init__(self, path=MEMORY_DIR, embedder=None, save_every=SAVE_EVERY):
+        import faiss
+        self.faiss = faiss
+        self.path = path
+        self.embedder = embedder or HashingEmbedder()
+        self.save_every = save_every
+        self.index_path = os.path.join(path, 'index.faiss')
+        os.makedirs(path, exist_ok=True)
+
+        self.conn = sqlite3.connect(os.path.join(path, 'memories.sqlite'), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS memories ('
+            'id INTEGER PRIMARY KEY, namespace TEXT NOT NULL, thread_id TEXT NOT NULL, '
+            'message_id TEXT, text TEXT NOT NULL, created_at TEXT NOT NULL)'
+        )
+        self.lock = threading.Lock()
+        self.unsaved = 0
+
+        if os.path.exists(self.index_path):
+            self.index = faiss.read_index(self.index_path, faiss.IO_FLAG_MMAP)
+        else:
+            self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(self.embedder.dim))
+        row = self.conn.execute('SELECT MAX(id) FROM memories').fetchone()
+        self.next_id = (row[0] or 0) + 1
+        # rows written after the last index save have to be re-embedded
+        if self.index.ntotal < self.next_id - 1:
+            self._reindex_missing()
+        self.closed = False
+        atexit.register(self.close)
+
+    def _reindex_missing(self):
+        rows = self.conn.execute(
+            'SELECT id, text FROM memories ORDER BY id LIMIT -1 OFFSET ?', (self.index.ntotal,)
+        ).fetchall()
+        if rows:
+            vectors = self.embedder.embed_documents([text for _, text in rows])
+            self.index.add_with_ids(vectors, np.array([i for i, _ in rows], dtype='int64'))
+            self.save()
+
+    def add_many(self, items):
+        """Store ``(namespace, thread_id, message_id, text)`` tuples; returns their ids."""
+        items = list(items)
+        if not items:
+            return []
+        vectors = self.embedder.embed_documents([text for *_, text in items])
+        now = datetime.now(timezone.utc).isoformat()
+        with self.lock:
+            ids = list(range(self.next_id, self.next_id + len(items)))
+            self.next_id += len(items)
+            with self.conn:
+                self.conn.executemany(
+                    'INSERT INTO memories (id, namespace, thread_id, message_id, text, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+                    [(i, *item, now) for i, item in zip(ids, items)],
+                )
+            self.index.add_with_ids(vectors, np.array(ids, dtype='int64'))
+            self.unsaved += len(items)
+            if self.unsaved >= self.save_every:
+                self._save()
+        return ids
+
+    def add(self, namespace, thread_id, message_id, text):
+        return self.add_many([(namespace, thread_id, message_id, text)])[0]
+
+    def search(self, query, namespace='default', k=DEFAULT_TOP_K, min_score=MIN_SCORE, exclude_message_ids=()):
+        """Top ``k`` snippets of ``namespace`` scoring at least ``min_score``."""
+        vector = self.embedder.embed_query(query).reshape(1, -1)
+        exclude = set(exclude_message_ids)
+        fetch = k * 4
+        with self.lock:
+            while True:
+                scores, ids = self.index.search(vector, min(fetch, max(self.index.ntotal, 1)))
+                candidates = [(int(i), float(s)) for i, s in zip(ids[0], scores[0]) if i != -1 and s >= min_score]
+                rows = self._rows([i for i, _ in candidates])
+                hits = [
+                    {'text': rows[i][2], 'thread_id': rows[i][1], 'score': score}
+                    for i, score in candidates
+                    if i in rows and rows[i][0] == namespace and rows[i][3] not in exclude
+                ]
+                # other users' turns can crowd the neighbourhood, so widen the search until k hits
+                exhausted = len(candidates) < fetch or fetch >= self.index.ntotal
+                if len(hits) >= k or exhausted or fetch >= 1024:
+                    return hits[:k]
+                fetch *= 4
+
+    def _rows(self, ids):
+        if not ids:
+            return {}
+        marks = ','.join('?' * len(ids))
+        rows = self.conn.execute(
+            f'SELECT id, namespace, thread_id, text, message_id FROM memories WHERE id IN ({marks})', ids
+        ).fetchall()
+        return {row[0]: (row[1], row[2], row[3], row[4]) for row in rows}
+
+    def _save(self):
+        tmp_path = self.index_path + '.tmp'
+        self.faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, self.index_path)
+        self.unsaved = 0
+
+    def save(self):
+        with self.lock:
+            self._save()
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            if self.unsaved:
+                self._save()
+            self.conn.close()
+
+    def stats(self):
+        return {'vectors': int(self.index.ntotal), 'unsaved': self.unsaved, 'dim': self.embedder.dim}
+
+
+# === GRAPH HELPERS ===
+def turn_snippet(question, answer):
+    return f"User: {question}\nAssistant: {answer}"[:SNIPPET_CHARS]
+
+
+def memory_note(snippets):
+    if not snippets:
+        return ""
+    lines = "\n".join(f"- {s['text']}" for s in snippets)
+    return f"Relevant notes from earlier conversations (use only if helpful):\n{lines}"
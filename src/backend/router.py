@@ -0,0 +1,101 @@
+import logging
+import os
+import re
+import threading
+from langchain_core.messages import HumanMessage
+from src.backend.llm_pool import DEFAULT_MODEL
+
+
+logger = logging.getLogger(__name__)
+
+
+# === ROUTER CONFIG ===
+TIERS = {
+    'small': os.getenv('CHATBOT_MODEL_SMALL', 'openai/gpt-oss-20b'),
+    'large': os.getenv('CHATBOT_MODEL_LARGE', DEFAULT_MODEL),
+}
+# 'off' sends every chat turn to the large tier; auxiliary tasks stay small
+ROUTING_ENABLED = os.getenv('CHATBOT_ROUTING', 'on') != 'off'
+AUXILIARY_TASKS = ('title', 'summary', 'greeting', 'summarize')
+
+# a chat turn goes to the large tier when any of these hold
+MAX_SMALL_CHARS = int(os.getenv('CHATBOT_ROUTER_MAX_SMALL_CHARS', '200'))
+MAX_SMALL_DEPTH = int(os.getenv('CHATBOT_ROUTER_MAX_SMALL_DEPTH', '6'))
+REASONING_RE = re.compile(
+    r"\b(explain|why|how|compare|analy[sz]e|design|prove|derive|calculate|solve|debug|implement|"
+    r"write|code|algorithm|step by step|pros and cons|difference between|summari[sz]e|translate|plan)\b"
+)
+FRESHNESS_RE = re.compile(r"\b(latest|today|yesterday|current|currently|news|price|weather|score|this week|20\d\d)\b")
+CODE_RE = re.compile(r"```|\bdef |\bclass |\bimport |[{};]\s*$", re.MULTILINE)
+
+
+def last_question(messages):
+    question = next((msg for msg in reversed(messages) if isinstance(msg, HumanMessage)), None)
+    return str(question.content) if question is not None else ""
+
+
+class ModelRouter:
+    """Picks a model tier per call from a cheap local heuristic.
+
+    Auxiliary tasks (titles, sidebar summaries, greetings, history
+    summaries) always use ``aux_tier``. A chat turn stays on the small tier
+    only when it is short, asks for no reasoning or code, needs no fresh
+    information from search and sits early in its conversation; anything
+    else goes to the large tier. A configurable 'model_tier' forces a tier
+    for one request. Decisions are logged at INFO and counted.
+    """
+
+    def __init__(self, tiers=None, enabled=ROUTING_ENABLED, aux_tier='small', default_tier='large'):
+        self.tiers = dict(tiers or TIERS)
+        self.enabled = enabled
+        self.aux_tier = aux_tier
+        self.default_tier = default_tier
+        self.lock = threading.Lock()
+        self.counters = {tier: 0 for tier in self.tiers}
+
+    def _count(self, tier):
+        with self.lock:
+            self.counters[tier] = self.counters.get(tier, 0) + 1
+
+    def for_task(self, task):
+        """Model for an auxiliary task such as 'title', 'summary' or 'greeting'."""
+        tier = self.aux_tier if task in AUXILIARY_TASKS else self.default_tier
+        return self.tiers[tier]
+
+    def classify(self, messages, tools_enabled=False):
+        """(tier, reason) for the chat turn ending in ``messages``."""
+        question = last_question(messages).casefold()
+        depth = sum(isinstance(msg, HumanMessage) for msg in messages)
+        if len(question) > MAX_SMALL_CHARS:
+            return 'large', 'long question'
+        if CODE_RE.search(question):
+            return 'large', 'code'
+        if REASONING_RE.search(question):
+            return 'large', 'reasoning'
+        if tools_enabled and FRESHNESS_RE.search(question):
+            return 'large', 'needs search'
+        if depth > MAX_SMALL_DEPTH:
+            return 'large', 'deep conversation'
+        return 'small', 'simple'
+
+    def route(self, messages, config=None, tools_enabled=False):
+        """Model for a chat turn, decided from the messages up to its question."""
+        forced = (config or {}).get('configurable', {}).get('model_tier')
+        if forced in self.tiers:
+            tier, reason = forced, 'forced'
+        elif not self.enabled:
+            tier, reason = self.default_tier, 'routing off'
+        else:
+            tier, reason = self.classify(messages, tools_enabled)
+        self._count(tier)
+        thread_id = (config or {}).get('configurable', {}).get('thread_id')
+        logger.info("route thread=%s tier=%s model=%s reason=%s", thread_id, tier, self.tiers[tier], reason)
+        return self.tiers[tier]
+
+    def stats(self):
+        with self.lock:
+            return {'enabled': self.enabled, 'tiers': dict(self.tiers), 'routed': dict(self.counters)}
+
+
+# shared by the graph and the Streamlit helpers in this process
+model_router = ModelRouter()
@@ -0,0 +1,341 @@
+import asyncio
+import hashlib
+import itertools
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.runnables import RunnableLambda
+from langchain_core.runnables.config import merge_configs
+from src.backend.llm_pool import secret_value
+
+
+# === SCHEDULER CONFIG ===
+# per (API key, model), as providers count them; 0 turns a limit off. Off unless
+# configured: limits differ per plan, e.g. Groq's free tier is 30 RPM / 8000 TPM.
+REQUESTS_PER_MINUTE = float(os.getenv('CHATBOT_RPM', '0'))
+TOKENS_PER_MINUTE = float(os.getenv('CHATBOT_TPM', '0'))
+MAX_RETRIES = int(os.getenv('CHATBOT_MAX_RETRIES', '4'))
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_CAP_SECONDS = 20.0
+# completion tokens assumed per call when reserving token budget
+COMPLETION_ESTIMATE = int(os.getenv('CHATBOT_COMPLETION_ESTIMATE', '256'))
+MAX_KEYS = 1024
+# async waiters re-check the queue at least this often
+POLL_SECONDS = 0.05
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BACKGROUND: 'background'}
+
+RETRYABLE_STATUS = (408, 409, 429, 500, 502, 503, 504)
+
+
+class RateLimitExceeded(Exception):
+    """The provider kept rate-limiting (or failing) a call after every retry."""
+
+
+def status_code(error):
+    code = getattr(error, 'status_code', None)
+    if code is None:
+        code = getattr(getattr(error, 'response', None), 'status_code', None)
+    return code
+
+
+def retry_after(error):
+    """Seconds the provider asked us to wait, from retry-after(-ms) headers."""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except ValueError:
+        pass
+    return None
+
+
+def is_retryable(error):
+    code = status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    # connection resets and timeouts never got a status
+    return type(error).__name__ in ('APIConnectionError', 'APITimeoutError', 'ConnectError', 'ReadTimeout')
+
+
+class TokenBucket:
+    """Continuous refill at ``per_minute / 60`` per second, holding at most ``burst`` (a minute's worth)."""
+
+    def __init__(self, per_minute, burst=None):
+        self.rate = per_minute / 60
+        self.capacity = burst or per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount, now):
+        """Seconds until ``amount`` is available (0 when it is)."""
+        if not self.rate:
+            return 0.0
+        self._refill(now)
+        # a single call bigger than the bucket only waits for a full bucket
+        amount = min(amount, self.capacity)
+        return max(amount - self.level, 0) / self.rate
+
+    def take(self, amount):
+        if self.rate:
+            self.level -= min(amount, self.capacity)
+
+
+class OutputWatch(BaseCallbackHandler):
+    """Notes when a model call has streamed its first token to the caller."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.started = False
+
+    def on_llm_new_token(self, token, **kwargs):
+        self.started = True
+
+
+class ModelLimits:
+    def __init__(self, rpm, tpm, burst=None):
+        self.requests = TokenBucket(rpm, burst)
+        self.tokens = TokenBucket(tpm)
+        # the provider said 429: nobody on this key and model goes before this
+        self.blocked_until = 0.0
+
+
+class KeyState:
+    def __init__(self, rpm, tpm, burst=None):
+        self.rpm, self.tpm, self.burst = rpm, tpm, burst
+        # buckets per model, as providers count them
+        self.models = {}
+        # (priority, seq, model) of waiting calls on every model of the key
+        self.queue = []
+
+    def limits(self, model):
+        if model not in self.models:
+            self.models[model] = ModelLimits(self.rpm, self.tpm, self.burst)
+        return self.models[model]
+
+    def next_in_line(self, ticket):
+        """No waiter ahead of ``ticket`` is for its model or of a higher priority."""
+        priority, _, model = ticket
+        return not any(other < ticket and (other[0] < priority or other[2] == model) for other in self.queue)
+
+
+class RequestScheduler:
+    """Shapes model calls per API key and retries the ones the provider rejects.
+
+    Each (key, model) pair (the key hashed, never stored raw) has token
+    buckets for requests and tokens per minute. Calls wait in one priority
+    queue per key, across its models: a call goes once its own buckets
+    allow it and nobody ahead of it waits for the same model or has a
+    higher priority. So interactive chat on the large tier still goes
+    ahead of background titles and summaries on the small one, while calls
+    of one priority on different models never wait on each other's
+    buckets. Within a priority it is first come first served. Calls failing
+    with 429/5xx or a dropped connection are retried with full-jitter
+    exponential backoff. A retry-after from the provider is honoured and
+    pauses the whole pair. A model call that already streamed tokens is
+    never retried, since the caller would see the answer twice.
+    """
+
+    def __init__(self, rpm=REQUESTS_PER_MINUTE, tpm=TOKENS_PER_MINUTE, max_retries=MAX_RETRIES,
+                 backoff_base=BACKOFF_BASE_SECONDS, backoff_cap=BACKOFF_CAP_SECONDS, sleep=time.sleep, burst=None):
+        self.rpm = rpm
+        self.tpm = tpm
+        # requests allowed back to back; defaults to a whole minute's worth
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.sleep = sleep
+        self.keys = OrderedDict()
+        self.seq = itertools.count()
+        self.cond = threading.Condition()
+        self.counters = {
+            'granted': 0, 'retries': 0, 'rate_limited': 0, 'failed': 0, 'failed_mid_stream': 0,
+            'queued_seconds': 0.0, 'max_queue_depth': 0,
+        }
+
+    # === QUEUE ===
+    def _key(self, api_key):
+        key = hashlib.sha256((secret_value(api_key) or '').encode()).hexdigest()
+        state = self.keys.get(key)
+        if state is None:
+            state = self.keys[key] = KeyState(self.rpm, self.tpm, self.burst)
+            # drop idle keys beyond the cap; keys with waiters are kept
+            for old in list(self.keys)[:max(len(self.keys) - MAX_KEYS, 0)]:
+                if not self.keys[old].queue:
+                    del self.keys[old]
+        self.keys.move_to_end(key)
+        return state
+
+    def _enqueue(self, api_key, model, priority):
+        with self.cond:
+            state = self._key(api_key)
+            ticket = (priority, next(self.seq), model)
+            state.queue.append(ticket)
+            depth = sum(len(s.queue) for s in self.keys.values())
+            self.counters['max_queue_depth'] = max(self.counters['max_queue_depth'], depth)
+            return state, ticket
+
+    def _try_grant(self, state, ticket, tokens):
+        """0 when granted, else seconds worth waiting before checking again. Caller holds the lock."""
+        now = time.monotonic()
+        if not state.next_in_line(ticket):
+            return POLL_SECONDS
+        limits = state.limits(ticket[2])
+        wait = max(limits.blocked_until - now, limits.requests.wait_for(1, now), limits.tokens.wait_for(tokens, now))
+        if wait > 0:
+            return wait
+        state.queue.remove(ticket)
+        limits.requests.take(1)
+        limits.tokens.take(tokens)
+        self.counters['granted'] += 1
+        # the next waiters on this key may be able to go now
+        self.cond.notify_all()
+        return 0.0
+
+    def _cancel(self, state, ticket):
+        with self.cond:
+            if ticket in state.queue:
+                state.queue.remove(ticket)
+                self.cond.notify_all()
+
+    def acquire(self, api_key=None, tokens=0, priority=INTERACTIVE, model=None):
+        """Block until this call may go out under the limits of its key and model."""
+        state, ticket = self._enqueue(api_key, model, priority)
+        started = time.monotonic()
+        try:
+            with self.cond:
+                while (wait := self._try_grant(state, ticket, tokens)) > 0:
+                    self.cond.wait(wait)
+                self.counters['queued_seconds'] += time.monotonic() - started
+        except BaseException:
+            self._cancel(state, ticket)
+            raise
+
+    async def aacquire(self, api_key=None, tokens=0, priority=INTERACTIVE, model=None):
+        state, ticket = self._enqueue(api_key, model, priority)
+        started = time.monotonic()
+        try:
+            while True:
+                with self.cond:
+                    wait = self._try_grant(state, ticket, tokens)
+                    if not wait:
+                        self.counters['queued_seconds'] += time.monotonic() - started
+                        return
+                await asyncio.sleep(min(wait, POLL_SECONDS))
+        except BaseException:
+            self._cancel(state, ticket)
+            raise
+
+    # === RETRIES ===
+    def _backoff(self, api_key, model, attempt, error, watch=None):
+        """Seconds to wait before retrying ``error``, or None to give up."""
+        if watch is not None and watch.started:
+            # tokens already reached the caller: a retry would stream the answer again
+            with self.cond:
+                self.counters['failed_mid_stream'] += 1
+            return None
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        hinted = retry_after(error)
+        with self.cond:
+            self.counters['retries'] += 1
+            if status_code(error) == 429:
+                self.counters['rate_limited'] += 1
+            if hinted is not None:
+                delay = max(delay, hinted)
+                # everyone on this key and model waits it out, not just this call
+                limits = self._key(api_key).limits(model)
+                limits.blocked_until = max(limits.blocked_until, time.monotonic() + hinted)
+        return delay
+
+    def _give_up(self, error):
+        with self.cond:
+            self.counters['failed'] += 1
+        if status_code(error) == 429:
+            raise RateLimitExceeded(
+                f"The model provider is rate-limiting this API key; try again in a moment ({error})"
+            ) from error
+        raise error
+
+    def call(self, fn, api_key=None, tokens=0, priority=INTERACTIVE, model=None, watch=None):
+        """``fn()`` once the limits allow it, retried on rate limits and server errors.
+
+        With an ``OutputWatch``, a failure after the first streamed token is raised, not retried.
+        """
+        for attempt in itertools.count():
+            self.acquire(api_key, tokens, priority, model)
+            try:
+                return fn()
+            except Exception as e:
+                delay = self._backoff(api_key, model, attempt, e, watch)
+                if delay is None:
+                    self._give_up(e)
+                self.sleep(delay)
+
+    async def acall(self, fn, api_key=None, tokens=0, priority=INTERACTIVE, model=None, watch=None):
+        for attempt in itertools.count():
+            await self.aacquire(api_key, tokens, priority, model)
+            try:
+                return await fn()
+            except Exception as e:
+                delay = self._backoff(api_key, model, attempt, e, watch)
+                if delay is None:
+                    self._give_up(e)
+                await asyncio.sleep(delay)
+
+    # === MODEL CALLS ===
+    @staticmethod
+    def estimate_tokens(messages):
+        return count_tokens_approximately(messages) + COMPLETION_ESTIMATE
+
+    def invoke(self, model, messages, config=None, api_key=None, priority=INTERACTIVE, model_name=None):
+        watch = OutputWatch()
+        config = merge_configs(config, {'callbacks': [watch]})
+        return self.call(
+            lambda: model.invoke(messages, config), api_key, self.estimate_tokens(messages), priority, model_name, watch,
+        )
+
+    async def ainvoke(self, model, messages, config=None, api_key=None, priority=INTERACTIVE, model_name=None):
+        watch = OutputWatch()
+        config = merge_configs(config, {'callbacks': [watch]})
+        return await self.acall(
+            lambda: model.ainvoke(messages, config), api_key, self.estimate_tokens(messages), priority, model_name, watch,
+        )
+
+    def stats(self):
+        with self.cond:
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for state in self.keys.values():
+                for priority, _, _ in state.queue:
+                    depth[PRIORITY_NAMES.get(priority, str(priority))] += 1
+            return {**self.counters, 'queue_depth': depth, 'keys': len(self.keys)}
+
+
+def scheduled(runnable, scheduler, api_key=None, priority=INTERACTIVE, model=None):
+    """``runnable`` with its invoke/ainvoke calls passed through ``scheduler``, limited per ``model``."""
+    def invoke(messages, config):
+        return scheduler.invoke(runnable, messages, config, api_key, priority, model)
+
+    async def ainvoke(messages, config):
+        return await scheduler.ainvoke(runnable, messages, config, api_key, priority, model)
+
+    return RunnableLambda(invoke, afunc=ainvoke, name='scheduled_model')
+
+
+# shared by every model call in this process, so limits hold across sessions
+request_scheduler = RequestScheduler()
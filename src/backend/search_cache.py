@@ -0,0 +1,155 @@
+import asyncio
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable
+from langchain_core.tools import BaseTool
+
+
+# === CACHE CONFIG ===
+DEFAULT_TTL_SECONDS = float(os.getenv('CHATBOT_SEARCH_CACHE_TTL', '300'))
+DEFAULT_MAX_ENTRIES = int(os.getenv('CHATBOT_SEARCH_CACHE_SIZE', '1024'))
+
+
+def normalize_query(query):
+    """Cache key for a search query: case, spacing and trailing punctuation don't matter."""
+    query = unicodedata.normalize('NFKC', str(query)).casefold()
+    return ' '.join(query.split()).rstrip('?!.').strip()
+
+
+def is_cacheable(result):
+    # TavilySearchResults reports failures as a repr(exception) string
+    # instead of raising, so only keep non-empty, non-string results
+    return bool(result) and not isinstance(result, str)
+
+
+class SearchCache:
+    """TTL + LRU cache with single-flight loading.
+
+    Concurrent lookups of the same key (from threads or coroutines) share one
+    upstream call: the first caller loads, the others wait for its result.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES, cacheable=is_cacheable):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.cacheable = cacheable
+        self.entries = OrderedDict()
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'coalesced': 0, 'evictions': 0, 'expirations': 0}
+
+    def _lookup(self, key):
+        """Return ``(hit, value, future, leader)`` under the lock."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.counters['hits'] += 1
+                    return True, value, None, False
+                del self.entries[key]
+                self.counters['expirations'] += 1
+            if key in self.in_flight:
+                self.counters['coalesced'] += 1
+                return False, None, self.in_flight[key], False
+            self.counters['misses'] += 1
+            future = Future()
+            self.in_flight[key] = future
+            return False, None, future, True
+
+    def _store(self, key, future, value=None, error=None):
+        with self.lock:
+            self.in_flight.pop(key, None)
+            if error is None and self.cacheable(value):
+                self.entries[key] = (time.monotonic() + self.ttl, value)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                    self.counters['evictions'] += 1
+        if error is None:
+            future.set_result(value)
+        else:
+            future.set_exception(error)
+
+    def get(self, key, load):
+        hit, value, future, leader = self._lookup(key)
+        if hit:
+            return value
+        if not leader:
+            return future.result()
+        try:
+            value = load()
+        except BaseException as e:
+            self._store(key, future, error=e)
+            raise
+        self._store(key, future, value)
+        return value
+
+    async def aget(self, key, aload):
+        hit, value, future, leader = self._lookup(key)
+        if hit:
+            return value
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            value = await aload()
+        except BaseException as e:
+            self._store(key, future, error=e)
+            raise
+        self._store(key, future, value)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.counters['hits'] + self.counters['misses'] + self.counters['coalesced']
+            return {
+                **self.counters,
+                'hit_rate': (self.counters['hits'] + self.counters['coalesced']) / lookups if lookups else 0.0,
+                'size': len(self.entries),
+            }
+
+
+class CachedSearchTool(BaseTool):
+    """Search tool that answers repeated queries from a shared SearchCache.
+
+    It presents the wrapped tool's name and argument schema to the model, so it
+    is a drop-in replacement inside ``ToolNode``. Any tool taking a ``query``
+    string works as the backend, including a local fake in tests.
+    """
+
+    inner: BaseTool
+    cache: Any
+
+    def _run(self, query: str) -> Any:
+        return self.cache.get(
+            normalize_query(query),
+            lambda: self.inner.invoke({'query': query}),
+        )
+
+    async def _arun(self, query: str) -> Any:
+        return await self.cache.aget(
+            normalize_query(query),
+            lambda: self.inner.ainvoke({'query': query}),
+        )
+
+    def stats(self):
+        return self.cache.stats()
+
+
+def cached_search(inner, ttl=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES, cacheable: Callable = is_cacheable):
+    return CachedSearchTool(
+        name=inner.name,
+        description=inner.description,
+        args_schema=inner.args_schema,
+        inner=inner,
+        cache=SearchCache(ttl=ttl, max_entries=max_entries, cacheable=cacheable),
+    )
@@ -0,0 +1,111 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from src.backend.memory import HashingEmbedder
+from src.backend.search_cache import normalize_query
+
+
+# === CACHE CONFIG ===
+SIMILARITY_THRESHOLD = float(os.getenv('CHATBOT_SEMANTIC_CACHE_THRESHOLD', '0.92'))
+TTL_SECONDS = float(os.getenv('CHATBOT_SEMANTIC_CACHE_TTL', '3600'))
+MAX_ENTRIES = int(os.getenv('CHATBOT_SEMANTIC_CACHE_SIZE', '5000'))
+
+# Follow-ups that lean on earlier turns ("why is that?", "and in Python?")
+# cannot be answered from a cache built on standalone questions.
+REFERENCE_RE = re.compile(
+    r"\b(it|its|that|this|these|those|they|them|he|she|him|her|above|previous|earlier|"
+    r"again|same|also|else|more|instead|you said|last one)\b"
+)
+FOLLOW_UP_RE = re.compile(r"^(and|but|so|or|what about|how about|why|then)\b")
+
+
+def is_context_dependent(query):
+    query = normalize_query(query)
+    return len(query.split()) < 3 or bool(REFERENCE_RE.search(query) or FOLLOW_UP_RE.match(query))
+
+
+def cache_scope(*parts):
+    """Exact-match part of the key: answers are only shared under identical prompts/models."""
+    return hashlib.sha256("\x00".join(map(str, parts)).encode()).hexdigest()
+
+
+class SemanticCache:
+    """Answers to standalone questions, looked up by embedding similarity.
+
+    Queries are normalized and embedded into a FAISS inner-product index;
+    a hit needs cosine similarity >= ``threshold`` and the same scope (system
+    prompt, persona, model). Entries expire after ``ttl`` seconds and are
+    LRU-evicted past ``max_entries``.
+    """
+
+    def __init__(self, embedder=None, threshold=SIMILARITY_THRESHOLD, ttl=TTL_SECONDS, max_entries=MAX_ENTRIES):
+        import faiss
+        self.embedder = embedder or HashingEmbedder()
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(self.embedder.dim))
+        # id -> (expires_at, scope, answer, latency of the original call)
+        self.entries = OrderedDict()
+        self.next_id = 0
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'skipped': 0, 'stores': 0, 'evictions': 0, 'latency_saved_seconds': 0.0}
+
+    def _vector(self, query):
+        return np.asarray(self.embedder.embed_query(normalize_query(query)), dtype='float32').reshape(1, -1)
+
+    def _remove(self, ids):
+        self.index.remove_ids(np.array(ids, dtype='int64'))
+        for entry_id in ids:
+            self.entries.pop(entry_id, None)
+
+    def skip(self):
+        with self.lock:
+            self.counters['skipped'] += 1
+
+    def lookup(self, query, scope):
+        vector = self._vector(query)
+        with self.lock:
+            if self.index.ntotal:
+                scores, ids = self.index.search(vector, min(8, self.index.ntotal))
+                for score, entry_id in zip(scores[0], ids[0]):
+                    if entry_id == -1 or score < self.threshold:
+                        break
+                    entry = self.entries.get(int(entry_id))
+                    # expired entries are dropped when met; the size cap bounds the rest
+                    if entry is not None and entry[0] <= time.monotonic():
+                        self._remove([int(entry_id)])
+                        continue
+                    if entry is not None and entry[1] == scope:
+                        self.entries.move_to_end(int(entry_id))
+                        self.counters['hits'] += 1
+                        self.counters['latency_saved_seconds'] += entry[3]
+                        return entry[2]
+            self.counters['misses'] += 1
+            return None
+
+    def store(self, query, scope, answer, latency=0.0):
+        vector = self._vector(query)
+        with self.lock:
+            entry_id = self.next_id
+            self.next_id += 1
+            self.index.add_with_ids(vector, np.array([entry_id], dtype='int64'))
+            self.entries[entry_id] = (time.monotonic() + self.ttl, scope, answer, latency)
+            self.counters['stores'] += 1
+            if len(self.entries) > self.max_entries:
+                oldest = list(self.entries)[:len(self.entries) - self.max_entries]
+                self._remove(oldest)
+                self.counters['evictions'] += len(oldest)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.counters['hits'] + self.counters['misses']
+            return {
+                **self.counters,
+                'hit_rate': self.counters['hits'] / lookups if lookups else 0.0,
+                'size': len(self.entries),
+            }
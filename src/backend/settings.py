@@ -0,0 +1,69 @@
+from langchain_core.messages import RemoveMessage, SystemMessage
+
+
+# === PER-THREAD SETTINGS ===
+# Stored once in ChatState['settings'] and rendered into a single system
+# message at call time, instead of a SystemMessage appended every turn.
+DEFAULT_SETTINGS = {
+    'system_prompt': 'You are a helpful assistant.',
+    'persona': 'Default Assistant',
+    'web_search': False,
+}
+
+
+def render_system_prompt(settings):
+    settings = {**DEFAULT_SETTINGS, **(settings or {})}
+    # threads migrated from stored system messages keep their exact prompt
+    if settings.get('raw_prompt'):
+        return settings['raw_prompt']
+    web_status = (
+        "✅ Web search enabled - You can access current information"
+        if settings['web_search']
+        else "❌ Web search disabled - Use only your training data"
+    )
+    return f"""
+System Instructions: {settings['system_prompt']}
+
+Persona: Act as a {settings['persona']}.
+
+Web Search Status: {web_status}
+
+Remember to be helpful, accurate, and maintain the specified persona throughout the conversation.
+    """.strip()
+
+
+def merge_settings(current, update):
+    """Reducer for ChatState['settings']: a partial update changes only the keys it names."""
+    merged = {**(current or {}), **(update or {})}
+    # a prompt or persona set explicitly replaces the verbatim prompt of a migrated thread
+    if update and 'raw_prompt' not in update and ('system_prompt' in update or 'persona' in update):
+        merged.pop('raw_prompt', None)
+    return merged
+
+
+def web_search_enabled(settings):
+    settings = settings or {}
+    # migrated threads keep the behaviour they were created with: search always bound
+    if 'web_search' not in settings and settings.get('raw_prompt'):
+        return True
+    return bool({**DEFAULT_SETTINGS, **settings}['web_search'])
+
+
+def system_message(settings):
+    return SystemMessage(content=render_system_prompt(settings))
+
+
+def migrate_system_messages(messages, settings):
+    """State update that strips stored system messages from an older thread.
+
+    Threads created before per-thread settings carry one SystemMessage per
+    turn. They are removed from the history; when the thread has no settings
+    yet, the latest one is kept verbatim as its prompt.
+    """
+    stored = [msg for msg in messages if isinstance(msg, SystemMessage)]
+    if not stored:
+        return {}
+    update = {'messages': [RemoveMessage(id=msg.id) for msg in stored]}
+    if not settings:
+        update['settings'] = {'raw_prompt': stored[-1].content}
+    return update
@@ -0,0 +1,93 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubProvider:
+    """Local OpenAI-compatible chat endpoint that can answer 429 / 5xx on demand.
+
+    ``rate_limit_every`` makes every n-th request a 429 carrying
+    ``retry_after`` seconds; ``fail_first`` makes the first requests fail
+    with ``fail_status``. Point a client at ``base_url`` (``LLMPool(base_url=...)``).
+    Streaming requests get a short SSE reply.
+    """
+
+    def __init__(self, reply="stub reply", latency=0.0, rate_limit_every=0, retry_after=0.2,
+                 fail_first=0, fail_status=503):
+        self.reply = reply
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.lock = threading.Lock()
+        self.counters = {'requests': 0, 'ok': 0, 'rate_limited': 0, 'failed': 0}
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _outcome(self):
+        with self.lock:
+            self.counters['requests'] += 1
+            n = self.counters['requests']
+            if n <= self.fail_first:
+                self.counters['failed'] += 1
+                return self.fail_status
+            if self.rate_limit_every and n % self.rate_limit_every == 0:
+                self.counters['rate_limited'] += 1
+                return 429
+            self.counters['ok'] += 1
+            return 200
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _send(self, status, body, content_type='application/json', headers=()):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers['Content-Length'])) or b'{}')
+                status = stub._outcome()
+                if status != 200:
+                    error = json.dumps({'error': {'message': f"stub {status}", 'type': 'stub'}}).encode()
+                    headers = [('retry-after', str(stub.retry_after))] if status == 429 else []
+                    return self._send(status, error, headers=headers)
+                time.sleep(stub.latency)
+                if request.get('stream'):
+                    chunk = {'id': 'stub', 'object': 'chat.completion.chunk', 'created': 0, 'model': request.get('model'),
+                             'choices': [{'index': 0, 'delta': {'role': 'assistant', 'content': stub.reply}, 'finish_reason': None}]}
+                    done = {**chunk, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]}
+                    body = f"data: {json.dumps(chunk)}\n\ndata: {json.dumps(done)}\n\ndata: [DONE]\n\n".encode()
+                    return self._send(200, body, 'text/event-stream')
+                body = json.dumps({
+                    'id': 'stub', 'object': 'chat.completion', 'created': 0, 'model': request.get('model'),
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': stub.reply}, 'finish_reason': 'stop'}],
+                    'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2},
+                }).encode()
+                self._send(200, body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
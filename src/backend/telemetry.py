@@ -0,0 +1,282 @@
+import bisect
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages.utils import count_tokens_approximately
+
+
+# === TELEMETRY CONFIG ===
+TRACING_ENABLED = os.getenv('CHATBOT_TRACING') == '1'
+# JSONL span file for offline analysis; unset keeps spans in memory only
+TRACE_FILE = os.getenv('CHATBOT_TRACE_FILE')
+MAX_THREADS = 1000
+
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+
+class Histogram:
+    """Fixed-bucket histogram; percentiles are reported as bucket upper bounds."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q):
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean': round(self.sum / self.count, 2) if self.count else 0.0,
+            'p50': self.percentile(0.5) if self.count else 0.0,
+            'p90': self.percentile(0.9) if self.count else 0.0,
+            'p99': self.percentile(0.99) if self.count else 0.0,
+            'max': round(self.max, 2),
+            'buckets': dict(zip([*map(str, self.buckets), '+Inf'], self.counts)),
+        }
+
+
+class JSONLExporter:
+    """Appends finished spans to a JSON-lines file, one span per line."""
+
+    def __init__(self, path=TRACE_FILE):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+
+    def export(self, spans):
+        lines = "".join(json.dumps(span, default=str) + "\n" for span in spans)
+        with self.lock, open(self.path, 'a') as f:
+            f.write(lines)
+
+
+class Run:
+    __slots__ = ('kind', 'name', 'turn', 'thread_id', 'started', 'attrs')
+
+    def __init__(self, kind, name, turn, thread_id, attrs=None):
+        self.kind = kind
+        self.name = name
+        self.turn = turn
+        self.thread_id = thread_id
+        self.started = time.perf_counter()
+        self.attrs = attrs or {}
+
+
+class Tracer(BaseCallbackHandler):
+    """Callback handler that turns graph runs into spans and histograms.
+
+    Attached to the compiled graph with ``with_config(callbacks=[tracer])``.
+    Every graph invocation is a ``turn`` span; node invocations, model calls
+    and tool calls inside it are child spans. Aggregates: latency histograms
+    per node, per tool, for the model and the whole turn; time to first
+    token; prompt/completion tokens; graph overhead (turn time not spent in
+    any node, which is mostly checkpoint writes); and per-thread totals.
+    Nothing is attached when tracing is off, so it then costs nothing.
+    """
+
+    # record on the calling thread instead of a callback executor
+    run_inline = True
+
+    def __init__(self, exporter=None, max_threads=MAX_THREADS):
+        self.exporter = exporter
+        self.max_threads = max_threads
+        self.lock = threading.Lock()
+        self.runs = {}
+        self.histograms = {}
+        self.counters = {'turns': 0, 'errors': 0, 'llm_calls': 0, 'tool_calls': 0}
+        self.threads = OrderedDict()
+
+    # === AGGREGATES ===
+    def observe(self, name, value, buckets=LATENCY_BUCKETS_MS):
+        with self.lock:
+            self._observe(name, value, buckets)
+
+    def _observe(self, name, value, buckets=LATENCY_BUCKETS_MS):
+        if name not in self.histograms:
+            self.histograms[name] = Histogram(buckets)
+        self.histograms[name].observe(value)
+
+    def _thread(self, thread_id):
+        totals = self.threads.get(thread_id)
+        if totals is None:
+            totals = self.threads[thread_id] = {
+                'turns': 0, 'latency_ms': 0.0, 'tool_calls': 0, 'tool_ms': 0.0,
+                'prompt_tokens': 0, 'completion_tokens': 0,
+            }
+            while len(self.threads) > self.max_threads:
+                self.threads.popitem(last=False)
+        self.threads.move_to_end(thread_id)
+        return totals
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                **self.counters,
+                'histograms': {name: h.snapshot() for name, h in sorted(self.histograms.items())},
+                'threads': dict(self.threads),
+            }
+
+    # === SPANS ===
+    def _start(self, run_id, parent_run_id, kind, name, metadata, attrs=None):
+        with self.lock:
+            parent = self.runs.get(parent_run_id)
+            turn = parent.turn if parent else None
+            thread_id = parent.thread_id if parent else (metadata or {}).get('thread_id')
+            run = Run(kind, name, turn, thread_id, attrs)
+            if turn is None:
+                run.name = 'turn'
+                run.turn = run
+                run.attrs.update(spans=[], node_ms=0.0, ttft_ms=None)
+            self.runs[run_id] = run
+        return run
+
+    def _end(self, run_id, error=None, **attrs):
+        ended = time.perf_counter()
+        with self.lock:
+            run = self.runs.pop(run_id, None)
+            if run is None:
+                return None, None
+            duration_ms = (ended - run.started) * 1000
+            run.attrs.update(attrs)
+            if error is not None:
+                run.attrs['error'] = repr(error)
+            span = None
+            if run.kind != 'chain' or run.turn is run or run.attrs.get('node'):
+                spans = run.turn.attrs['spans']
+                span = {
+                    'kind': run.kind,
+                    'name': run.name,
+                    'thread_id': run.thread_id,
+                    'duration_ms': round(duration_ms, 3),
+                    **{k: v for k, v in run.attrs.items() if k not in ('spans', 'node')},
+                }
+                if run.turn is not run:
+                    spans.append(span)
+            self._record(run, duration_ms)
+            finished = run.turn.attrs['spans'] if run.turn is run else None
+        if finished is not None and self.exporter is not None:
+            self.exporter.export([*finished, span])
+        return run, duration_ms
+
+    def _record(self, run, duration_ms):
+        turn = run.turn
+        thread = self._thread(run.thread_id) if run.thread_id else None
+        if run is turn:
+            self.counters['turns'] += 1
+            self.counters['errors'] += 'error' in run.attrs
+            self._observe('turn_ms', duration_ms)
+            self._observe('graph_overhead_ms', max(duration_ms - turn.attrs['node_ms'], 0.0))
+            if turn.attrs['ttft_ms'] is not None:
+                self._observe('ttft_ms', turn.attrs['ttft_ms'])
+            if thread:
+                thread['turns'] += 1
+                thread['latency_ms'] += duration_ms
+        elif run.kind == 'chain' and run.attrs.get('node'):
+            self._observe(f'node_ms.{run.name}', duration_ms)
+            turn.attrs['node_ms'] += duration_ms
+        elif run.kind == 'llm':
+            self.counters['llm_calls'] += 1
+            self._observe('llm_ms', duration_ms)
+            self._observe('prompt_tokens', run.attrs.get('prompt_tokens', 0), TOKEN_BUCKETS)
+            self._observe('completion_tokens', run.attrs.get('completion_tokens', 0), TOKEN_BUCKETS)
+            if thread:
+                thread['prompt_tokens'] += run.attrs.get('prompt_tokens', 0)
+                thread['completion_tokens'] += run.attrs.get('completion_tokens', 0)
+        elif run.kind == 'tool':
+            self.counters['tool_calls'] += 1
+            self._observe(f'tool_ms.{run.name}', duration_ms)
+            if thread:
+                thread['tool_calls'] += 1
+                thread['tool_ms'] += duration_ms
+
+    # === CALLBACKS ===
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        node = (metadata or {}).get('langgraph_node')
+        parent = self.runs.get(parent_run_id)
+        # node runs hang directly off the graph run; their inner runnables share the metadata
+        is_node = parent is not None and parent.turn is parent and node is not None
+        name = node if is_node else kwargs.get('name') or 'chain'
+        self._start(run_id, parent_run_id, 'chain', name, metadata, {'node': True} if is_node else None)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        node = (metadata or {}).get('langgraph_node')
+        prompt_tokens = count_tokens_approximately(messages[0]) if messages else 0
+        self._start(run_id, parent_run_id, 'llm', node or 'llm', metadata, {'prompt_tokens': prompt_tokens})
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        if not token:
+            return
+        with self.lock:
+            run = self.runs.get(run_id)
+            if run is None or 'ttft_ms' in run.attrs:
+                return
+            now = time.perf_counter()
+            run.attrs['ttft_ms'] = round((now - run.started) * 1000, 3)
+            # the user waits from the start of the turn, not of this model call
+            if run.name == 'chat_node' and run.turn.attrs['ttft_ms'] is None:
+                run.turn.attrs['ttft_ms'] = (now - run.turn.started) * 1000
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        attrs = {}
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        message = getattr(generation, 'message', None)
+        usage = getattr(message, 'usage_metadata', None)
+        if usage:
+            attrs = {'prompt_tokens': usage['input_tokens'], 'completion_tokens': usage['output_tokens']}
+        elif message is not None:
+            attrs = {'completion_tokens': count_tokens_approximately([message])}
+        if message is not None and getattr(message, 'tool_calls', None):
+            attrs['tool_calls'] = len(message.tool_calls)
+        with self.lock:
+            run = self.runs.get(run_id)
+            # streamed answers: a non-streaming call's first token is the whole reply
+            if run is not None and run.name == 'chat_node' and message is not None and message.content and run.turn.attrs['ttft_ms'] is None:
+                run.turn.attrs['ttft_ms'] = (time.perf_counter() - run.turn.started) * 1000
+        self._end(run_id, **attrs)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = kwargs.get('name') or (serialized or {}).get('name') or 'tool'
+        self._start(run_id, parent_run_id, 'tool', name, metadata)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+
+def make_tracer(enabled=None, trace_file=None):
+    """The process tracer, or None when tracing is off (CHATBOT_TRACING=1 turns it on)."""
+    if not (TRACING_ENABLED if enabled is None else enabled):
+        return None
+    trace_file = trace_file or TRACE_FILE
+    return Tracer(exporter=JSONLExporter(trace_file) if trace_file else None)
@@ -0,0 +1,167 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+
+# === TOOL BUDGET CONFIG ===
+MAX_TOOL_ROUNDS = int(os.getenv('CHATBOT_MAX_TOOL_ROUNDS', '3'))
+TOOL_TIMEOUT_SECONDS = float(os.getenv('CHATBOT_TOOL_TIMEOUT', '15'))
+TURN_DEADLINE_SECONDS = float(os.getenv('CHATBOT_TURN_DEADLINE', '60'))
+MAX_CONCURRENT_TOOLS = int(os.getenv('CHATBOT_MAX_CONCURRENT_TOOLS', '8'))
+
+
+def tool_rounds(messages):
+    """Tool-calling AI messages since the last user message, i.e. rounds taken this turn."""
+    rounds = 0
+    for msg in reversed(messages):
+        if isinstance(msg, HumanMessage):
+            break
+        rounds += isinstance(msg, AIMessage) and bool(msg.tool_calls)
+    return rounds
+
+
+class ToolExecutor:
+    """Runs the tool calls of one AI message under per-turn budgets.
+
+    Calls from the same message run concurrently, each limited to
+    ``tool_timeout`` seconds and to what is left of ``turn_deadline``
+    (measured from the state's ``turn_started_at``). ``max_concurrency``
+    caps tool calls in flight across the whole process, sync and async
+    alike. Failures, timeouts and calls past ``max_rounds`` come back as
+    error ToolMessages, and once the budget is spent ``exhausted`` tells the
+    graph to answer without tools, so the user gets a degraded answer
+    instead of a hung or endless turn.
+    """
+
+    def __init__(self, tools, max_rounds=MAX_TOOL_ROUNDS, tool_timeout=TOOL_TIMEOUT_SECONDS,
+                 turn_deadline=TURN_DEADLINE_SECONDS, max_concurrency=MAX_CONCURRENT_TOOLS):
+        self.tools = {tool.name: tool for tool in tools}
+        self.max_rounds = max_rounds
+        self.tool_timeout = tool_timeout
+        self.turn_deadline = turn_deadline
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        # a timed-out sync call keeps its worker until it returns; the pool is
+        # sized past the slot count so that cannot starve the other callers
+        self.pool = ThreadPoolExecutor(max_workers=max_concurrency * 2, thread_name_prefix='tool')
+        self.lock = threading.Lock()
+        self.counters = {'calls': 0, 'errors': 0, 'timeouts': 0, 'rejected': 0}
+
+    # === BUDGETS ===
+    def remaining(self, state):
+        started = state.get('turn_started_at') or time.time()
+        return self.turn_deadline - (time.time() - started)
+
+    def exhausted(self, state):
+        """True once this turn has used its tool rounds or its deadline."""
+        return tool_rounds(state['messages']) >= self.max_rounds or self.remaining(state) <= 0
+
+    def _count(self, key, n=1):
+        with self.lock:
+            self.counters[key] += n
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+    # === RESULTS ===
+    def _error(self, call, content):
+        self._count('errors')
+        return ToolMessage(content=content, tool_call_id=call['id'], name=call['name'], status='error')
+
+    def _plan(self, state, allowed):
+        """(calls to run, messages for calls refused up front, per-call timeout)."""
+        calls = state['messages'][-1].tool_calls
+        # the message being answered is itself one of the counted rounds
+        if tool_rounds(state['messages']) > self.max_rounds or self.remaining(state) <= 0:
+            self._count('rejected', len(calls))
+            note = "Tool budget for this turn is used up; answer with the information already gathered."
+            return [], [self._error(call, note) for call in calls], 0
+        runnable, refused = [], []
+        for call in calls:
+            if call['name'] not in self.tools or (allowed is not None and call['name'] not in allowed):
+                self._count('rejected')
+                refused.append(self._error(call, f"Tool '{call['name']}' is not available for this request."))
+            else:
+                runnable.append(call)
+        return runnable, refused, min(self.tool_timeout, self.remaining(state))
+
+    def _timed_out(self, call, timeout):
+        self._count('timeouts')
+        return self._error(call, f"Tool '{call['name']}' did not answer within {timeout:.1f}s; answer without it.")
+
+    def _failed(self, call, error):
+        return self._error(call, f"Tool '{call['name']}' failed: {error}")
+
+    @staticmethod
+    def _ordered(calls, messages):
+        # answer in the order the model asked, whatever finished first
+        position = {call['id']: i for i, call in enumerate(calls)}
+        return sorted(messages, key=lambda msg: position[msg.tool_call_id])
+
+    # === SYNC ===
+    def _invoke(self, call, config, deadline):
+        # the worker is already taken, so cancelling the future cannot stop a call
+        # queued for a slot: it gives up at the deadline instead of running for nobody
+        if not self.slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            return None
+        try:
+            return self.tools[call['name']].invoke({**call, 'type': 'tool_call'}, config)
+        finally:
+            self.slots.release()
+
+    def run(self, state, config=None, allowed=None):
+        calls = state['messages'][-1].tool_calls
+        runnable, messages, timeout = self._plan(state, allowed)
+        self._count('calls', len(runnable))
+        deadline = time.monotonic() + timeout
+        futures = [(call, self.pool.submit(self._invoke, call, config, deadline)) for call in runnable]
+        for call, future in futures:
+            try:
+                result = future.result(timeout=max(deadline - time.monotonic(), 0))
+            except FutureTimeout:
+                # already running: its result is discarded
+                result = None
+            except Exception as e:
+                messages.append(self._failed(call, e))
+                continue
+            messages.append(result if result is not None else self._timed_out(call, timeout))
+        return self._ordered(calls, messages)
+
+    # === ASYNC ===
+    async def _acquire(self):
+        if self.slots.acquire(blocking=False):
+            return
+        # all slots busy: wait on a worker thread rather than blocking the event loop
+        waiter = asyncio.get_running_loop().run_in_executor(None, self.slots.acquire)
+        try:
+            await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            # timed out while queued: hand the slot back as soon as it is granted
+            waiter.add_done_callback(lambda _: self.slots.release())
+            raise
+
+    async def _ainvoke(self, call, config):
+        await self._acquire()
+        try:
+            return await self.tools[call['name']].ainvoke({**call, 'type': 'tool_call'}, config)
+        finally:
+            self.slots.release()
+
+    async def _arun_one(self, call, config, deadline, timeout):
+        try:
+            return await asyncio.wait_for(self._ainvoke(call, config), max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            return self._timed_out(call, timeout)
+        except Exception as e:
+            return self._failed(call, e)
+
+    async def arun(self, state, config=None, allowed=None):
+        calls = state['messages'][-1].tool_calls
+        runnable, messages, timeout = self._plan(state, allowed)
+        self._count('calls', len(runnable))
+        deadline = time.monotonic() + timeout
+        messages += await asyncio.gather(*(self._arun_one(call, config, deadline, timeout) for call in runnable))
+        return self._ordered(calls, messages)
@@ -0,0 +1,45 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BackgroundTasks:
+    """Memoized background jobs for cosmetic LLM calls (titles, summaries, greetings).
+
+    ``get`` starts a job the first time a key is seen and returns ``default``
+    until it has finished, so a Streamlit rerun never waits on it. Keys should
+    encode everything the result depends on, e.g. ``('summary', thread_id, n)``
+    with ``n`` the number of messages summarized.
+    """
+
+    def __init__(self, max_workers=4, max_entries=1024):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='aux-llm')
+        self.max_entries = max_entries
+        self.futures = OrderedDict()
+        self.lock = threading.Lock()
+
+    def submit(self, key, fn, *args):
+        with self.lock:
+            if key not in self.futures:
+                self.futures[key] = self.pool.submit(fn, *args)
+                self._trim()
+            return self.futures[key]
+
+    def result(self, key, default=None):
+        with self.lock:
+            future = self.futures.get(key)
+        if future is None or not future.done() or future.exception() is not None:
+            return default
+        return future.result()
+
+    def get(self, key, fn, *args, default=None):
+        self.submit(key, fn, *args)
+        return self.result(key, default)
+
+    def _trim(self):
+        # drop the oldest finished jobs; running ones are kept so they aren't resubmitted
+        for key in list(self.futures):
+            if len(self.futures) <= self.max_entries:
+                break
+            if self.futures[key].done():
+                del self.futures[key]
@@ -0,0 +1,53 @@
+import time
+
+
+class StreamRenderer:
+    """Coalesces streamed chunks into a few markdown renders.
+
+    Chunks are buffered in a list and the container is only re-rendered once
+    ``interval`` seconds have passed or ``max_pending_bytes`` have piled up
+    since the last render, plus one final render without the cursor. With
+    ``measure=True`` the renderer also counts render calls, bytes sent and
+    seconds spent rendering.
+    """
+
+    def __init__(self, container, interval=0.08, max_pending_bytes=1024, cursor="▌", measure=False, clock=time.monotonic):
+        self.container = container
+        self.interval = interval
+        self.max_pending_bytes = max_pending_bytes
+        self.cursor = cursor
+        self.measure = measure
+        self.clock = clock
+        self.parts = []
+        self.pending_bytes = 0
+        self.last_render = clock()
+        self.stats = {'chunks': 0, 'render_calls': 0, 'bytes_sent': 0, 'render_seconds': 0.0}
+
+    @property
+    def text(self):
+        return "".join(self.parts)
+
+    def write(self, chunk):
+        if not chunk:
+            return
+        self.parts.append(chunk)
+        self.stats['chunks'] += 1
+        # UTF-8 bytes either way, so measuring never changes when renders happen
+        self.pending_bytes += len(chunk.encode())
+        if self.pending_bytes >= self.max_pending_bytes or self.clock() - self.last_render >= self.interval:
+            self._render(self.text + self.cursor)
+
+    def close(self):
+        text = self.text
+        self._render(text)
+        return text
+
+    def _render(self, body):
+        started = self.clock()
+        self.container.markdown(body)
+        self.pending_bytes = 0
+        self.last_render = self.clock()
+        self.stats['render_calls'] += 1
+        if self.measure:
+            self.stats['bytes_sent'] += len(body.encode())
+            self.stats['render_seconds'] += self.last_render - started
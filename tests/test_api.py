@@ -0,0 +1,111 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from langgraph.checkpoint.memory import InMemorySaver
+from benchmarks.fakes import ScriptedChatModel
+from src.backend.api import create_app
+from src.backend.catalog import ThreadCatalog
+from src.backend.chatbot import build_graph
+
+
+REPLY = "A short streamed answer."
+
+
+@pytest.fixture
+def api():
+    model = ScriptedChatModel(first_token_latency=0, tokens_per_second=10 ** 6, reply=REPLY)
+    catalog = ThreadCatalog(':memory:')
+    graph = build_graph(model, [], InMemorySaver(), catalog=catalog)
+    return TestClient(create_app(graph=graph, catalog=catalog))
+
+
+def sse_events(body):
+    """(event, data) pairs of an SSE body, checking each frame is 'event:' + 'data:' + blank line."""
+    events = []
+    for frame in body.split('\n\n')[:-1]:
+        event, data = frame.split('\n')
+        assert event.startswith('event: ') and data.startswith('data: ')
+        events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+    assert body.endswith('\n\n')
+    return events
+
+
+def test_create_and_list_threads(api):
+    created = api.post('/threads', json={'title': "Trip planning"})
+    assert created.status_code == 201
+    thread = created.json()
+    assert thread['title'] == "Trip planning"
+    assert thread['message_count'] == 0
+    assert api.post('/threads').json()['title'] == "New Chat"
+
+    listed = api.get('/threads').json()
+    assert len(listed) == 2
+    assert thread['thread_id'] in [t['thread_id'] for t in listed]
+    assert len(api.get('/threads', params={'limit': 1}).json()) == 1
+    assert api.get('/threads', params={'limit': 0}).status_code == 422
+
+
+def test_post_message_replies_and_updates_the_thread(api):
+    thread_id = api.post('/threads').json()['thread_id']
+    response = api.post(f'/threads/{thread_id}/messages', json={'content': "hello"})
+    assert response.status_code == 200
+    assert response.json() == {'thread_id': thread_id, 'message': {'role': 'assistant', 'content': REPLY, 'seq': None}}
+
+    thread = next(t for t in api.get('/threads').json() if t['thread_id'] == thread_id)
+    assert thread['message_count'] == 2
+    assert thread['preview'] == REPLY
+
+
+def test_stream_frames_tokens_then_done(api):
+    response = api.post('/threads/s1/stream', json={'content': "hello"})
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/event-stream')
+
+    events = sse_events(response.text)
+    tokens = [data['content'] for event, data in events if event == 'token']
+    assert len(tokens) > 1
+    assert ''.join(tokens) == REPLY
+    assert events[-1] == ('done', {'thread_id': 's1'})
+
+    history = api.get('/threads/s1/messages').json()['messages']
+    assert [(m['role'], m['content']) for m in history] == [('user', "hello"), ('assistant', REPLY)]
+
+
+def test_history_pages_back_with_before(api):
+    for i in range(3):
+        api.post('/threads/p1/messages', json={'content': f"question {i}"})
+
+    latest = api.get('/threads/p1/messages', params={'limit': 4}).json()
+    assert [m['seq'] for m in latest['messages']] == [2, 3, 4, 5]
+    assert latest['has_more'] is True
+    assert latest['next_before'] == 2
+
+    older = api.get('/threads/p1/messages', params={'limit': 4, 'before': latest['next_before']}).json()
+    assert [m['content'] for m in older['messages']] == ["question 0", REPLY]
+    assert older['has_more'] is False
+    assert older['next_before'] is None
+
+
+def test_unknown_thread_is_404(api):
+    response = api.get('/threads/missing/messages')
+    assert response.status_code == 404
+    assert response.json() == {'detail': "Thread not found"}
+    # a created thread without messages is found, just empty
+    thread_id = api.post('/threads').json()['thread_id']
+    assert api.get(f'/threads/{thread_id}/messages').json() == {'messages': [], 'has_more': False, 'next_before': None}
+
+
+def test_threads_are_private_to_their_owner(api):
+    thread_id = api.post('/threads', json={'user_id': 'alice'}).json()['thread_id']
+    api.post(f'/threads/{thread_id}/messages', json={'content': "my secret plans", 'user_id': 'alice'})
+
+    assert [t['thread_id'] for t in api.get('/threads', params={'user_id': 'alice'}).json()] == [thread_id]
+    assert api.get('/threads', params={'user_id': 'bob'}).json() == []
+    assert api.get('/threads').json() == []
+
+    assert api.get(f'/threads/{thread_id}/messages', params={'user_id': 'bob'}).status_code == 404
+    assert api.get(f'/threads/{thread_id}/messages').status_code == 404
+    assert api.post(f'/threads/{thread_id}/messages', json={'content': "hi", 'user_id': 'bob'}).status_code == 404
+    assert api.post(f'/threads/{thread_id}/stream', json={'content': "hi"}).status_code == 404
+    history = api.get(f'/threads/{thread_id}/messages', params={'user_id': 'alice'}).json()['messages']
+    assert history[0]['content'] == "my secret plans"
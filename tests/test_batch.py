@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import json
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langgraph.checkpoint.memory import InMemorySaver
+from src.backend.batch import BatchRunner, build_batch_graph
+from src.backend.chatbot import build_graph
+from src.backend.stub_provider import StubProvider
+
+
+class EchoModel(BaseChatModel):
+    """Answers with the last user message; prompts starting with 'slow' take ``slow_seconds``."""
+
+    slow_seconds: float = 0.3
+
+    @property
+    def _llm_type(self):
+        return 'echo-fake'
+
+    def _reply(self, messages):
+        prompt = [msg for msg in messages if msg.type == 'human'][-1].content
+        return prompt, ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"echo: {prompt}"))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return self._reply(messages)[1]
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt, result = self._reply(messages)
+        await asyncio.sleep(self.slow_seconds if prompt.startswith('slow') else 0.01)
+        return result
+
+
+def write_items(path, items):
+    path.write_text(''.join(json.dumps(item) + '\n' for item in items))
+
+
+def read_records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_slow_item_does_not_hold_back_the_others(tmp_path):
+    source, out = tmp_path / 'in.jsonl', tmp_path / 'out.jsonl'
+    write_items(source, [{'id': 'slow', 'prompt': "slow question"}] + [{'id': str(i), 'prompt': f"q{i}"} for i in range(8)])
+    runner = BatchRunner(build_graph(EchoModel(), [], InMemorySaver()), concurrency=2)
+    stats = asyncio.run(runner.run(str(source), str(out)))
+
+    records = read_records(out)
+    # lines are written as items finish: the fast ones stream past the slow one
+    assert [record['id'] for record in records] == [str(i) for i in range(8)] + ['slow']
+    assert stats['ok'] == 9 and stats['failed'] == 0
+    # the slow item ran alongside the others, not ahead of them
+    assert stats['seconds'] < 0.3 + 0.2
+
+
+def test_turns_replay_in_order_and_failures_are_reported(tmp_path):
+    source, out = tmp_path / 'in.jsonl', tmp_path / 'out.jsonl'
+    write_items(source, [
+        {'id': 'chat', 'turns': ["first", "second", "third"], 'expected': "kept"},
+        {'id': 'empty', 'turns': []},
+    ])
+    runner = BatchRunner(build_graph(EchoModel(), [], InMemorySaver()), concurrency=4)
+    stats = asyncio.run(runner.run(str(source), str(out)))
+
+    records = {record['id']: record for record in read_records(out)}
+    assert records['chat']['replies'] == ["echo: first", "echo: second", "echo: third"]
+    assert records['chat']['expected'] == "kept"
+    assert 'error' in records['empty']
+    assert stats['turns'] == 3
+    # ephemeral threads are gone once their item is written
+    assert not list(runner.graph.checkpointer.list(None))
+
+
+def test_stub_run_uses_the_production_graph(tmp_path):
+    source, out = tmp_path / 'in.jsonl', tmp_path / 'out.jsonl'
+    write_items(source, [{'id': str(i), 'prompt': f"q{i}"} for i in range(5)])
+    args = argparse.Namespace(persistent=False, model=None, web_search=False)
+    with StubProvider(reply="stub reply") as stub:
+        runner = BatchRunner(build_batch_graph(args, stub.base_url), concurrency=2)
+        stats = asyncio.run(runner.run(str(source), str(out)))
+        assert stub.counters['requests'] == 5
+    assert stats['ok'] == 5
+    assert all(record['replies'] == ["stub reply"] for record in read_records(out))
@@ -0,0 +1,76 @@
+import sqlite3
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from benchmarks.fakes import DelayedChatModel
+from src.backend.catalog import ThreadCatalog, load_history_page
+from src.backend.chatbot import build_graph
+
+
+def history(catalog, thread_id, owner=None):
+    return [(m['role'], m['content']) for m in catalog.history_page(thread_id, owner=owner)['messages']]
+
+
+def turn(graph, thread_id, text, user_id=None):
+    configurable = {'thread_id': thread_id, **({'user_id': user_id} if user_id else {})}
+    graph.invoke({'messages': [HumanMessage(content=text)]}, {'configurable': configurable})
+
+
+def test_graph_records_turns_and_catches_up_missed_ones():
+    saver, catalog = InMemorySaver(), ThreadCatalog(':memory:')
+    model = DelayedChatModel(latency=0, reply="answer")
+    recording = build_graph(model, [], saver, catalog=catalog)
+    # a turn whose caller never got to record it, e.g. a stream dropped before 'done'
+    unrecorded = build_graph(model, [], saver)
+
+    turn(recording, 't', "first")
+    turn(unrecorded, 't', "second")
+    assert len(history(catalog, 't')) == 2
+    turn(recording, 't', "third")
+    assert history(catalog, 't') == [
+        ('user', "first"), ('assistant', "answer"),
+        ('user', "second"), ('assistant', "answer"),
+        ('user', "third"), ('assistant', "answer"),
+    ]
+
+
+def test_sync_only_appends_what_is_new():
+    catalog = ThreadCatalog(':memory:')
+    messages = [('user', "q"), ('assistant', "a")]
+    catalog.sync_messages('t', messages)
+    catalog.sync_messages('t', messages)
+    assert catalog.get_thread('t')['message_count'] == 2
+    catalog.sync_messages('t', messages + [('user', "q2")])
+    assert history(catalog, 't')[-1] == ('user', "q2")
+
+
+def test_threads_are_listed_and_read_per_owner():
+    catalog = ThreadCatalog(':memory:')
+    graph = build_graph(DelayedChatModel(latency=0), [], InMemorySaver(), catalog=catalog)
+    turn(graph, 'a1', "alice's question", user_id='alice')
+    turn(graph, 'anon', "anonymous question")
+
+    assert [t['thread_id'] for t in catalog.list_threads(owner='alice')] == ['a1']
+    assert [t['thread_id'] for t in catalog.list_threads()] == ['anon']
+    assert catalog.list_threads(owner='bob') == []
+    assert history(catalog, 'a1', owner='bob') == []
+    assert load_history_page(catalog, graph, 'a1', owner='bob')['messages'] == []
+    assert history(catalog, 'a1', owner='alice')[0] == ('user', "alice's question")
+
+
+def test_catalog_from_before_owners_is_migrated(tmp_path):
+    path = str(tmp_path / 'catalog.sqlite')
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE threads (thread_id TEXT PRIMARY KEY, title TEXT NOT NULL, created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL, message_count INTEGER NOT NULL DEFAULT 0, preview TEXT NOT NULL DEFAULT '');
+        CREATE INDEX threads_updated_at ON threads (updated_at DESC);
+        INSERT INTO threads (thread_id, title, created_at, updated_at) VALUES ('old', 'Old chat', 'x', 'x');
+    """)
+    conn.close()
+
+    catalog = ThreadCatalog(path)
+    # threads from before owners are anonymous: never shown to a signed-in owner
+    assert [t['thread_id'] for t in catalog.list_threads()] == ['old']
+    assert catalog.list_threads(owner='alice') == []
+    catalog.create_thread('new', owner='alice')
+    assert [t['thread_id'] for t in catalog.list_threads(owner='alice')] == ['new']
@@ -0,0 +1,175 @@
+import asyncio
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from benchmarks.fakes import FakeSearchTool, ScriptedChatModel
+from src.backend.chatbot import build_graph
+from src.backend.checkpoint import COMPRESSED_PREFIX, MESSAGE_REFS, SQLiteSaver
+
+
+def make_graph(saver, tool_rounds=0, result_chars=200):
+    model = ScriptedChatModel(first_token_latency=0, tokens_per_second=10 ** 6, tool_rounds=tool_rounds)
+    return build_graph(model, [FakeSearchTool(latency=0, result_chars=result_chars)], saver)
+
+
+def chat(graph, thread_id, text, web_search=False):
+    config = {'configurable': {'thread_id': thread_id}}
+    graph.invoke({'messages': [HumanMessage(content=text)], 'settings': {'web_search': web_search}}, config)
+    return config
+
+
+def contents(graph, config):
+    return [msg.content for msg in graph.get_state(config).values['messages']]
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / 'checkpoints.sqlite')
+
+
+def test_threads_survive_a_restart(db):
+    saver = SQLiteSaver(db, flush_interval=3600)
+    graph = make_graph(saver)
+    config = chat(graph, 't', "first")
+    chat(graph, 't', "second")
+    before = contents(graph, config)
+    saver.close()
+
+    reopened = SQLiteSaver(db, flush_interval=3600)
+    graph = make_graph(reopened)
+    assert contents(graph, config) == before
+    assert reopened.stats()['misses'] == 1
+    # the restored thread keeps going
+    chat(graph, 't', "third")
+    assert contents(graph, config)[:4] == before
+    assert contents(graph, config)[4] == "third"
+    reopened.close()
+
+
+def test_evicted_thread_faults_back_in(db):
+    saver = SQLiteSaver(db, max_threads=1, flush_interval=3600)
+    graph = make_graph(saver)
+    first = chat(graph, 'a', "hello from a")
+    expected = contents(graph, first)
+    chat(graph, 'b', "hello from b")
+    assert list(saver.hot) == ['b']
+    assert saver.stats()['evictions'] == 1
+
+    assert contents(graph, first) == expected
+    assert list(saver.hot) == ['a']
+    saver.close()
+
+
+def test_retention_keeps_the_latest_checkpoints(db):
+    saver = SQLiteSaver(db, keep_checkpoints=5, flush_interval=3600)
+    graph = make_graph(saver)
+    for i in range(6):
+        config = chat(graph, 't', f"question {i}")
+    history = list(graph.get_state_history(config))
+    assert len(history) == 5
+    assert saver.stats()['checkpoints_pruned'] > 0
+    # pruning drops old checkpoints, never the messages the latest one holds
+    assert len(contents(graph, config)) == 12
+    saver.close()
+
+    reopened = SQLiteSaver(db, keep_checkpoints=5, flush_interval=3600)
+    graph = make_graph(reopened)
+    assert len(list(graph.get_state_history(config))) == 5
+    assert len(contents(graph, config)) == 12
+    reopened.close()
+
+
+def test_edited_message_keeps_both_versions(db):
+    saver = SQLiteSaver(db, flush_interval=3600)
+    graph = make_graph(saver)
+    config = chat(graph, 't', "original question")
+    first = graph.get_state(config).values['messages'][0]
+    graph.update_state(config, {'messages': [HumanMessage(content="edited question", id=first.id)]})
+
+    assert contents(graph, config)[0] == "edited question"
+    # the checkpoint before the edit still shows what was asked then
+    earlier = [state for state in graph.get_state_history(config) if state.values.get('messages')][1]
+    assert earlier.values['messages'][0].content == "original question"
+    assert any(key.startswith(f"{first.id}@") for key in saver.messages['t'])
+    saver.close()
+
+    reopened = SQLiteSaver(db, flush_interval=3600)
+    assert contents(make_graph(reopened), config)[0] == "edited question"
+    reopened.close()
+
+
+def test_messages_are_stored_once_per_thread(db):
+    saver = SQLiteSaver(db, flush_interval=3600)
+    graph = make_graph(saver)
+    for i in range(3):
+        config = chat(graph, 't', f"question {i}")
+    message_blobs = [value for key, value in saver.blobs.items() if key[2] == 'messages']
+    assert message_blobs and all(v_type == MESSAGE_REFS for v_type, _ in message_blobs)
+    assert len(saver.messages['t']) == len(contents(graph, config)) == 6
+    saver.close()
+
+
+def test_large_tool_results_are_compressed(db):
+    saver = SQLiteSaver(db, compress_over=1024, flush_interval=3600)
+    graph = make_graph(saver, tool_rounds=1, result_chars=5000)
+    config = chat(graph, 't', "latest news", web_search=True)
+    tool_results = [msg for msg in graph.get_state(config).values['messages'] if isinstance(msg, ToolMessage)]
+    assert tool_results
+    stored_types = [v_type for v_type, _ in saver.messages['t'].values()]
+    assert any(v_type.startswith(COMPRESSED_PREFIX) for v_type in stored_types)
+    saver.close()
+
+    reopened = SQLiteSaver(db, compress_over=1024, flush_interval=3600)
+    restored = [msg for msg in make_graph(reopened).get_state(config).values['messages'] if isinstance(msg, ToolMessage)]
+    assert [msg.content for msg in restored] == [msg.content for msg in tool_results]
+    reopened.close()
+
+
+def test_database_with_full_history_blobs_still_loads(db):
+    # written the way checkpoints were before message refs: the whole history in each blob
+    legacy = SQLiteSaver(db, dedupe_messages=False, compress_over=0, flush_interval=3600)
+    graph = make_graph(legacy)
+    config = chat(graph, 't', "asked before the upgrade")
+    before = contents(graph, config)
+    legacy.close()
+
+    saver = SQLiteSaver(db, flush_interval=3600)
+    graph = make_graph(saver)
+    assert contents(graph, config) == before
+    chat(graph, 't', "asked after the upgrade")
+    assert contents(graph, config)[:2] == before
+    assert isinstance(graph.get_state(config).values['messages'][-1], AIMessage)
+    saver.close()
+
+    reopened = SQLiteSaver(db, flush_interval=3600)
+    assert len(contents(make_graph(reopened), config)) == 4
+    reopened.close()
+
+
+def test_async_methods_run_off_the_event_loop(db):
+    saver = SQLiteSaver(db, flush_interval=3600)
+    config = chat(make_graph(saver), 't', "hello")
+    saver.close()
+
+    reopened = SQLiteSaver(db, flush_interval=3600)
+    graph = make_graph(reopened)
+    on_loop = []
+    fault_in = reopened._fault_in
+
+    def recording_fault_in(thread_id):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return fault_in(thread_id)
+
+    reopened._fault_in = recording_fault_in
+
+    async def turn():
+        await graph.ainvoke({'messages': [HumanMessage(content="again")], 'settings': {'web_search': False}}, config)
+        return (await graph.aget_state(config)).values['messages']
+
+    assert len(asyncio.run(turn())) == 4
+    # the SQLite read ran in a worker thread, not on the event loop
+    assert on_loop == [False]
+    reopened.close()
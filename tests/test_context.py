@@ -0,0 +1,47 @@
+import asyncio
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from benchmarks.fakes import DelayedChatModel
+from src.backend.chatbot import build_graph
+
+
+class FailingSummaryModel(DelayedChatModel):
+    """Answers chat turns, raises on the rolling-summary call."""
+
+    def _check(self, messages):
+        if 'running summary' in str(messages[-1].content):
+            raise RuntimeError("summary provider down")
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self._check(messages)
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self._check(messages)
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+
+CONFIG = {'configurable': {'thread_id': 't', 'max_prompt_tokens': 900}}
+LONG = "word " * 150
+
+
+def test_failed_summary_keeps_the_turn_and_the_old_summary():
+    graph = build_graph(FailingSummaryModel(latency=0), [], InMemorySaver())
+    for i in range(6):
+        result = graph.invoke({'messages': [HumanMessage(content=f"{i} {LONG}")]}, CONFIG)
+        assert result['messages'][-1].content == FailingSummaryModel().reply
+    state = graph.get_state(CONFIG).values
+    assert not state.get('summary')
+    assert not state.get('summary_until')
+
+
+def test_failed_summary_async():
+    graph = build_graph(FailingSummaryModel(latency=0), [], InMemorySaver())
+
+    async def turns():
+        for i in range(6):
+            result = await graph.ainvoke({'messages': [HumanMessage(content=f"{i} {LONG}")]}, CONFIG)
+            assert result['messages'][-1].content == FailingSummaryModel().reply
+
+    asyncio.run(turns())
+    assert not graph.get_state(CONFIG).values.get('summary_until')
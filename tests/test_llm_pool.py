@@ -0,0 +1,32 @@
+import asyncio
+from langchain_core.messages import HumanMessage
+from src.backend.llm_pool import LLMPool
+from src.backend.stub_provider import StubProvider
+
+
+def test_clients_for_different_keys_share_connections():
+    with StubProvider() as stub:
+        pool = LLMPool(base_url=stub.base_url)
+        for api_key in ('key-a', 'key-b', 'key-c', 'key-a', 'key-b'):
+            pool.get('stub-model', api_key).invoke([HumanMessage(content="hi")])
+        stats = pool.stats()
+    assert stats['clients'] == 3
+    assert stats['clients_reused'] == 2
+    assert stats['requests'] == 5
+    # sequential requests all ride one kept-alive connection
+    assert stats['connections_opened'] == 1
+    assert stats['connection_reuse_rate'] == 0.8
+
+
+def test_async_clients_share_connections():
+    with StubProvider() as stub:
+        pool = LLMPool(base_url=stub.base_url)
+
+        async def calls():
+            for api_key in ('key-a', 'key-b', 'key-a', 'key-b'):
+                await pool.get('stub-model', api_key).ainvoke([HumanMessage(content="hi")])
+
+        asyncio.run(calls())
+        stats = pool.stats()
+    assert stats['requests'] == 4
+    assert stats['connections_opened'] == 1
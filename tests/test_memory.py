@@ -0,0 +1,45 @@
+from fastapi.testclient import TestClient
+from langgraph.checkpoint.memory import InMemorySaver
+from pydantic import Field
+from benchmarks.fakes import DelayedChatModel
+from src.backend.api import create_app
+from src.backend.catalog import ThreadCatalog
+from src.backend.chatbot import build_graph
+from src.backend.memory import HashingEmbedder, LongTermMemory
+
+
+class RecordingModel(DelayedChatModel):
+    """Remembers the system prompt of every call."""
+
+    system_prompts: list = Field(default_factory=list)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.system_prompts.append(str(messages[0].content))
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        return self._generate(messages)
+
+
+def client(tmp_path):
+    model = RecordingModel(latency=0)
+    memory = LongTermMemory(path=str(tmp_path / 'memory'), embedder=HashingEmbedder())
+    graph = build_graph(model, [], InMemorySaver(), memory=memory)
+    return TestClient(create_app(graph=graph, catalog=ThreadCatalog(':memory:'))), model, memory
+
+
+def test_anonymous_requests_neither_store_nor_recall(tmp_path):
+    api, model, memory = client(tmp_path)
+    api.post('/threads/alice/messages', json={'content': "my bank account password is hunter2"})
+    api.post('/threads/bob/messages', json={'content': "what is my bank account password"})
+    assert memory.index.ntotal == 0
+    assert not any('hunter2' in prompt for prompt in model.system_prompts)
+
+
+def test_memory_is_scoped_to_the_user_id(tmp_path):
+    api, model, _ = client(tmp_path)
+    api.post('/threads/a1/messages', json={'content': "my bank account password is hunter2", 'user_id': 'alice'})
+    api.post('/threads/b1/messages', json={'content': "what is my bank account password", 'user_id': 'bob'})
+    assert 'hunter2' not in model.system_prompts[-1]
+    api.post('/threads/a2/messages', json={'content': "what is my bank account password", 'user_id': 'alice'})
+    assert 'hunter2' in model.system_prompts[-1]
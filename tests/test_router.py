@@ -0,0 +1,58 @@
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from pydantic import SecretStr
+from benchmarks.fakes import DelayedChatModel, FakeSearchTool, ScriptedChatModel
+from src.backend.chatbot import build_chatbot, build_graph
+from src.backend.router import ModelRouter
+
+
+class FakePool:
+    """LLMPool stand-in handing out one scripted model per model name, recording the order."""
+
+    def __init__(self, tool_rounds=0):
+        self.tool_rounds = tool_rounds
+        self.used = []
+
+    def get(self, model, api_key=None):
+        return ScriptedChatModel(first_token_latency=0, tokens_per_second=10 ** 6, tool_rounds=self.tool_rounds)
+
+    def variant(self, model, api_key, name, make):
+        self.used.append(model)
+        return make(self.get(model))
+
+
+def test_tool_rounds_keep_the_turns_tier():
+    pool = FakePool(tool_rounds=3)
+    router = ModelRouter(tiers={'small': 'small', 'large': 'large'})
+    graph = build_graph(pool.get('large'), [FakeSearchTool(latency=0)], InMemorySaver(), pool=pool, router=router)
+    config = {'configurable': {'thread_id': 't'}}
+    graph.invoke({'messages': [HumanMessage(content="latest news today")], 'settings': {'web_search': True}}, config)
+    # three search rounds spend the budget; the final answer stays on the large tier
+    assert pool.used == ['large'] * 4
+    assert router.stats()['routed'] == {'small': 0, 'large': 1}
+
+    pool.used.clear()
+    graph.invoke({'messages': [HumanMessage(content="thanks")], 'settings': {'web_search': False}}, config)
+    assert pool.used == ['small']
+
+
+def test_explicit_model_pins_chat_turns():
+    pool = FakePool()
+    graph = build_chatbot('pinned-model', tools=[], checkpointer=InMemorySaver(), pool=pool, scheduler=None)
+    graph.invoke({'messages': [HumanMessage(content="hi")]}, {'configurable': {'thread_id': 't', 'api_key': 'k'}})
+    assert pool.used == ['pinned-model']
+
+
+def test_explicit_llm_answers_every_call():
+    llm = DelayedChatModel(latency=0, reply="from my own client")
+    graph = build_chatbot(llm=llm, tools=[], checkpointer=InMemorySaver(), scheduler=None)
+    for configurable in ({'thread_id': 'a'}, {'thread_id': 'b', 'api_key': SecretStr('caller-key')}):
+        result = graph.invoke({'messages': [HumanMessage(content="hi")]}, {'configurable': configurable})
+        assert result['messages'][-1].content == "from my own client"
+    assert len(llm.prompt_tokens) == 2
+
+
+def test_default_graph_builds_without_a_server_key(monkeypatch):
+    monkeypatch.delenv('GROQ_API_KEY', raising=False)
+    # clients come from the pool per caller key on first use, none at build time
+    build_chatbot(tools=[], checkpointer=InMemorySaver(), scheduler=None)
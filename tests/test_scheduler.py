@@ -0,0 +1,139 @@
+import asyncio
+import time
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langgraph.checkpoint.memory import InMemorySaver
+from src.backend.chatbot import build_graph
+from src.backend.llm_pool import LLMPool
+from src.backend.scheduler import BACKGROUND, INTERACTIVE, RequestScheduler, scheduled
+from src.backend.stub_provider import StubProvider
+
+
+class ServerError(Exception):
+    status_code = 503
+
+
+class FlakyStreamModel(BaseChatModel):
+    """Streams ``reply`` word by word, failing with a 503 after ``fail_after`` words on the first ``failures`` calls."""
+
+    reply: str = "one two three four five six"
+    fail_after: int = 0
+    failures: int = 1
+    calls: int = 0
+
+    @property
+    def _llm_type(self):
+        return 'flaky-fake'
+
+    def _chunks(self):
+        self.calls += 1
+        words = self.reply.split(' ')
+        for i, word in enumerate(words):
+            if self.calls <= self.failures and i == self.fail_after:
+                raise ServerError("upstream dropped the stream")
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == len(words) - 1 else word + ' '))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        content = ''.join(chunk.text for chunk in self._chunks())
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for chunk in self._chunks():
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        for chunk in self._chunks():
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+def stream_text(graph, config, is_async):
+    inputs = {'messages': [HumanMessage(content="hi")], 'settings': {'web_search': False}}
+    if not is_async:
+        return ''.join(chunk.content for chunk, _ in graph.stream(inputs, config, stream_mode='messages'))
+
+    async def collect():
+        return ''.join([chunk.content async for chunk, _ in graph.astream(inputs, config, stream_mode='messages')])
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize('is_async', [False, True])
+def test_failure_after_first_token_is_not_retried(is_async):
+    scheduler = RequestScheduler(rpm=0, tpm=0, backoff_base=0)
+    model = FlakyStreamModel(fail_after=3)
+    graph = build_graph(model, [], InMemorySaver(), scheduler=scheduler)
+    with pytest.raises(ServerError):
+        stream_text(graph, {'configurable': {'thread_id': 't'}}, is_async)
+    assert model.calls == 1
+    assert scheduler.stats()['retries'] == 0
+    assert scheduler.stats()['failed_mid_stream'] == 1
+
+
+@pytest.mark.parametrize('is_async', [False, True])
+def test_failure_before_first_token_is_retried(is_async):
+    scheduler = RequestScheduler(rpm=0, tpm=0, backoff_base=0)
+    model = FlakyStreamModel(fail_after=0)
+    graph = build_graph(model, [], InMemorySaver(), scheduler=scheduler)
+    text = stream_text(graph, {'configurable': {'thread_id': 't'}}, is_async)
+    # the failed attempt streamed nothing, so the answer appears exactly once
+    assert text == model.reply
+    assert model.calls == 2
+    assert scheduler.stats()['retries'] == 1
+
+
+def test_limits_are_off_by_default():
+    scheduler = RequestScheduler()
+    for _ in range(100):
+        scheduler.acquire('key', tokens=10 ** 5)
+    assert scheduler.stats()['granted'] == 100
+
+
+def test_buckets_are_per_key_and_model():
+    scheduler = RequestScheduler(rpm=1, tpm=0)
+    model = FlakyStreamModel(failures=0)
+    small = scheduled(model, scheduler, 'key', model='small')
+    large = scheduled(model, scheduler, 'key', model='large')
+    other = scheduled(model, scheduler, 'other-key', model='small')
+    for runnable in (small, large, other):
+        runnable.invoke([HumanMessage(content="hi")])
+    # one request a minute each, yet no call waited on another's bucket
+    assert scheduler.stats()['keys'] == 2
+    assert scheduler.stats()['queued_seconds'] < 1
+
+
+def test_retry_after_holds_background_work_behind_interactive_chat():
+    # the first request is a 429 asking for 0.3s; everything after it succeeds
+    with StubProvider(fail_first=1, fail_status=429, retry_after=0.3) as stub:
+        pool = LLMPool(base_url=stub.base_url)
+        scheduler = RequestScheduler(rpm=0, tpm=0, backoff_base=0)
+
+        async def call(model, priority):
+            llm = pool.get(model, 'key')
+            await scheduler.ainvoke(llm, [HumanMessage(content="hi")], api_key='key', priority=priority, model_name=model)
+            return time.monotonic() - started
+
+        async def run():
+            first = asyncio.create_task(call('large', INTERACTIVE))
+            while not scheduler.stats()['rate_limited']:
+                await asyncio.sleep(0.01)
+            paused_at.append(time.monotonic() - started)
+            # the large tier is paused; chat on it waits, and so does background work on the small tier
+            return await asyncio.gather(
+                first, call('large', INTERACTIVE), call('small', BACKGROUND), call('small', BACKGROUND),
+                call('small', INTERACTIVE),
+            )
+
+        started, paused_at = time.monotonic(), []
+        first, chat, *background, small_chat = asyncio.run(run())
+        counters = dict(stub.counters)
+    assert counters['failed'] == 1 and counters['ok'] == 5
+    assert scheduler.stats()['rate_limited'] == 1 and scheduler.stats()['retries'] == 1
+    # nothing waiting behind the interactive call on the paused tier went early
+    assert min(first, chat, *background) >= paused_at[0] + 0.25
+    # chat of the same priority on another model does not wait on the paused one
+    assert small_chat < paused_at[0] + 0.25
@@ -0,0 +1,86 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from benchmarks.fakes import FakeSearchTool
+from src.backend.search_cache import cached_search, normalize_query
+
+
+class ErrorStringSearchTool(FakeSearchTool):
+    """Reports failures as a string result, the way TavilySearchResults does."""
+
+    def _results(self, query):
+        return "HTTPError('429 Client Error: Too Many Requests')"
+
+
+def test_queries_differing_in_case_spacing_and_punctuation_share_an_entry():
+    assert normalize_query("  What's   the WEATHER in Paris?! ") == "what's the weather in paris"
+    inner = FakeSearchTool(latency=0)
+    tool = cached_search(inner)
+    first = tool.invoke({'query': "Weather in Paris?"})
+    assert tool.invoke({'query': "weather  in paris"}) == first
+    assert inner.calls == 1
+    assert tool.stats()['hits'] == 1
+
+
+def test_entries_expire_after_the_ttl():
+    inner = FakeSearchTool(latency=0)
+    tool = cached_search(inner, ttl=0.05)
+    tool.invoke({'query': "paris"})
+    time.sleep(0.1)
+    tool.invoke({'query': "paris"})
+    assert inner.calls == 2
+    assert tool.stats()['expirations'] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    inner = FakeSearchTool(latency=0)
+    tool = cached_search(inner, max_entries=2)
+    for query in ("a", "b", "a", "c"):
+        tool.invoke({'query': query})
+    assert inner.calls == 3
+    assert tool.stats()['evictions'] == 1
+    # 'a' was used after 'b', so 'b' made room for 'c'
+    tool.invoke({'query': "a"})
+    assert inner.calls == 3
+    tool.invoke({'query': "b"})
+    assert inner.calls == 4
+
+
+def test_concurrent_threads_share_one_call():
+    inner = FakeSearchTool(latency=0.2)
+    tool = cached_search(inner)
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        results = list(pool.map(lambda _: tool.invoke({'query': "paris"}), range(5)))
+    assert inner.calls == 1
+    assert all(result == results[0] for result in results)
+    assert tool.stats()['coalesced'] == 4
+
+
+def test_concurrent_coroutines_share_one_call():
+    inner = FakeSearchTool(latency=0.2)
+    tool = cached_search(inner)
+
+    async def run():
+        return await asyncio.gather(*(tool.ainvoke({'query': "paris"}) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert inner.calls == 1
+    assert all(result == results[0] for result in results)
+    assert tool.stats()['coalesced'] == 4
+
+
+def test_failures_are_not_cached():
+    inner = ErrorStringSearchTool(latency=0)
+    tool = cached_search(inner)
+    assert tool.invoke({'query': "paris"}).startswith("HTTPError")
+    tool.invoke({'query': "paris"})
+    assert inner.calls == 2
+    assert tool.stats()['size'] == 0
+
+    raising = FakeSearchTool(latency=0, error="search backend down")
+    tool = cached_search(raising)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            tool.invoke({'query': "paris"})
+    assert raising.calls == 2
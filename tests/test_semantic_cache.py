@@ -0,0 +1,111 @@
+import time
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from benchmarks.fakes import ScriptedChatModel
+from src.backend.chatbot import build_graph
+from src.backend.router import ModelRouter
+from src.backend.semantic_cache import SemanticCache, cache_scope, is_context_dependent
+
+
+QUESTION = "What is the capital of France?"
+
+
+class TierPool:
+    """LLMPool stand-in answering with the name of the model each call went to."""
+
+    def __init__(self):
+        self.used = []
+
+    def variant(self, model, api_key, name, make):
+        self.used.append(model)
+        return make(ScriptedChatModel(first_token_latency=0, tokens_per_second=10 ** 6, reply=f"answer from {model}"))
+
+
+def ask(graph, thread_id, text, **configurable):
+    config = {'configurable': {'thread_id': thread_id, **configurable}}
+    return graph.invoke({'messages': [HumanMessage(content=text)], 'settings': {'web_search': False}}, config)['messages'][-1]
+
+
+def test_near_duplicates_hit_and_unrelated_questions_miss():
+    cache = SemanticCache()
+    cache.store(QUESTION, 's', "Paris.", latency=1.5)
+    assert cache.lookup("what is the capital of france", 's') == "Paris."
+    assert cache.lookup("How do volcanoes form under the ocean?", 's') is None
+    # a threshold above any cosine similarity turns even exact repeats away
+    strict = SemanticCache(threshold=1.01)
+    strict.store(QUESTION, 's', "Paris.")
+    assert strict.lookup(QUESTION, 's') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['latency_saved_seconds']) == (1, 1, 1.5)
+
+
+def test_answers_stay_in_their_scope():
+    cache = SemanticCache()
+    cache.store(QUESTION, cache_scope("default prompt", 'small'), "Paris.")
+    assert cache.lookup(QUESTION, cache_scope("default prompt", 'large')) is None
+    assert cache.lookup(QUESTION, cache_scope("pirate persona", 'small')) is None
+    assert cache.lookup(QUESTION, cache_scope("default prompt", 'small')) == "Paris."
+
+
+def test_entries_expire():
+    cache = SemanticCache(ttl=0.05)
+    cache.store(QUESTION, 's', "Paris.")
+    time.sleep(0.1)
+    assert cache.lookup(QUESTION, 's') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SemanticCache(max_entries=2)
+    cache.store("What is the capital of France?", 's', "Paris.")
+    cache.store("How tall is Mount Everest?", 's', "8849 m.")
+    # reading France makes Everest the oldest
+    assert cache.lookup("What is the capital of France?", 's') == "Paris."
+    cache.store("Who wrote Pride and Prejudice?", 's', "Jane Austen.")
+    assert cache.stats()['evictions'] == 1
+    assert cache.lookup("How tall is Mount Everest?", 's') is None
+    assert cache.lookup("What is the capital of France?", 's') == "Paris."
+    assert cache.lookup("Who wrote Pride and Prejudice?", 's') == "Jane Austen."
+
+
+def test_follow_ups_are_not_cached():
+    assert not is_context_dependent(QUESTION)
+    assert all(is_context_dependent(q) for q in ("Why is that?", "and in Python?", "thanks", "Tell me more about it"))
+
+    cache = SemanticCache()
+    model = ScriptedChatModel(first_token_latency=0, tokens_per_second=10 ** 6)
+    graph = build_graph(model, [], InMemorySaver(), response_cache=cache)
+    ask(graph, 'a', "Tell me more about it")
+    ask(graph, 'b', "Tell me more about it")
+    stats = cache.stats()
+    assert (stats['skipped'], stats['stores'], stats['hits']) == (2, 0, 0)
+
+
+def test_cache_hit_streams_as_the_nodes_message():
+    cache = SemanticCache()
+    model = ScriptedChatModel(first_token_latency=0, tokens_per_second=10 ** 6, reply="Paris is the capital.")
+    graph = build_graph(model, [], InMemorySaver(), response_cache=cache)
+    ask(graph, 'first', QUESTION)
+
+    config = {'configurable': {'thread_id': 'second'}}
+    inputs = {'messages': [HumanMessage(content="what is the capital of france")], 'settings': {'web_search': False}}
+    chunks = [(chunk, meta) for chunk, meta in graph.stream(inputs, config, stream_mode='messages')
+              if meta['langgraph_node'] == 'chat_node']
+    assert [chunk.content for chunk, _ in chunks] == ["Paris is the capital."]
+    assert chunks[0][0].response_metadata['semantic_cache_hit'] is True
+    assert cache.stats()['hits'] == 1
+
+
+def test_tiers_do_not_share_answers():
+    cache = SemanticCache()
+    pool = TierPool()
+    router = ModelRouter(tiers={'small': 'small', 'large': 'large'})
+    graph = build_graph(None, [], InMemorySaver(), pool=pool, router=router, response_cache=cache)
+
+    assert ask(graph, 'a', QUESTION).content == "answer from small"
+    # the same question forced to the large tier is a miss, answered and cached there
+    assert ask(graph, 'b', QUESTION, model_tier='large').content == "answer from large"
+    assert ask(graph, 'c', QUESTION, model_tier='large').content == "answer from large"
+    assert ask(graph, 'd', QUESTION).content == "answer from small"
+    assert pool.used == ['small', 'large', 'large', 'small']
+    assert cache.stats()['hits'] == 2
@@ -0,0 +1,33 @@
+from fastapi.testclient import TestClient
+from langchain_core.messages import HumanMessage, SystemMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from benchmarks.fakes import DelayedChatModel
+from src.backend.api import create_app
+from src.backend.catalog import ThreadCatalog
+from src.backend.chatbot import build_graph
+from src.backend.settings import merge_settings
+
+
+def test_partial_settings_keep_the_rest():
+    graph = build_graph(DelayedChatModel(latency=0), [], InMemorySaver())
+    api = TestClient(create_app(graph=graph, catalog=ThreadCatalog(':memory:')))
+    api.post('/threads/t/messages', json={'content': "ahoy", 'system_prompt': "You are a pirate."})
+    api.post('/threads/t/messages', json={'content': "search please", 'web_search': True})
+    settings = graph.get_state({'configurable': {'thread_id': 't'}}).values['settings']
+    assert settings == {'system_prompt': "You are a pirate.", 'web_search': True}
+
+
+def test_explicit_prompt_replaces_a_migrated_raw_prompt():
+    graph = build_graph(DelayedChatModel(latency=0), [], InMemorySaver())
+    config = {'configurable': {'thread_id': 'old'}}
+    graph.invoke({'messages': [SystemMessage(content="legacy prompt"), HumanMessage(content="hi")]}, config)
+    assert graph.get_state(config).values['settings'] == {'raw_prompt': "legacy prompt"}
+    graph.invoke({'messages': [HumanMessage(content="hi")], 'settings': {'web_search': False}}, config)
+    assert graph.get_state(config).values['settings']['raw_prompt'] == "legacy prompt"
+    graph.invoke({'messages': [HumanMessage(content="hi")], 'settings': {'system_prompt': "new"}}, config)
+    assert graph.get_state(config).values['settings'] == {'web_search': False, 'system_prompt': "new"}
+
+
+def test_merge_settings_handles_empty_sides():
+    assert merge_settings(None, {'persona': 'x'}) == {'persona': 'x'}
+    assert merge_settings({'persona': 'x'}, None) == {'persona': 'x'}
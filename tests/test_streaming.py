@@ -0,0 +1,30 @@
+from src.frontend.streaming import StreamRenderer
+
+
+class Container:
+    def __init__(self):
+        self.bodies = []
+
+    def markdown(self, body):
+        self.bodies.append(body)
+
+
+def render_calls(measure):
+    container = Container()
+    # a frozen clock: only the pending byte count can trigger a render
+    renderer = StreamRenderer(container, max_pending_bytes=64, measure=measure, clock=lambda: 0.0)
+    for _ in range(40):
+        renderer.write("héllo wörld ✓ ")
+    renderer.close()
+    return renderer.stats['render_calls'], container.bodies[-1]
+
+
+def test_measuring_does_not_change_when_renders_happen():
+    assert render_calls(measure=True) == render_calls(measure=False)
+
+
+def test_pending_size_counts_utf8_bytes():
+    container = Container()
+    renderer = StreamRenderer(container, max_pending_bytes=4, clock=lambda: 0.0)
+    renderer.write("✓✓")  # 2 characters, 6 bytes
+    assert len(container.bodies) == 1
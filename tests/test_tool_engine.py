@@ -0,0 +1,117 @@
+import asyncio
+import time
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from benchmarks.fakes import FakeSearchTool
+from src.backend.tool_engine import ToolExecutor
+
+
+def turn(calls, rounds=1, started=None):
+    """State whose last message asks for ``calls`` searches, in round ``rounds`` of the turn."""
+    messages = [HumanMessage(content="question")]
+    for n in range(rounds - 1):
+        call = {'name': 'tavily_search_results_json', 'args': {'query': 'q'}, 'id': f"earlier-{n}"}
+        messages += [AIMessage(content="", tool_calls=[call]), ToolMessage(content="[]", tool_call_id=call['id'])]
+    tool_calls = [
+        {'name': 'tavily_search_results_json', 'args': {'query': f"q{i}"}, 'id': f"call-{i}"} for i in range(calls)
+    ]
+    messages.append(AIMessage(content="", tool_calls=tool_calls))
+    return {'messages': messages, 'turn_started_at': time.time() if started is None else started}
+
+
+@pytest.fixture(params=['sync', 'async'])
+def run(request):
+    def run_calls(executor, state, allowed=None):
+        if request.param == 'sync':
+            return executor.run(state, None, allowed)
+        return asyncio.run(executor.arun(state, None, allowed))
+    return run_calls
+
+
+def test_calls_run_concurrently_in_request_order(run):
+    executor = ToolExecutor([FakeSearchTool(latency=0.2)])
+    started = time.monotonic()
+    results = run(executor, turn(3))
+    assert time.monotonic() - started < 0.5
+    assert [msg.tool_call_id for msg in results] == ['call-0', 'call-1', 'call-2']
+    assert all(msg.status == 'success' for msg in results)
+
+
+def test_failing_tool_becomes_an_error_message(run):
+    executor = ToolExecutor([FakeSearchTool(latency=0, error="search backend down")])
+    [result] = run(executor, turn(1))
+    assert result.status == 'error'
+    assert "search backend down" in result.content
+    assert executor.stats()['errors'] == 1
+
+
+def test_slow_call_times_out(run):
+    executor = ToolExecutor([FakeSearchTool(latency=1.0)], tool_timeout=0.1)
+    started = time.monotonic()
+    [result] = run(executor, turn(1))
+    assert time.monotonic() - started < 0.5
+    assert result.status == 'error'
+    assert "did not answer" in result.content
+    assert executor.stats()['timeouts'] == 1
+
+
+def test_turn_deadline_caps_the_call_timeout(run):
+    executor = ToolExecutor([FakeSearchTool(latency=3.0)], tool_timeout=10, turn_deadline=5)
+    started = time.monotonic()
+    # 4.5 of the turn's 5 seconds are already gone
+    [result] = run(executor, turn(1, started=time.time() - 4.5))
+    assert time.monotonic() - started < 1.0
+    assert "did not answer" in result.content
+
+
+def test_spent_turn_deadline_refuses_calls(run):
+    tool = FakeSearchTool(latency=0)
+    executor = ToolExecutor([tool], turn_deadline=5)
+    state = turn(2, started=time.time() - 6)
+    assert executor.exhausted(state)
+    results = run(executor, state)
+    assert [msg.status for msg in results] == ['error', 'error']
+    assert "budget" in results[0].content
+    assert tool.calls == 0
+
+
+def test_round_cap(run):
+    tool = FakeSearchTool(latency=0)
+    executor = ToolExecutor([tool], max_rounds=2)
+    assert not executor.exhausted(turn(1, rounds=1))
+    assert executor.exhausted(turn(1, rounds=2))
+    # the last allowed round still runs, one past the cap is refused
+    assert run(executor, turn(1, rounds=2))[0].status == 'success'
+    results = run(executor, turn(1, rounds=3))
+    assert results[0].status == 'error' and "budget" in results[0].content
+    assert tool.calls == 1
+    assert executor.stats()['rejected'] == 1
+
+
+def test_concurrency_limit(run):
+    executor = ToolExecutor([FakeSearchTool(latency=0.2)], max_concurrency=2)
+    started = time.monotonic()
+    results = run(executor, turn(4))
+    elapsed = time.monotonic() - started
+    # two at a time: two waves of 0.2s
+    assert 0.38 < elapsed < 0.7
+    assert all(msg.status == 'success' for msg in results)
+
+
+def test_calls_queued_past_the_timeout_never_run(run):
+    tool = FakeSearchTool(latency=0.5)
+    executor = ToolExecutor([tool], tool_timeout=0.2, max_concurrency=1)
+    results = run(executor, turn(3))
+    assert [msg.status for msg in results] == ['error'] * 3
+    assert executor.stats()['timeouts'] == 3
+    # once the running call frees the slot, the two that waited for it must not start
+    time.sleep(0.6)
+    assert tool.calls == 1
+
+
+def test_disallowed_and_unknown_tools_are_refused(run):
+    tool = FakeSearchTool(latency=0)
+    executor = ToolExecutor([tool])
+    [result] = run(executor, turn(1), allowed=set())
+    assert result.status == 'error' and "not available" in result.content
+    assert tool.calls == 0